@@ -3,17 +3,142 @@ import os
 # Base directory → backend/app/
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Directory to store uploaded datasets
-BASE_UPLOAD_DIR = os.path.join(BASE_DIR, "..", "uploads")
+from datetime import timedelta
 
-# Create upload directory if not exists
+# Directory to store datasets (uploads/ only holds in-progress resumable
+# uploads, see RESUMABLE_UPLOAD_DIR). UPLOAD_DIR moves the dataset store
+# (e.g. to a scratch directory for benchmarks)
+BASE_UPLOAD_DIR = os.getenv(
+    "UPLOAD_DIR", os.path.join(os.path.dirname(__file__), "..", "uploaded_datasets")
+)
 os.makedirs(BASE_UPLOAD_DIR, exist_ok=True)
 
-from datetime import timedelta
+# ===== Partitioned storage / parallel compute =====
+# Datasets are stored as partitions of at most this many rows
+PARTITION_ROWS = 1_000_000
 
-# Existing settings...
-BASE_UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "..", "uploaded_datasets")
-os.makedirs(BASE_UPLOAD_DIR, exist_ok=True)
+# Worker processes used to profile / score / clean partitions in parallel
+COMPUTE_WORKERS = os.cpu_count() or 1
+
+# Rows per batch produced by the streaming readers
+READ_BATCH_ROWS = 100_000
+
+# ===== Reader caches =====
+# Derived artefacts (e.g. extracted PDF page text) keyed by content hash.
+# CACHE_DIR moves it (e.g. to a scratch directory for tests)
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(BASE_DIR, "..", "cache"))
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# PDF pages handed to each worker at a time
+PDF_PAGE_BATCH = 16
+
+# ===== OCR =====
+# "tesseract", or "module:function" for any callable(PIL image) -> str
+OCR_ENGINE = os.getenv("OCR_ENGINE", "tesseract")
+
+# Images are downsampled to at most this many pixels on the longest side
+# and recognised in horizontal strips of about OCR_TILE_HEIGHT pixels
+OCR_MAX_SIDE = 4000
+OCR_TILE_HEIGHT = 1000
+
+# Strips queued in the worker pool at once (bounds memory for bulk OCR)
+OCR_MAX_PENDING = 2 * COMPUTE_WORKERS
+
+# ===== SQL ingestion =====
+# Read-only connections kept open (and in use at once) per database
+SQL_POOL_SIZE = 4
+
+# ===== SQL queries over stored datasets =====
+# DuckDB threads per query, and rows per streamed result batch
+QUERY_THREADS = COMPUTE_WORKERS
+QUERY_BATCH_ROWS = READ_BATCH_ROWS
+
+# ===== Resumable uploads =====
+# One directory per in-progress multipart upload. Each part is staged
+# there, then copied to its offset in a preallocated file once verified,
+# so completing needs no copy of the whole file
+RESUMABLE_UPLOAD_DIR = os.path.join(BASE_DIR, "..", "uploads", "resumable")
+os.makedirs(RESUMABLE_UPLOAD_DIR, exist_ok=True)
+
+# Part size used when the client does not choose one, and the largest allowed
+UPLOAD_PART_SIZE = 64 * 1024 * 1024
+UPLOAD_MAX_PART_SIZE = 1024 * 1024 * 1024
+
+# Uploads not touched for this long are discarded
+UPLOAD_SESSION_TTL_S = 24 * 3600
+
+# ===== Dataset catalog =====
+# JSON file recording partition manifests, lineage and cleaning baselines
+CATALOG_PATH = os.path.join(BASE_UPLOAD_DIR, "catalog.json")
+
+# Appends whose numeric column means drift further than this many
+# baseline standard deviations trigger a full re-clean of the dataset
+APPEND_DRIFT_THRESHOLD = 0.5
+
+# ===== Clean memoization =====
+# Cleaned outputs by (source content hash, cleaning options)
+CLEAN_MEMO_PATH = os.path.join(BASE_UPLOAD_DIR, "clean_memo.json")
+
+# Least recently used memoized outputs beyond this many are deleted
+CLEAN_MEMO_MAX_ENTRIES = 256
+
+# Memoized outputs not reused for this long are deleted
+CLEAN_MEMO_TTL_S = 7 * 24 * 3600
+
+# ===== Storage lifecycle =====
+# Datasets not used for this long are deleted (0: never, the default). A
+# dataset's own "ttl_s" and "pinned" (PATCH /datasets/{id}/lifecycle)
+# override it. Datasets with no recorded use (older ones, migrated legacy
+# uploads) count from the first sweep that sees them, not their file times
+DATASET_TTL_S = int(os.getenv("DATASET_TTL_S", 0))
+
+# Derived datasets nothing refers to any more, partition directories
+# without a catalog entry and temporary files are deleted once this old
+ORPHAN_GRACE_S = 24 * 3600
+
+# Datasets not used for this long are recompressed with zstd (0: never)
+COLD_AFTER_S = int(os.getenv("COLD_AFTER_S", 7 * 24 * 3600))
+
+# Size limit of the dataset store in bytes (0: none). Past it the least
+# recently used datasets are deleted, and ingestion is refused if that
+# is not enough
+STORAGE_QUOTA_BYTES = int(os.getenv("STORAGE_QUOTA_BYTES", 0))
+
+# Cached PDF page text and OCR results (CACHE_DIR/pdf, CACHE_DIR/ocr) not
+# used for this long are deleted (0: never), then the least recently used
+# beyond CACHE_MAX_BYTES (0: no limit)
+CACHE_TTL_S = int(os.getenv("CACHE_TTL_S", 14 * 24 * 3600))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 2 * 1024**3))
+
+# Where uploads were stored before uploaded_datasets/. With
+# MIGRATE_LEGACY_UPLOADS=1, sweeps move any files left there into the
+# dataset store, where they are kept like the rest (None: off, the default)
+LEGACY_UPLOAD_DIR = (
+    os.path.join(BASE_DIR, "..", "uploads")
+    if os.getenv("MIGRATE_LEGACY_UPLOADS", "0") == "1"
+    else None
+)
+
+# Seconds between background sweeps (0: only POST /datasets/storage/sweep,
+# the default)
+STORAGE_SWEEP_INTERVAL_S = int(os.getenv("STORAGE_SWEEP_INTERVAL_S", 0))
+
+# ===== Sampled previews (?sample= on /profile and /quality_score) =====
+# Samples are read in blocks of this many contiguous rows
+SAMPLE_BLOCK_ROWS = 2048
+
+# Largest ?sample= (rows)
+SAMPLE_MAX_ROWS = 1_000_000
+
+# Background threads computing the exact results behind sampled previews
+SAMPLE_EXACT_WORKERS = 1
+
+# ===== Instrumentation =====
+# Stage timings and request latency histograms (served at /metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Also trace allocations per stage with tracemalloc (slows allocation-heavy code)
+TRACE_MEMORY = os.getenv("TRACE_MEMORY", "0") == "1"
 
 # ===== Auth / JWT Settings =====
 SECRET_KEY = "super-secret-key-change-this"  # change for production
@@ -1,13 +1,28 @@
 # backend/app/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.routers import datasets
+from app.services import instrumentation, storage
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # TTL expiry, orphan collection, cold compression and quota (see storage);
+    # only when STORAGE_SWEEP_INTERVAL_S is set
+    storage.start_sweeper()
+    yield
+    storage.stop_sweeper()
+
 
 app = FastAPI(
     title="CleanMind AI Backend",
     description="Simple data upload / profiling / cleaning backend (no auth).",
     version="0.2.0",
+    lifespan=lifespan,
 )
 
 # CORS – allow your local frontend
@@ -17,13 +32,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Timing"],
 )
 
+# latency per route; send an "X-Timing" header for a per-stage breakdown
+app.add_middleware(instrumentation.TimingMiddleware)
+
 
 @app.get("/")
 def root():
     return {"status": "backend is running 🚀", "service": "CleanMind AI"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Request latency and per-stage timing / memory metrics, Prometheus text format."""
+    return PlainTextResponse(
+        instrumentation.render_metrics(), media_type="text/plain; version=0.0.4"
+    )
+
+
 # Only datasets routes (no auth router)
 app.include_router(datasets.router, prefix="/datasets", tags=["datasets"])
@@ -2,22 +2,72 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, List
+import errno
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple, Union
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, File, Header, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from uuid import uuid4
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+from app.schemas.datasets import (
+    CleaningOptions,
+    LifecycleRequest,
+    QueryRequest,
+    ResumableUploadRequest,
+    SQLiteIngestRequest,
+    SQLSourceRequest,
+)
+from app.services import (
+    clean_memo,
+    clean_plan,
+    compressed,
+    incremental,
+    ingestion,
+    instrumentation,
+    parallel,
+    query_engine,
+    sampling,
+    sql_loader,
+    storage,
+    uploads,
+)
+from app.services.dataset_stats import estimate_unique, unique_is_estimate
+from app.services.file_readers import HDF_EXTENSIONS
+from app.services.ingestion_base import (
+    Source,
+    concat_batches,
+    get_batch_reader,
+    has_keys,
+    list_keys,
+    pick_key,
+)
+from app.services.progress import progress_stream, run_with_progress
+from app.utils import fast_response
 
 router = APIRouter()
 
-# Paths
-BASE_DIR = Path(__file__).resolve().parents[2]  # backend/
-DATA_ROOT = BASE_DIR / "uploaded_datasets"
-DATA_ROOT.mkdir(exist_ok=True)
+# Sample values are looked for in this many leading rows first
+_SAMPLE_SCAN_ROWS = 1000
+
+# Largest ?rows= for /preview
+_MAX_PREVIEW_ROWS = 10_000
+
+# ?layout= opts into the fast JSON path: "rows" keeps the default shape,
+# "columnar" sends one list per field
+Layout = Optional[Literal["rows", "columnar"]]
 
 
 # ========= Models =========
@@ -27,6 +77,8 @@ class ColumnProfile(BaseModel):
     pct_missing: float
     n_unique: int
     sample_values: List[str]
+    # n_unique is estimated (from maintained stats or a sample), not counted
+    n_unique_approx: bool = False
 
 
 class DatasetProfileResponse(BaseModel):
@@ -42,6 +94,36 @@ class QualityScoreResponse(BaseModel):
     metrics: Dict[str, float]
 
 
+class SampleInfo(BaseModel):
+    method: str            # arrow / parquet / csv blocks, or reservoir
+    n_sampled: int
+    fraction: float
+    n_rows_exact: bool     # False: n_rows is estimated (CSV)
+    exact_status: str      # of the background exact result: pending / running / failed
+
+
+class SampledColumnProfile(ColumnProfile):
+    pct_missing_ci: List[float]  # 95% interval of pct_missing
+
+
+class SampledProfileResponse(DatasetProfileResponse):
+    columns: Dict[str, SampledColumnProfile]
+    sample: SampleInfo
+
+
+class SampledQualityResponse(QualityScoreResponse):
+    sample: SampleInfo
+    intervals: Dict[str, List[float]]  # 95% intervals of the estimated metrics / score
+    constant_columns: Dict[str, float]  # upper bound on the share of other values
+
+
+class StepReport(BaseModel):
+    step: str
+    rows_in: Optional[int]
+    rows_out: Optional[int]
+    seconds: Optional[float]  # None for steps fused into one query
+
+
 class CleaningResult(BaseModel):
     source_dataset_id: str
     cleaned_dataset_id: str
@@ -52,90 +134,293 @@ class CleaningResult(BaseModel):
     duplicate_rows_removed: int
     outlier_rows_removed: int
     preview_rows: List[Dict[str, Any]]
+    engine: str = "pandas"
+    steps: List[StepReport] = []
+    memoized: bool = False  # returned from the clean memo; steps then carry no timings
+
+
+class AppendResult(BaseModel):
+    dataset_id: str
+    partition: str
+    n_rows_appended: int
+    n_rows_total: int
+    cleaned_dataset_id: str
+    cleaned_rows_written: int
+    duplicate_rows_removed: int
+    outlier_rows_removed: int
+    drift: Optional[float]
+    full_recompute: bool
+
+
+class AnalysisResponse(BaseModel):
+    profile: DatasetProfileResponse
+    quality: QualityScoreResponse
+    cleaning: CleaningResult
 
 
 # ========= Helpers =========
-def _dataset_path(dataset_id: str) -> Path:
-    """All datasets (raw + cleaned) are stored as CSV with this id."""
-    return DATA_ROOT / f"{dataset_id}.csv"
+def _dataset_paths(dataset_id: str) -> List[Path]:
+    """All partition files of a dataset (appends add partitions)."""
+    try:
+        paths = [Path(p) for p in ingestion.dataset_partitions(dataset_id)]
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    storage.touch(dataset_id)
+    return paths
 
 
 def _load_dataset(dataset_id: str) -> pd.DataFrame:
-    path = _dataset_path(dataset_id)
-    if not path.exists():
+    try:
+        df = ingestion.load_dataset(dataset_id)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Dataset not found")
-    return pd.read_csv(path)
+    storage.touch(dataset_id)
+    return df
+
 
+def _ensure_capacity() -> None:
+    """507 when the dataset store is over its quota even after a sweep."""
+    try:
+        storage.ensure_capacity()
+    except OSError as e:
+        if e.errno != errno.ENOSPC:
+            raise
+        raise HTTPException(status_code=507, detail=e.strerror) from e
 
-def _save_dataset(df: pd.DataFrame, dataset_id: str) -> Path:
-    path = _dataset_path(dataset_id)
-    df.to_csv(path, index=False)
-    return path
 
+def _save_dataset(df: pd.DataFrame, dataset_id: str, **metadata) -> str:
+    """All datasets (raw + cleaned) are stored as row-group partitions."""
+    return ingestion.save_dataset(df, dataset_id, **metadata)
 
-def _read_upload_to_df(file: UploadFile) -> pd.DataFrame:
+
+@contextmanager
+def _spooled_upload(file: UploadFile) -> Iterator[Tuple[str, str]]:
+    """
+    Copy an upload to a temporary file, since readers work on paths.
+    Yields (path, extension); the extension of "x.csv.gz" is "csv".
+    """
     name = file.filename or "uploaded"
-    ext = name.rsplit(".", 1)[-1].lower()
+    ext = compressed.data_extension(name)
+    try:
+        get_batch_reader(ext)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: .{ext}")
 
+    with tempfile.NamedTemporaryFile(suffix=f".{ext}", delete=False) as tmp:
+        with instrumentation.span("upload"):
+            shutil.copyfileobj(progress_stream(file.file, "upload", total_bytes=file.size), tmp)
     try:
-        if ext in ("csv", "txt"):
-            return pd.read_csv(file.file)
-        elif ext in ("xlsx", "xls", "xlsm", "ods"):
-            return pd.read_excel(file.file)
-        elif ext in ("json", "jsonl", "ndjson"):
-            return pd.read_json(file.file, lines=ext in ("jsonl", "ndjson"))
-        elif ext in ("parquet",):
-            return pd.read_parquet(file.file)
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type: .{ext}. "
-                f"Use CSV / Excel / JSON / Parquet.",
-            )
+        yield tmp.name, ext
+    finally:
+        os.unlink(tmp.name)
+
+
+@contextmanager
+def _open_source(path: str, ext: str) -> Iterator[Source]:
+    """The file as its reader takes it, decompressing gzip / bz2 / xz / zstd input."""
+    with ExitStack() as stack:
+        try:
+            source = stack.enter_context(compressed.open_source(path, ext))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to decompress file: {e}") from e
+        yield source
+
+
+def _parse_batches(source: Source, ext: str, **options) -> Iterator[pd.DataFrame]:
+    """Batches from the batch reader registered for ext."""
+    try:
+        yield from instrumentation.timed_iter(f"read.{ext}", get_batch_reader(ext)(source, **options))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse file: {e}") from e
+
+
+def _list_keys(path: str, ext: str) -> List[str]:
+    try:
+        return list_keys(path, ext)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to parse file: {e}") from e
 
 
-def _profile_dataframe(df: pd.DataFrame, dataset_id: str) -> DatasetProfileResponse:
-    n_rows, n_cols = df.shape
-    cols: Dict[str, ColumnProfile] = {}
+def _read_upload_to_df(file: UploadFile) -> pd.DataFrame:
+    with _spooled_upload(file) as (path, ext), _open_source(path, ext) as source:
+        return concat_batches(_parse_batches(source, ext))
+
+
+@instrumentation.timed("stats")
+def _shared_stats(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Statistics needed by profiling, quality scoring and cleaning alike.
+    Computing them once lets /analyze scan the frame a single time.
+    """
+    return {
+        "n_missing": df.isna().sum(),
+        "n_unique": df.nunique(dropna=True),
+        "duplicated": df.duplicated(),
+    }
+
+
+def _sample_values(series: pd.Series) -> List[str]:
+    # look for 5 non-null values near the top before scanning the whole column
+    head = series.iloc[:_SAMPLE_SCAN_ROWS].dropna()
+    if len(head) < 5 and len(series) > _SAMPLE_SCAN_ROWS:
+        head = series.dropna()
+    return head.head(5).astype(str).tolist()
 
-    for col in df.columns:
-        series = df[col]
-        n_missing = int(series.isna().sum())
-        pct_missing = float(n_missing / len(series)) * 100 if len(series) else 0.0
-        n_unique = int(series.nunique(dropna=True))
-        sample_vals = (
-            series.dropna().astype(str).head(5).tolist()
-            if len(series.dropna()) > 0
-            else []
+
+@instrumentation.timed("profile")
+def _profile_table(df: pd.DataFrame, stats: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """One row per column with the ColumnProfile fields, computed column-wise."""
+    stats = stats or _shared_stats(df)
+    n_missing = stats["n_missing"].to_numpy(dtype="int64")
+    return pd.DataFrame(
+        {
+            "dtype": df.dtypes.astype(str).to_numpy(),
+            "n_missing": n_missing,
+            "pct_missing": n_missing / len(df) * 100 if len(df) else 0.0,
+            "n_unique": stats["n_unique"].to_numpy(dtype="int64"),
+            "sample_values": [_sample_values(df.iloc[:, i]) for i in range(df.shape[1])],
+            "n_unique_approx": False,
+        },
+        index=df.columns,
+    )
+
+
+def _profile_table_from_stats(stats: Dict[str, Any]) -> pd.DataFrame:
+    """Profile table from incrementally maintained stats (no data scan)."""
+    n_rows = stats["n_rows"]
+    columns = stats["columns"]
+    n_missing = np.array([c["n_missing"] for c in columns.values()], dtype="int64")
+    return pd.DataFrame(
+        {
+            "dtype": [c["dtype"] for c in columns.values()],
+            "n_missing": n_missing,
+            "pct_missing": n_missing / n_rows * 100 if n_rows else 0.0,
+            "n_unique": [estimate_unique(c) for c in columns.values()],
+            "sample_values": [c["samples"] for c in columns.values()],
+            "n_unique_approx": [unique_is_estimate(c) for c in columns.values()],
+        },
+        index=list(columns),
+    )
+
+
+def _profile_response(
+    table: pd.DataFrame, dataset_id: str, n_rows: int, sample: Optional[Dict[str, Any]] = None
+) -> DatasetProfileResponse:
+    column_model = ColumnProfile if sample is None else SampledColumnProfile
+    cols = {
+        col: column_model(**row)
+        for col, row in zip(table.index, table.to_dict(orient="records"))
+    }
+    if sample is not None:
+        return SampledProfileResponse(
+            dataset_id=dataset_id, n_rows=int(n_rows), n_cols=len(cols), columns=cols, sample=sample
         )
+    return DatasetProfileResponse(
+        dataset_id=dataset_id, n_rows=int(n_rows), n_cols=len(cols), columns=cols
+    )
+
+
+def _profile_dataframe(
+    df: pd.DataFrame, dataset_id: str, stats: Optional[Dict[str, Any]] = None
+) -> DatasetProfileResponse:
+    return _profile_response(_profile_table(df, stats), dataset_id, len(df))
 
-        cols[col] = ColumnProfile(
-            dtype=str(series.dtype),
-            n_missing=n_missing,
-            pct_missing=pct_missing,
-            n_unique=n_unique,
-            sample_values=sample_vals,
+
+def _profile_from_stats(stats: Dict[str, Any], dataset_id: str) -> DatasetProfileResponse:
+    """Profile built from incrementally maintained stats (no data scan)."""
+    return _profile_response(_profile_table_from_stats(stats), dataset_id, stats["n_rows"])
+
+
+def _render_profile(
+    table: pd.DataFrame,
+    dataset_id: str,
+    n_rows: int,
+    layout: Optional[str],
+    accept: Optional[str],
+    sample: Optional[Dict[str, Any]] = None,
+):
+    """
+    The profile as the response model, or on the fast path as an Arrow
+    stream (one row per column) or orjson-encoded rows / columnar JSON.
+    Sampled profiles carry the sample description as "sample".
+    """
+    extra = {"sample": sample} if sample is not None else {}
+    if fast_response.wants_arrow(accept):
+        return fast_response.arrow_response(
+            _arrow_table(table.reset_index(names="name")),
+            {"dataset_id": dataset_id, "n_rows": int(n_rows), **extra},
         )
+    if layout is None:
+        return _profile_response(table, dataset_id, n_rows, sample)
 
-    return DatasetProfileResponse(
-        dataset_id=dataset_id,
-        n_rows=int(n_rows),
-        n_cols=int(n_cols),
-        columns=cols,
+    names = [str(c) for c in table.index]
+    if layout == "columnar":
+        columns = {"name": names, **{f: table[f].tolist() for f in table.columns}}
+    else:
+        columns = dict(zip(names, table.to_dict(orient="records")))
+    return fast_response.FastJSONResponse(
+        {
+            "dataset_id": dataset_id,
+            "n_rows": int(n_rows),
+            "n_cols": len(names),
+            "columns": columns,
+            **extra,
+        }
     )
 
 
-def _quality_score(df: pd.DataFrame, dataset_id: str) -> QualityScoreResponse:
+def _preview_records(table: pa.Table) -> List[Dict[str, Optional[str]]]:
+    df = table.to_pandas()
+    return df.astype(str).astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def _arrow_table(df: pd.DataFrame) -> pa.Table:
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # mixed-type object columns are sent as text
+        return pa.Table.from_pandas(df.astype(str), preserve_index=False)
+
+
+def _quality_from_stats(stats: Dict[str, Any], dataset_id: str) -> QualityScoreResponse:
+    """Quality score from incrementally maintained stats (no data scan)."""
+    n_rows, columns = stats["n_rows"], stats["columns"].values()
+    total_cells = n_rows * len(columns) or 1
+    missing_ratio = float(sum(c["n_missing"] for c in columns) / total_cells)
+    duplicate_ratio = (
+        float((n_rows - stats["n_distinct_rows"]) / n_rows) if n_rows else 0.0
+    )
+    n_constant = sum(
+        1 for c in columns if estimate_unique(c) + (c["n_missing"] > 0) == 1
+    )
+    constant_cols_ratio = float(n_constant / max(len(columns), 1))
+    return _score(dataset_id, missing_ratio, duplicate_ratio, constant_cols_ratio)
+
+
+@instrumentation.timed("quality")
+def _quality_score(
+    df: pd.DataFrame, dataset_id: str, stats: Optional[Dict[str, Any]] = None
+) -> QualityScoreResponse:
+    stats = stats or _shared_stats(df)
     total_cells = df.shape[0] * df.shape[1] if df.size else 1
-    missing_ratio = float(df.isna().sum().sum() / total_cells)
+    missing_ratio = float(stats["n_missing"].sum() / total_cells)
 
-    duplicate_ratio = float(df.duplicated().mean()) if len(df) > 0 else 0.0
+    duplicate_ratio = float(stats["duplicated"].mean()) if len(df) > 0 else 0.0
 
-    nunique = df.nunique(dropna=False)
+    # nunique(dropna=False) counts NaN as one extra distinct value
+    nunique = stats["n_unique"] + (stats["n_missing"] > 0).astype(int)
     constant_cols_ratio = float((nunique == 1).sum() / max(len(nunique), 1))
+    return _score(dataset_id, missing_ratio, duplicate_ratio, constant_cols_ratio)
 
+
+def _score(
+    dataset_id: str,
+    missing_ratio: float,
+    duplicate_ratio: float,
+    constant_cols_ratio: float,
+) -> QualityScoreResponse:
     # Simple scoring formula – you can tweak weights
     score = 100.0
     score -= missing_ratio * 40.0
@@ -152,92 +437,137 @@ def _quality_score(df: pd.DataFrame, dataset_id: str) -> QualityScoreResponse:
     return QualityScoreResponse(dataset_id=dataset_id, quality_score=score, metrics=metrics)
 
 
-def _clean_dataframe(df: pd.DataFrame):
-    n_rows_before = len(df)
-    n_missing_before = int(df.isna().sum().sum())
+def _exact_profile(dataset_id: str) -> Tuple[pd.DataFrame, int]:
+    """Profile table and row count, from maintained stats when there are any."""
+    stats = incremental.dataset_stats(dataset_id)
+    if stats is None:
+        paths = _dataset_paths(dataset_id)
+        if len(paths) > 1:
+            stats, _ = parallel.scan_partitions([str(p) for p in paths])
+    if stats is not None:
+        return _profile_table_from_stats(stats), stats["n_rows"]
+    df = _load_dataset(dataset_id)
+    return _profile_table(df), len(df)
 
-    # 1) drop duplicates
-    duplicate_rows_removed = int(df.duplicated().sum())
-    df = df.drop_duplicates()
 
-    # 2) impute missing
-    num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-    cat_cols = [c for c in df.columns if c not in num_cols]
+def _exact_quality(dataset_id: str) -> QualityScoreResponse:
+    stats = incremental.dataset_stats(dataset_id)
+    if stats is None:
+        paths = _dataset_paths(dataset_id)
+        if len(paths) > 1:
+            stats, _ = parallel.scan_partitions([str(p) for p in paths])
+    if stats is not None:
+        return _quality_from_stats(stats, dataset_id)
+    return _quality_score(_load_dataset(dataset_id), dataset_id)
 
-    for col in num_cols:
-        median = df[col].median()
-        df[col] = df[col].fillna(median)
 
-    for col in cat_cols:
-        mode = df[col].mode(dropna=True)
-        fill_value = mode.iloc[0] if not mode.empty else ""
-        df[col] = df[col].fillna(fill_value)
+def _exact_profile_record(dataset_id: str) -> Dict[str, Any]:
+    """The exact profile as stored for sampled requests."""
+    table, n_rows = _exact_profile(dataset_id)
+    return {"n_rows": int(n_rows), "table": table.reset_index(names="name").to_dict(orient="records")}
 
-    # 3) remove numeric outliers using z-score > 3
-    outlier_rows_removed = 0
-    if num_cols:
-        z = np.abs(
-            (df[num_cols] - df[num_cols].mean())
-            / df[num_cols].std(ddof=0).replace(0, np.nan)
-        )
-        outlier_mask = (z > 3).any(axis=1)
-        outlier_rows_removed = int(outlier_mask.sum())
-        df = df.loc[~outlier_mask].copy()
-
-    n_rows_after = len(df)
-    n_missing_after = int(df.isna().sum().sum())
-
-    return (
-        df,
-        n_rows_before,
-        n_rows_after,
-        n_missing_before,
-        n_missing_after,
-        duplicate_rows_removed,
-        outlier_rows_removed,
-    )
 
+def _check_sample(rows: int) -> None:
+    if not 0 < rows <= sampling.SAMPLE_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"sample must be in 1..{sampling.SAMPLE_MAX_ROWS}")
 
-# ========= Routes =========
-@router.post("/upload", response_model=dict)
-async def upload_dataset(file: UploadFile = File(...)):
+
+def _sample_info(info: Dict[str, Any], exact_status: str) -> Dict[str, Any]:
+    keys = ("method", "n_sampled", "fraction", "n_rows_exact")
+    return {**{k: info[k] for k in keys}, "exact_status": exact_status}
+
+
+@instrumentation.timed("profile.sampled")
+def _sampled_profile(dataset_id: str, rows: int, layout: Optional[str], accept: Optional[str]):
     """
-    Upload a CSV / Excel / JSON / Parquet file.
-    It is parsed with pandas and stored internally as CSV.
+    The exact profile if it has been computed, else an estimate from a
+    sample of about `rows` rows (scheduling the exact one). Missing counts
+    are scaled up with 95% intervals; n_unique and sample values are the
+    sample's own.
     """
-    df = _read_upload_to_df(file)
-    dataset_id = str(uuid4())
-    _save_dataset(df, dataset_id)
-    return {"dataset_id": dataset_id}
+    paths = [str(p) for p in _dataset_paths(dataset_id)]
+    cached = sampling.load_exact("profile", dataset_id, paths)
+    if cached is not None:
+        table = pd.DataFrame(cached["table"]).set_index("name").rename_axis(None)
+        return _render_profile(table, dataset_id, cached["n_rows"], layout, accept)
 
+    df, info = sampling.sample_dataset(paths, rows)
+    if info["fraction"] >= 1:
+        return _render_profile(_profile_table(df), dataset_id, len(df), layout, accept)
 
-@router.get("/{dataset_id}/profile", response_model=DatasetProfileResponse)
-async def get_dataset_profile(dataset_id: str):
-    df = _load_dataset(dataset_id)
-    return _profile_dataframe(df, dataset_id)
+    status = sampling.schedule_exact(
+        "profile", dataset_id, paths, lambda: _exact_profile_record(dataset_id)
+    )
+    n_rows = info["n_rows"]
+    missing = sampling.missing_ratios(df, info)
+    table = _profile_table(df)
+    table["n_unique_approx"] = True
+    table["n_missing"] = (missing["ratio"] * n_rows).round().astype("int64")
+    table["pct_missing"] = missing["ratio"] * 100
+    table["pct_missing_ci"] = [[lo * 100, hi * 100] for lo, hi in zip(missing["low"], missing["high"])]
+    return _render_profile(table, dataset_id, n_rows, layout, accept, _sample_info(info, status))
 
 
-@router.get("/{dataset_id}/quality_score", response_model=QualityScoreResponse)
-async def get_quality_score(dataset_id: str):
-    df = _load_dataset(dataset_id)
-    return _quality_score(df, dataset_id)
+@instrumentation.timed("quality.sampled")
+def _sampled_quality(dataset_id: str, rows: int) -> QualityScoreResponse:
+    """
+    The exact quality score if it has been computed, else an estimate from
+    a sample of about `rows` rows (scheduling the exact one). The score's
+    interval spans the missing and duplicate ratio intervals; columns
+    constant in the sample count as constant.
+    """
+    paths = [str(p) for p in _dataset_paths(dataset_id)]
+    cached = sampling.load_exact("quality", dataset_id, paths)
+    if cached is not None:
+        return QualityScoreResponse(**cached)
 
+    df, info = sampling.sample_dataset(paths, rows)
+    if info["fraction"] >= 1:
+        return _quality_score(df, dataset_id)
 
-@router.post("/{dataset_id}/clean", response_model=CleaningResult)
-async def clean_dataset(dataset_id: str):
-    df = _load_dataset(dataset_id)
-    (
-        cleaned_df,
-        n_rows_before,
-        n_rows_after,
-        n_missing_before,
-        n_missing_after,
-        duplicate_rows_removed,
-        outlier_rows_removed,
-    ) = _clean_dataframe(df)
+    status = sampling.schedule_exact(
+        "quality", dataset_id, paths, lambda: _exact_quality(dataset_id).model_dump()
+    )
+    missing, missing_ci = sampling.overall_missing_ratio(df, info)
+    duplicates, duplicates_ci = sampling.duplicate_ratio(df, info)
+    constant = sampling.constant_columns(df)
+    constant_ratio = len(constant) / max(df.shape[1], 1)
+    estimate = _score(dataset_id, missing, duplicates, constant_ratio)
+    # the score falls as the ratios rise
+    low = _score(dataset_id, missing_ci[1], duplicates_ci[1], constant_ratio).quality_score
+    high = _score(dataset_id, missing_ci[0], duplicates_ci[0], constant_ratio).quality_score
+    return SampledQualityResponse(
+        **estimate.model_dump(),
+        sample=_sample_info(info, status),
+        intervals={
+            "missing_ratio": missing_ci,
+            "duplicate_ratio": duplicates_ci,
+            "quality_score": [low, high],
+        },
+        constant_columns=constant,
+    )
+
+
+def _cleaning_result(
+    dataset_id: str,
+    source: clean_plan.PlanSource,
+    stats: Optional[Dict[str, Any]] = None,
+    options: Optional[CleaningOptions] = None,
+    engine: str = "pandas",
+    streaming: bool = False,
+) -> CleaningResult:
+    """Clean source with the plan engine, store the result under a new id and build the summary."""
+    result = clean_plan.run_plan(
+        options or CleaningOptions(), source, engine, stats=stats, streaming=streaming
+    )
+    cleaned_df = result["frame"]
+    steps = {r["step"]: r for r in result["steps"]}
+
+    def removed(step: str) -> int:
+        return steps[step]["rows_in"] - steps[step]["rows_out"] if step in steps else 0
 
     cleaned_id = str(uuid4())
-    _save_dataset(cleaned_df, cleaned_id)
+    _save_dataset(cleaned_df, cleaned_id, source_dataset_id=dataset_id)
 
     preview_rows = (
         cleaned_df.head(20).astype(str).to_dict(orient="records")  # small preview
@@ -246,26 +576,695 @@ async def clean_dataset(dataset_id: str):
     return CleaningResult(
         source_dataset_id=dataset_id,
         cleaned_dataset_id=cleaned_id,
-        n_rows_before=n_rows_before,
-        n_rows_after=n_rows_after,
-        n_missing_before=n_missing_before,
-        n_missing_after=n_missing_after,
-        duplicate_rows_removed=duplicate_rows_removed,
-        outlier_rows_removed=outlier_rows_removed,
+        n_rows_before=result["n_rows_before"],
+        n_rows_after=len(cleaned_df),
+        n_missing_before=result["n_missing_before"],
+        n_missing_after=int(cleaned_df.isna().sum().sum()),
+        duplicate_rows_removed=removed("deduplicate"),
+        outlier_rows_removed=removed("outliers"),
         preview_rows=preview_rows,
+        engine=engine,
+        steps=result["steps"],
+    )
+
+
+def _cleaning_result_partitioned(
+    dataset_id: str,
+    paths: List[Path],
+    hashes: Optional[List[np.ndarray]] = None,
+    options: Optional[CleaningOptions] = None,
+) -> CleaningResult:
+    """Clean a multi-partition dataset in the worker pool."""
+    cleaned_id = str(uuid4())
+    result = parallel.clean_partitions(
+        [str(p) for p in paths],
+        options or CleaningOptions(),
+        cleaned_id,
+        hashes,
+        source_dataset_id=dataset_id,
+    )
+    return CleaningResult(
+        source_dataset_id=dataset_id,
+        cleaned_dataset_id=cleaned_id,
+        n_rows_before=result["n_rows_before"],
+        n_rows_after=result["n_rows_after"],
+        n_missing_before=result["n_missing_before"],
+        n_missing_after=result["n_missing_after"],
+        duplicate_rows_removed=result["duplicate_rows_removed"],
+        outlier_rows_removed=result["outlier_rows_removed"],
+        preview_rows=result["preview"].astype(str).to_dict(orient="records"),
+        steps=result["steps"],
+    )
+
+
+def _clean(
+    dataset_id: str,
+    options: Optional[CleaningOptions] = None,
+    engine: str = "pandas",
+    streaming: bool = False,
+) -> CleaningResult:
+    """
+    Clean a dataset, or return the memoized result if its content was
+    already cleaned with the same options and engine.
+    """
+    options = options or CleaningOptions()
+    paths = _dataset_paths(dataset_id)
+
+    def run() -> CleaningResult:
+        if engine == "pandas" and len(paths) > 1:
+            # pandas cleans multi-partition datasets partition by partition in the pool
+            return _cleaning_result_partitioned(dataset_id, paths, options=options)
+        return _cleaning_result(
+            dataset_id, [str(p) for p in paths], options=options, engine=engine, streaming=streaming
+        )
+
+    return _memoized_clean(dataset_id, options, engine, run)
+
+
+def _memoized_clean(
+    dataset_id: str,
+    options: CleaningOptions,
+    engine: str,
+    run: Callable[[], CleaningResult],
+) -> CleaningResult:
+    """
+    The memoized result of cleaning dataset_id with options and engine,
+    else run()'s result, memoized. A hit reports no step timings: they
+    belong to the run that produced it.
+    """
+    key = clean_memo.memo_key(dataset_id, options, engine)
+    summary = clean_memo.lookup(key)
+    if summary is not None:
+        steps = [{**step, "seconds": None} for step in summary.get("steps", [])]
+        # may come from an identical dataset under another id
+        return CleaningResult(
+            **{**summary, "source_dataset_id": dataset_id, "steps": steps, "memoized": True}
+        )
+    result = run()
+    clean_memo.store(key, result.model_dump())
+    return result
+
+
+def _iter_csv(paths: List[Path], block_size: int = 1 << 20) -> Iterable[bytes]:
+    """Concatenate partitions into one CSV byte stream (one header line)."""
+    for i, path in enumerate(paths):
+        if path.suffix != ".csv":
+            df = ingestion.read_partition(str(path))
+            yield df.to_csv(index=False, header=i == 0).encode("utf-8")
+            continue
+        with open(path, "rb") as f:
+            if i > 0:
+                f.readline()  # header already sent
+            while block := f.read(block_size):
+                yield block
+
+
+def _format_event(stage: str, data: Dict[str, Any], fmt: str) -> str:
+    payload = json.dumps({"stage": stage, "data": data}, default=str)
+    if fmt == "sse":
+        return f"event: {stage}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def _event_stream(
+    events: Iterable[Tuple[str, Dict[str, Any]]], fmt: str
+) -> StreamingResponse:
+    """Stream (stage, data) pairs as NDJSON lines or server-sent events."""
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        (_format_event(stage, data, fmt) for stage, data in events),
+        media_type=media_type,
     )
 
 
+def _format_frames(frames: Iterable[pd.DataFrame], fmt: str) -> Iterator[str]:
+    for i, df in enumerate(frames):
+        if fmt == "csv":
+            yield df.to_csv(index=False, header=i == 0)
+        elif len(df):
+            yield df.to_json(orient="records", lines=True, date_format="iso")
+
+
+def _query(request: QueryRequest, tables: Optional[Dict[str, str]]):
+    """Run a query and stream its result, or store it as a new dataset."""
+    # the datasets queried count as used (ids are UUIDs, see query_engine)
+    for dataset_id in ingestion.list_datasets():
+        if dataset_id in request.sql or dataset_id in (tables or {}).values():
+            storage.touch(dataset_id)
+    try:
+        if request.save:
+            return {"dataset_id": query_engine.save_query(request.sql, tables)}
+        frames = query_engine.iter_query(request.sql, tables)
+        # runs the query, so errors become 4xx before streaming starts
+        first = next(frames)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {e}") from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Query failed: {e}") from e
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e)) from e
+
+    media_type = "text/csv" if request.format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _format_frames(itertools.chain([first], frames), request.format),
+        media_type=media_type,
+    )
+
+
+def _ingest_file(
+    path: str,
+    ext: str,
+    key: Optional[str] = None,
+    all_keys: bool = False,
+    where: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    **metadata,
+) -> Dict[str, Any]:
+    _ensure_capacity()
+    # batches are written out as partitions fill up, so the whole file
+    # never has to fit in memory
+    hdf_options = {k: v for k, v in (("where", where), ("columns", columns)) if v}
+    if hdf_options and ext not in HDF_EXTENSIONS:
+        raise HTTPException(
+            status_code=400, detail="where / columns only apply to HDF5 tables"
+        )
+    with _open_source(path, ext) as source:
+        if not has_keys(ext):
+            if key is not None or all_keys:
+                raise HTTPException(
+                    status_code=400, detail=f".{ext} files have no sheets or keys"
+                )
+            return {
+                "dataset_id": ingestion.save_batches(
+                    _parse_batches(source, ext), str(uuid4()), **metadata
+                )
+            }
+
+        # container formats are not streaming readers: source is a path
+        keys = _list_keys(source, ext)
+        if all_keys:
+            # one key per worker process
+            try:
+                dataset_ids = parallel.save_keys(source, ext, keys, hdf_options, **metadata)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to parse file: {e}") from e
+            datasets = [{"key": k, "dataset_id": d} for k, d in zip(keys, dataset_ids)]
+            return {"datasets": datasets, "available_keys": keys}
+
+        try:
+            k = pick_key(key, keys, "sheet or key")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        dataset_id = ingestion.save_batches(
+            _parse_batches(source, ext, key=k, **hdf_options),
+            str(uuid4()),
+            source_key=k,
+            **metadata,
+        )
+    return {"key": k, "dataset_id": dataset_id, "available_keys": keys}
+
+
+def _ingest_upload(file: UploadFile, *args) -> Dict[str, Any]:
+    with _spooled_upload(file) as (path, ext):
+        return _ingest_file(path, ext, *args)
+
+
+def _complete_upload(upload_id: str, *args) -> Dict[str, Any]:
+    try:
+        path, ext, digest = uploads.complete_upload(upload_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    result = _ingest_file(path, ext, *args, upload_digest=digest)
+    # kept on failure, so a completion with other options can be retried
+    uploads.discard_upload(upload_id)
+    return {**result, "upload_digest": digest}
+
+
+# ========= Routes =========
+@router.post("/upload", response_model=dict)
+async def upload_dataset(
+    file: UploadFile = File(...),
+    progress: Optional[Literal["ndjson", "sse"]] = None,
+    key: Optional[str] = None,
+    all_keys: bool = False,
+    where: Optional[str] = None,
+    columns: Optional[str] = None,
+):
+    """
+    Upload a file in any format with a registered reader (CSV / Excel /
+    JSON / Parquet / XML / PDF / ...). It is parsed in batches and stored
+    as row-group partitions. gzip / bz2 / xz / zstd input (detected from
+    its content; name it e.g. "x.csv.gz") is decompressed while parsing.
+    For workbooks and other multi-table files, ?key= picks the sheet
+    (default: the first) and ?all_keys=true stores every sheet as its own
+    dataset, in parallel, returned as {"datasets": [{"key", "dataset_id"}, ...]};
+    the response lists the file's "available_keys" either way (sheets,
+    HDF5 keys, MAT variables or zip archive members), read from metadata
+    without loading data.
+    For table-format HDF5, ?where= (a PyTables query such as "a > 5") and
+    ?columns=a,b are applied while reading.
+    With ?progress=ndjson or ?progress=sse the response streams progress
+    events (stage, rows, bytes_read, eta_s) and ends with a "done" event
+    carrying {"dataset_id": ...}.
+    """
+    column_list = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    args = (file, key, all_keys, where, column_list)
+    if progress:
+        return _event_stream(run_with_progress(_ingest_upload, *args), progress)
+    # parsing (and OCR) is blocking work; keep it off the event loop
+    return await run_in_threadpool(_ingest_upload, *args)
+
+
+@router.post("/uploads", response_model=dict)
+def create_resumable_upload(request: ResumableUploadRequest):
+    """
+    Start a resumable upload of a large file: send its parts with
+    PUT /uploads/{upload_id}/parts/{n}, check what arrived with
+    GET /uploads/{upload_id}, then POST /uploads/{upload_id}/complete.
+    Returns the upload_id, part_size and n_parts.
+    """
+    _ensure_capacity()
+    try:
+        return uploads.create_upload(request.filename, request.total_bytes, request.part_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.put("/uploads/{upload_id}/parts/{part_number}", response_model=dict)
+async def upload_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    checksum: Optional[str] = Header(None, alias="X-Checksum-SHA256"),
+):
+    """
+    Upload one part as the raw request body (part_size bytes; the last part
+    holds the rest). It is staged, then copied to its offset in the
+    upload's file once verified. With an X-Checksum-SHA256 header (hex) a
+    corrupted part is rejected with 400 and can simply be sent again; a
+    part received before stays intact until a resend of it is verified.
+    """
+    try:
+        # file I/O stays off the event loop
+        writer = await run_in_threadpool(uploads.open_part, upload_id, part_number)
+        try:
+            async for chunk in request.stream():
+                await run_in_threadpool(writer.write, chunk)
+            return await run_in_threadpool(writer.commit, checksum)
+        finally:
+            await run_in_threadpool(writer.close)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.get("/uploads/{upload_id}", response_model=dict)
+def get_resumable_upload(upload_id: str):
+    """The upload's parameters, the parts received (size, sha256) and the parts missing."""
+    try:
+        return uploads.upload_status(upload_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=dict)
+async def complete_resumable_upload(
+    upload_id: str,
+    progress: Optional[Literal["ndjson", "sse"]] = None,
+    key: Optional[str] = None,
+    all_keys: bool = False,
+    where: Optional[str] = None,
+    columns: Optional[str] = None,
+):
+    """
+    Ingest a fully received upload exactly as /upload would (same query
+    options) and remove it. The response adds "upload_digest", the SHA-256
+    of the part digests suffixed with the part count.
+    """
+    column_list = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    args = (upload_id, key, all_keys, where, column_list)
+    if progress:
+        return _event_stream(run_with_progress(_complete_upload, *args), progress)
+    return await run_in_threadpool(_complete_upload, *args)
+
+
+@router.delete("/uploads/{upload_id}", response_model=dict)
+def abort_resumable_upload(upload_id: str):
+    try:
+        uploads.discard_upload(upload_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    return {"upload_id": upload_id, "deleted": True}
+
+
+def _ingest_sql(request: SQLiteIngestRequest) -> Dict[str, Any]:
+    _ensure_capacity()
+    try:
+        dataset_id = sql_loader.load_from_sqlite(request.db_path, request.query, request.params)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except (sqlite3.Error, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Query failed: {e}") from e
+    return {"dataset_id": dataset_id}
+
+
+@router.post("/sql", response_model=dict)
+def ingest_sql(
+    request: SQLiteIngestRequest,
+    progress: Optional[Literal["ndjson", "sse"]] = None,
+):
+    """
+    Ingest the result of a read-only, parameterized SQLite query as a new
+    dataset. Rows are fetched in batches and written straight into
+    partitions, so extracts of any size run in bounded memory.
+    ?progress= streams progress events as for /upload.
+    """
+    if progress:
+        return _event_stream(run_with_progress(_ingest_sql, request), progress)
+    return _ingest_sql(request)
+
+
+@router.post("/sql/sources", response_model=dict)
+def register_sql_source(request: SQLSourceRequest):
+    """
+    Ingest a SQLite query as a new dataset and register it as a source
+    that POST /{dataset_id}/sync refreshes incrementally: each sync fetches
+    only rows whose watermark_column is past the largest value seen so far.
+    """
+    _ensure_capacity()
+    try:
+        return sql_loader.register_source(
+            request.db_path, request.query, request.watermark_column, request.params
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except (sqlite3.Error, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Query failed: {e}") from e
+
+
+@router.get("/tables", response_model=list)
+def list_tables():
+    """
+    The catalog's datasets as SQL tables: [{"dataset_id", "columns":
+    {name: arrow type}}], read from partition metadata.
+    """
+    return query_engine.describe_tables(ingestion.list_datasets())
+
+
+@router.get("/storage", response_model=dict)
+def storage_usage():
+    """
+    Size of the dataset store (bytes_used, quota_bytes), its datasets
+    (derived, pinned and cold-compressed counts), stray files awaiting
+    collection and the last sweep's outcome.
+    """
+    return storage.storage_report()
+
+
+@router.post("/storage/sweep", response_model=dict)
+async def sweep_storage():
+    """
+    Run a storage sweep now: expire datasets past their TTL, collect
+    orphaned derived datasets and stray files, recompress cold datasets
+    and enforce the quota. Returns the ids affected per step and the
+    bytes freed, or {"skipped": true} if a sweep is already running.
+    """
+    return await run_in_threadpool(storage.sweep)
+
+
+@router.post("/query")
+def query_datasets(request: QueryRequest):
+    """
+    Run a SQL SELECT over stored datasets (in an embedded DuckDB). Tables
+    are dataset ids (quoted: FROM "3f2c...") or the aliases given in
+    "tables", so several datasets can be joined. Only the columns and
+    row groups a query needs are read, and aggregations run in the engine.
+    The result is streamed as NDJSON or CSV ("format"), or with
+    "save": true stored as a new dataset, returned as {"dataset_id": ...}.
+    """
+    return _query(request, request.tables)
+
+
+@router.post("/{dataset_id}/query")
+def query_dataset(dataset_id: str, request: QueryRequest):
+    """POST /query with this dataset available as the table "data"."""
+    _dataset_paths(dataset_id)
+    return _query(request, {"data": dataset_id, **(request.tables or {})})
+
+
+@router.get(
+    "/{dataset_id}/profile",
+    response_model=Union[SampledProfileResponse, DatasetProfileResponse],
+)
+def get_dataset_profile(
+    dataset_id: str,
+    layout: Layout = None,
+    accept: Optional[str] = Header(None),
+    sample: Optional[int] = None,
+):
+    """
+    Per-column profile. For wide datasets, ?layout=rows or ?layout=columnar
+    skips the response model and encodes plain lists with orjson, and
+    "Accept: application/vnd.apache.arrow.stream" returns an Arrow IPC
+    stream with one row per column (dataset_id / n_rows in its metadata).
+    ?sample=N answers from a block sample of about N rows instead of a
+    full scan: missing counts are estimates with a 95% interval
+    (pct_missing_ci) and "sample" describes the sample. The exact profile
+    is computed in the background and returned once it is ready.
+    n_unique is counted exactly except where n_unique_approx is true: in
+    sampled profiles, and for columns with more distinct values than the
+    sketches behind appended / multi-partition datasets hold exactly
+    (dataset_stats.SKETCH_SIZE), where it is an estimate within about 3%.
+    """
+    if sample is not None:
+        _check_sample(sample)
+        return _sampled_profile(dataset_id, sample, layout, accept)
+    table, n_rows = _exact_profile(dataset_id)
+    return _render_profile(table, dataset_id, n_rows, layout, accept)
+
+
+@router.get(
+    "/{dataset_id}/quality_score",
+    response_model=Union[SampledQualityResponse, QualityScoreResponse],
+)
+def get_quality_score(
+    dataset_id: str, accept: Optional[str] = Header(None), sample: Optional[int] = None
+):
+    """
+    The quality score; as a one-row Arrow IPC stream if the client accepts one.
+    ?sample=N estimates it from a block sample of about N rows, with 95%
+    intervals for the missing / duplicate ratios and the score, and the
+    columns constant in the sample (each with an upper bound on the share
+    of rows that could differ). The exact score is computed in the
+    background and returned once it is ready.
+    """
+    if sample is not None:
+        _check_sample(sample)
+        quality = _sampled_quality(dataset_id, sample)
+    else:
+        quality = _exact_quality(dataset_id)
+
+    if fast_response.wants_arrow(accept):
+        row = {"dataset_id": dataset_id, "quality_score": quality.quality_score, **quality.metrics}
+        metadata = None
+        if isinstance(quality, SampledQualityResponse):
+            for name, (low, high) in quality.intervals.items():
+                row.update({f"{name}_low": low, f"{name}_high": high})
+            metadata = {
+                "sample": quality.sample.model_dump(),
+                "constant_columns": quality.constant_columns,
+            }
+        return fast_response.arrow_response(pa.Table.from_pylist([row]), metadata)
+    return quality
+
+
+@router.get("/{dataset_id}/preview")
+def preview_dataset(
+    dataset_id: str,
+    rows: int = 20,
+    layout: Layout = None,
+    accept: Optional[str] = Header(None),
+):
+    """
+    The first rows of a dataset, read from the start of its partitions
+    only. By default a list of records with values as strings (missing
+    values as null); ?layout=rows / columnar sends native
+    values ({"columns": [...], "data": {column: [...]}} when columnar), and
+    an Arrow-accepting client gets the rows as an Arrow IPC stream.
+    """
+    if not 0 < rows <= _MAX_PREVIEW_ROWS:
+        raise HTTPException(status_code=400, detail=f"rows must be in 1..{_MAX_PREVIEW_ROWS}")
+    try:
+        table = ingestion.open_dataset(dataset_id).head(rows)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    storage.touch(dataset_id)
+
+    if fast_response.wants_arrow(accept):
+        return fast_response.arrow_response(table)
+    if layout == "columnar":
+        return fast_response.FastJSONResponse(
+            {"columns": table.column_names, "data": table.to_pydict()}
+        )
+    if layout == "rows":
+        return fast_response.FastJSONResponse(table.to_pylist())
+    return _preview_records(table)
+
+
+@router.post("/{dataset_id}/clean", response_model=CleaningResult)
+async def clean_dataset(
+    dataset_id: str,
+    options: Optional[CleaningOptions] = None,
+    progress: Optional[Literal["ndjson", "sse"]] = None,
+    engine: str = "pandas",
+    streaming: bool = False,
+):
+    """
+    Clean a dataset into a new one (default options unless a body is
+    given). Cleaning the same content with the same options and engine
+    again returns the existing cleaned dataset ("memoized": true).
+    The options are compiled into a plan of steps run by ?engine=pandas
+    (default) or ?engine=polars (one fused lazy query; add ?streaming=true
+    for Polars' multithreaded streaming engine). The result lists each
+    step with its rows in / out and timing.
+    """
+    try:
+        clean_plan.get_engine(engine)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    args = (dataset_id, options, engine, streaming)
+    if progress:
+        _dataset_paths(dataset_id)  # 404 before the stream starts
+        return _event_stream(run_with_progress(_clean, *args), progress)
+
+    return await run_in_threadpool(_clean, *args)
+
+
+@router.post("/{dataset_id}/append", response_model=AppendResult)
+def append_to_dataset(
+    dataset_id: str,
+    file: UploadFile = File(...),
+    drift_threshold: Optional[float] = None,
+):
+    """
+    Append the uploaded rows to an existing dataset as a new partition.
+    Stats are updated from the new rows only and only they are cleaned
+    (against the baseline of the last full clean) into the dataset's
+    cleaned output; a full re-clean happens when the new rows' numeric
+    means drift more than drift_threshold baseline std devs.
+    """
+    _dataset_paths(dataset_id)
+    batch = _read_upload_to_df(file)
+    try:
+        summary = incremental.append_rows(dataset_id, batch, drift_threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return AppendResult(**summary)
+
+
+@router.post("/{dataset_id}/sync", response_model=dict)
+def sync_sql_source(dataset_id: str):
+    """
+    Append the rows of a registered SQL source past its stored watermark
+    as new partitions (stats and cleaned output updated as for /append).
+    """
+    _dataset_paths(dataset_id)
+    try:
+        return sql_loader.sync_source(dataset_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except (sqlite3.Error, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Sync failed: {e}") from e
+
+
+@router.patch("/{dataset_id}/lifecycle", response_model=dict)
+def update_lifecycle(dataset_id: str, request: LifecycleRequest):
+    """
+    Set a dataset's own TTL (seconds unused before a sweep deletes it; 0
+    keeps it forever) and / or pin it, exempting it from every sweep.
+    Returns the resulting ttl_s, pinned and last_used.
+    """
+    try:
+        return storage.set_lifecycle(dataset_id, request.ttl_s, request.pinned)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.post("/{dataset_id}/analyze", response_model=AnalysisResponse)
+def analyze_dataset(
+    dataset_id: str, stream: Optional[Literal["ndjson", "sse"]] = None
+):
+    """
+    Profile, score and clean a dataset in one pass.
+    The file is loaded once and the shared statistics (missing counts,
+    unique counts, duplicate mask) are computed once for all three stages.
+    With ?stream=ndjson or ?stream=sse each stage is emitted as it finishes.
+    Cleaning (with the default options) goes through the clean memo like
+    /clean, so analysing the same content again reuses its cleaned dataset.
+    """
+    paths = _dataset_paths(dataset_id)
+    if len(paths) > 1:
+        return _analyze_partitioned(dataset_id, paths, stream)
+
+    df = _load_dataset(dataset_id)
+    stats = _shared_stats(df)
+
+    def stages():
+        yield "profile", _profile_dataframe(df, dataset_id, stats).model_dump()
+        yield "quality", _quality_score(df, dataset_id, stats).model_dump()
+        cleaning = _memoized_clean(
+            dataset_id,
+            CleaningOptions(),
+            "pandas",
+            lambda: _cleaning_result(dataset_id, df, stats),
+        )
+        yield "cleaning", cleaning.model_dump()
+
+    if stream:
+        return _event_stream(stages(), stream)
+    return AnalysisResponse(**dict(stages()))
+
+
+def _analyze_partitioned(dataset_id: str, paths: List[Path], stream: Optional[str]):
+    """/analyze for multi-partition datasets: one parallel scan shared by all stages."""
+
+    def stages():
+        stats, hashes = parallel.scan_partitions([str(p) for p in paths])
+        yield "profile", _profile_from_stats(stats, dataset_id).model_dump()
+        yield "quality", _quality_from_stats(stats, dataset_id).model_dump()
+        cleaning = _memoized_clean(
+            dataset_id,
+            CleaningOptions(),
+            "pandas",
+            lambda: _cleaning_result_partitioned(dataset_id, paths, hashes),
+        )
+        yield "cleaning", cleaning.model_dump()
+
+    if stream:
+        return _event_stream(stages(), stream)
+    return AnalysisResponse(**dict(stages()))
+
+
 @router.get("/{dataset_id}/download")
 async def download_dataset(dataset_id: str):
     """
     Download the (raw or cleaned) dataset as CSV.
+    Partitioned datasets are streamed as one CSV.
     """
-    path = _dataset_path(dataset_id)
-    if not path.exists():
-        raise HTTPException(status_code=404, detail="Dataset not found")
-    return FileResponse(
-        path,
+    paths = _dataset_paths(dataset_id)
+    if len(paths) == 1 and paths[0].suffix == ".csv":
+        return FileResponse(
+            paths[0],
+            media_type="text/csv",
+            filename=f"{dataset_id}.csv",
+        )
+    return StreamingResponse(
+        instrumentation.timed_iter("download", _iter_csv(paths)),
         media_type="text/csv",
-        filename=f"{dataset_id}.csv",
+        headers={"Content-Disposition": f'attachment; filename="{dataset_id}.csv"'},
     )
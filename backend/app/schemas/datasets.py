@@ -1,6 +1,6 @@
 # app/schemas/datasets.py
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel
 from typing import Literal
 
@@ -49,6 +49,29 @@ class CleaningResult(BaseModel):
     outlier_rows_removed: int
     preview_rows: List[Dict[str, Optional[str]]]  # first few rows of cleaned data
 
+class ResumableUploadRequest(BaseModel):
+    filename: str                      # extension picks the reader, as for /upload
+    total_bytes: int
+    part_size: Optional[int] = None    # default UPLOAD_PART_SIZE
+
+
 class SQLiteIngestRequest(BaseModel):
     db_path: str   # e.g. 'C:/Users/.../mydb.sqlite'
-    query: str     # e.g. 'SELECT * FROM my_table'
+    query: str     # e.g. 'SELECT * FROM my_table WHERE year = ?'
+    params: Optional[Union[List[Any], Dict[str, Any]]] = None  # bound to ? / :name placeholders
+
+
+class SQLSourceRequest(SQLiteIngestRequest):
+    watermark_column: str  # monotonic id or updated_at column; syncs fetch rows past its max
+
+
+class QueryRequest(BaseModel):
+    sql: str                                # one SELECT; datasets are tables named by id
+    tables: Optional[Dict[str, str]] = None  # alias -> dataset_id
+    format: Literal["ndjson", "csv"] = "ndjson"
+    save: bool = False                      # store the result as a new dataset instead
+
+
+class LifecycleRequest(BaseModel):
+    ttl_s: Optional[int] = None     # seconds unused before deletion (0: never); omitted: unchanged
+    pinned: Optional[bool] = None   # pinned datasets are never deleted by sweeps
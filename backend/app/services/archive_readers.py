@@ -0,0 +1,93 @@
+# app/services/archive_readers.py
+"""
+Zip archives as containers: each member in a format with a reader is a
+key (its name inside the archive), so ?key= picks a member and
+?all_keys=true ingests every member as its own dataset. Members are
+decompressed as they are read - streaming readers consume the member
+stream directly, other formats get a temporary copy of that one member -
+and compressed members (e.g. "2024/sales.csv.gz") are decompressed too.
+
+Images are OCR'd together as one table of (file, text) rows under the
+key "images", as the image-archive reader always did.
+"""
+
+import os
+import tempfile
+import zipfile
+from typing import IO, Iterator, List, Optional
+
+import pandas as pd
+
+from .compressed import data_extension, stream_source
+from .ingestion_base import get_batch_reader, pick_key, register_batch_reader, register_key_lister
+
+try:
+    from .ocr import IMAGE_EXTENSIONS, ocr_images
+except ImportError:  # OCR needs Pillow / numpy
+    IMAGE_EXTENSIONS, ocr_images = [], None
+
+IMAGES_KEY = "images"
+
+
+def _is_hidden(name: str) -> bool:
+    # macOS resource forks and dotfiles that archivers add
+    return name.startswith("__MACOSX/") or os.path.basename(name).startswith(".")
+
+
+def _members(zf: zipfile.ZipFile) -> tuple[List[str], List[str]]:
+    """(data members, image members), in archive order."""
+    data, images = [], []
+    for info in zf.infolist():
+        if info.is_dir() or _is_hidden(info.filename):
+            continue
+        ext = data_extension(info.filename)
+        if ext in IMAGE_EXTENSIONS:
+            images.append(info.filename)
+            continue
+        if ext == "zip":
+            continue  # nested archives are not opened
+        try:
+            get_batch_reader(ext)
+        except ValueError:
+            continue
+        data.append(info.filename)
+    return data, images
+
+
+@register_key_lister(["zip"])
+def list_members(path: str) -> List[str]:
+    with zipfile.ZipFile(path) as zf:
+        data, images = _members(zf)
+    return data + ([IMAGES_KEY] if images else [])
+
+
+def _member_opener(path: str, name: str):
+    def open_member() -> IO[bytes]:
+        # the member stays readable after the archive object is closed
+        with zipfile.ZipFile(path) as zf:
+            return zf.open(name)
+
+    return open_member
+
+
+def _ocr_members(path: str, names: List[str]) -> pd.DataFrame:
+    with zipfile.ZipFile(path) as zf, tempfile.TemporaryDirectory() as tmp:
+        paths = [zf.extract(name, tmp) for name in names]
+        return pd.DataFrame({"file": names, "text": ocr_images(paths)})
+
+
+@register_batch_reader(["zip"])
+def iter_zip(path: str, key: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Batches of one member (the first unless `key` names another)."""
+    with zipfile.ZipFile(path) as zf:
+        data, images = _members(zf)
+    keys = data + ([IMAGES_KEY] if images else [])
+    if not keys:
+        raise ValueError("Archive contains no files in a supported format")
+    name = pick_key(key, keys, "archive member")
+    if name == IMAGES_KEY:
+        yield _ocr_members(path, images)
+        return
+    ext = data_extension(name)
+    with stream_source(_member_opener(path, name), ext) as source:
+        yield from get_batch_reader(ext)(source)
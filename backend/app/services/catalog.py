@@ -0,0 +1,150 @@
+# app/services/catalog.py
+"""
+Dataset catalog: one JSON document (like users_db.json) mapping
+dataset_id -> entry. An entry records where the dataset's partitions
+live plus whatever metadata the services attach to it (lineage,
+cleaning baselines, ...). Datasets stored before the catalog existed
+simply have no entry.
+
+JsonTable is the storage behind it, for other small key -> entry tables.
+Every change rewrites the whole file under an exclusive lock on a
+"<path>.lock" file next to it (fcntl, so API workers in several processes
+do not lose each other's updates; on platforms without fcntl only threads
+of one process are serialized). Reads take no lock: the file is replaced
+atomically.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from ..config import CATALOG_PATH
+
+
+class JsonTable:
+    """A JSON file of key -> entry dicts, cached until the file changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._lock = threading.RLock()
+        self._lock_depth = 0  # nested writes in the holding thread take no second flock
+        self._version: Optional[Tuple[int, int, int]] = None
+        self._data: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _file_version(st: os.stat_result) -> Tuple[int, int, int]:
+        # every write is a new file (rename), so the inode changes even
+        # when two writes land within the filesystem's mtime resolution
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            version = self._file_version(os.stat(self.path))
+        except FileNotFoundError:
+            self._version, self._data = None, {}
+            return self._data
+        if self._version != version:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+            self._version = version
+        return self._data
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusive access for a read-modify-write, across processes where fcntl exists."""
+        with self._lock:
+            try:
+                import fcntl
+            except ImportError:  # Windows: writers only exclude each other within a process
+                fcntl = None
+            if fcntl is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(self.lock_path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield  # the flock is released when the file is closed
+                finally:
+                    self._lock_depth -= 1
+
+    def _write(self, data: Dict[str, Dict[str, Any]]) -> None:
+        # write-then-rename so readers never see a half-written file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._data = data
+        self._version = self._file_version(os.stat(self.path))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._read().get(key)
+            return dict(entry) if entry is not None else None
+
+    def items(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._read().items()}
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._locked():
+            data = dict(self._read())
+            data[key] = entry
+            self._write(data)
+
+    def update(
+        self, key: str, update: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Atomically read-modify-write one entry. `update` receives a copy of
+        the current entry ({} if missing) and returns the new entry.
+        """
+        with self._locked():
+            data = dict(self._read())
+            entry = update(dict(data.get(key, {})))
+            data[key] = entry
+            self._write(data)
+            return dict(entry)
+
+    def delete(self, *keys: str) -> None:
+        with self._locked():
+            data = dict(self._read())
+            removed = [k for k in keys if data.pop(k, None) is not None]
+            if removed:
+                self._write(data)
+
+
+_catalog = JsonTable(CATALOG_PATH)
+
+
+def get_entry(dataset_id: str) -> Optional[Dict[str, Any]]:
+    return _catalog.get(dataset_id)
+
+
+def list_entries() -> Dict[str, Dict[str, Any]]:
+    return _catalog.items()
+
+
+def put_entry(dataset_id: str, entry: Dict[str, Any]) -> None:
+    _catalog.put(dataset_id, entry)
+
+
+def update_entry(
+    dataset_id: str, update: Callable[[Dict[str, Any]], Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Atomically read-modify-write one entry. `update` receives a copy of
+    the current entry ({} if missing) and returns the new entry.
+    """
+    return _catalog.update(dataset_id, update)
+
+
+def delete_entry(dataset_id: str) -> None:
+    _catalog.delete(dataset_id)
@@ -0,0 +1,117 @@
+# app/services/clean_memo.py
+"""
+Memoized cleaning results.
+
+A clean is keyed by the content hash of its source (ingestion.content_hash),
+its canonicalized CleaningOptions and the engine that ran it, so cleaning
+the same data the same way again - the same dataset, or an identical
+re-upload - returns the stored cleaned dataset and summary instead of
+writing a new one. Engines are kept apart: nothing guarantees their
+outputs are identical, and a request for one must not get another's.
+Appends change the content hash, so they never hit a stale result.
+
+Memoized outputs are owned by the memo: those not reused for
+CLEAN_MEMO_TTL_S, and the least recently used beyond
+CLEAN_MEMO_MAX_ENTRIES, are deleted unless another dataset refers to them
+as its cleaned output.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional, Set
+
+from ..config import CLEAN_MEMO_MAX_ENTRIES, CLEAN_MEMO_PATH, CLEAN_MEMO_TTL_S
+from ..schemas.datasets import CleaningOptions
+from . import catalog
+from .catalog import JsonTable
+from .ingestion import content_hash, dataset_partitions, delete_dataset
+
+# last_used is only rewritten when older than this, so hits stay read-only
+_TOUCH_INTERVAL_S = 60
+
+_memo = JsonTable(CLEAN_MEMO_PATH)
+
+
+def canonical_options(options: CleaningOptions) -> Dict[str, Any]:
+    """The options that affect the result (e.g. no strategy when not imputing)."""
+    canonical = options.model_dump()
+    if not options.impute_missing:
+        canonical.pop("impute_strategy")
+    if not options.remove_outliers:
+        canonical.pop("outlier_zscore_threshold")
+    else:
+        canonical["outlier_zscore_threshold"] = float(options.outlier_zscore_threshold)
+    return canonical
+
+
+def memo_key(dataset_id: str, options: CleaningOptions, engine: str = "pandas") -> str:
+    """Raises FileNotFoundError if the dataset does not exist."""
+    payload = json.dumps(
+        {
+            "source": content_hash(dataset_id),
+            "options": canonical_options(options),
+            "engine": engine,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _exists(dataset_id: str) -> bool:
+    try:
+        dataset_partitions(dataset_id)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def lookup(key: str) -> Optional[Dict[str, Any]]:
+    """The stored cleaning summary for key, or None."""
+    entry = _memo.get(key)
+    if entry is None:
+        return None
+    if not _exists(entry["cleaned_dataset_id"]):
+        _memo.delete(key)
+        return None
+    if time.time() - entry["last_used"] > _TOUCH_INTERVAL_S:
+        _memo.put(key, {**entry, "last_used": time.time()})
+    return entry["summary"]
+
+
+def store(key: str, summary: Dict[str, Any]) -> None:
+    """Memoize a cleaning summary, then evict expired and surplus entries."""
+    now = time.time()
+    _memo.put(
+        key,
+        {"cleaned_dataset_id": summary["cleaned_dataset_id"], "summary": summary, "last_used": now},
+    )
+    evict(now)
+
+
+def memoized_outputs() -> Set[str]:
+    """Ids of the cleaned datasets the memo currently owns."""
+    return {entry["cleaned_dataset_id"] for entry in _memo.items().values()}
+
+
+def evict(now: Optional[float] = None) -> int:
+    """Drop expired and least recently used entries; returns how many were dropped."""
+    now = now or time.time()
+    entries = sorted(_memo.items().items(), key=lambda kv: kv[1]["last_used"], reverse=True)
+    stale = [
+        (key, entry)
+        for rank, (key, entry) in enumerate(entries)
+        if rank >= CLEAN_MEMO_MAX_ENTRIES or now - entry["last_used"] > CLEAN_MEMO_TTL_S
+    ]
+    if not stale:
+        return 0
+    _memo.delete(*(key for key, _ in stale))
+
+    # outputs still memoized under another key, or adopted as a dataset's
+    # cleaned output by incremental appends, are kept
+    kept = memoized_outputs()
+    kept |= {e.get("cleaned_dataset_id") for e in catalog.list_entries().values()}
+    for _, entry in stale:
+        if entry["cleaned_dataset_id"] not in kept:
+            delete_dataset(entry["cleaned_dataset_id"])
+    return len(stale)
@@ -1,19 +1,17 @@
 # app/services/cleaning.py
 
-import os
+from typing import Optional
+
 import numpy as np
 import pandas as pd
 
-from ..config import BASE_UPLOAD_DIR
 from ..utils.id_gen import generate_dataset_id
-from .ingestion import load_dataset
+from .ingestion import load_dataset, save_dataset
 from ..schemas.datasets import CleaningOptions
+from .dataset_stats import row_hashes
 
 
-def _impute_column(s: pd.Series, strategy: str) -> pd.Series:
-    if not s.isna().any():
-        return s
-
+def _fill_value(s: pd.Series, strategy: str):
     if strategy == "zero":
         fill_value = 0
     elif strategy == "mode":
@@ -29,69 +27,113 @@ def _impute_column(s: pd.Series, strategy: str) -> pd.Series:
         else:
             fill_value = s.mode(dropna=True)
             fill_value = fill_value.iloc[0] if not fill_value.empty else ""
-    return s.fillna(fill_value)
-
+    return fill_value
 
-def _remove_outliers_zscore(df: pd.DataFrame, z_thresh: float) -> tuple[pd.DataFrame, int]:
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    if numeric_cols.empty:
-        return df, 0
 
-    zscores = (df[numeric_cols] - df[numeric_cols].mean()) / df[numeric_cols].std(ddof=0)
-    mask = (zscores.abs() > z_thresh).any(axis=1)
+def _to_json_value(value):
+    return value.item() if isinstance(value, np.generic) else value
 
-    outliers_count = int(mask.sum())
-    df_no_outliers = df.loc[~mask].copy()
-    return df_no_outliers, outliers_count
 
-
-def clean_dataset(dataset_id: str, options: CleaningOptions):
+def fit_cleaning_params(df: pd.DataFrame, options: CleaningOptions) -> dict:
     """
-    Load a dataset, clean it according to the options, save cleaned version as new dataset.
-    Returns: (cleaned_dataset_id, summary_dict)
+    Learn what clean_dataset would use on df: per-column fill values and,
+    after imputation, numeric means / stds for the z-score filter.
+    The result is JSON-serialisable so it can be stored in the catalog and
+    reused to clean later partitions with apply_cleaning_params().
     """
-    df = load_dataset(dataset_id)
-
-    n_rows_before = int(df.shape[0])
-    n_missing_before = int(df.isna().sum().sum())
-
-    # 1) Drop duplicates
-    dup_rows_before = int(df.duplicated().sum())
     if options.drop_duplicates:
-        df = df.drop_duplicates().reset_index(drop=True)
-    dup_rows_after = int(df.duplicated().sum())
-    duplicate_rows_removed = dup_rows_before - dup_rows_after
+        df = df.drop_duplicates()
+    else:
+        df = df.copy()
 
-    # 2) Impute missing
+    fill_values = {}
     if options.impute_missing:
         for col in df.columns:
-            df[col] = _impute_column(df[col], options.impute_strategy)
+            fill_values[str(col)] = _to_json_value(_fill_value(df[col], options.impute_strategy))
+            df[col] = df[col].fillna(fill_values[str(col)])
+
+    numeric = df.select_dtypes(include=[np.number])
+    return {
+        "fill_values": fill_values,
+        "means": {str(c): float(v) for c, v in numeric.mean().items()},
+        "stds": {str(c): float(v) for c, v in numeric.std(ddof=0).items()},
+    }
+
+
+def apply_cleaning_params(
+    df: pd.DataFrame,
+    params: dict,
+    options: CleaningOptions,
+    seen_hashes: Optional[np.ndarray] = None,
+) -> tuple[pd.DataFrame, int, int]:
+    """
+    Clean df with previously fitted params instead of its own statistics.
+    Rows whose hash is in seen_hashes (sorted) count as duplicates too.
+    Returns (cleaned_df, duplicate_rows_removed, outlier_rows_removed).
+    """
+    duplicate_rows_removed = 0
+    if options.drop_duplicates:
+        hashes = row_hashes(df)
+        dup_mask = pd.Series(hashes).duplicated().to_numpy()
+        if seen_hashes is not None and len(seen_hashes):
+            dup_mask = dup_mask | np.isin(hashes, seen_hashes)
+        duplicate_rows_removed = int(dup_mask.sum())
+        df = df.loc[~dup_mask].reset_index(drop=True)
+
+    if options.impute_missing and params["fill_values"]:
+        fills = {c: v for c, v in params["fill_values"].items() if c in df.columns}
+        df = df.fillna(fills)
 
-    # 3) Remove outliers
     outlier_rows_removed = 0
     if options.remove_outliers:
-        df, outlier_rows_removed = _remove_outliers_zscore(df, options.outlier_zscore_threshold)
+        cols = [
+            c for c in params["means"]
+            if c in df.columns and pd.api.types.is_numeric_dtype(df[c])
+        ]
+        if cols:
+            means = pd.Series(params["means"])[cols]
+            # constant columns (std 0) have no outliers, as in clean_plan
+            stds = pd.Series(params["stds"])[cols].replace(0, np.nan)
+            zscores = (df[cols] - means) / stds
+            mask = (zscores.abs() > options.outlier_zscore_threshold).any(axis=1)
+            outlier_rows_removed = int(mask.sum())
+            df = df.loc[~mask].reset_index(drop=True)
+
+    return df, duplicate_rows_removed, outlier_rows_removed
+
+
+def clean_dataset(dataset_id: str, options: CleaningOptions, engine: str = "pandas"):
+    """
+    Load a dataset, clean it according to the options, save cleaned version as new dataset.
+    The options are compiled into a plan (see clean_plan) run by `engine`.
+    Returns: (cleaned_dataset_id, summary_dict)
+    """
+    from .clean_plan import run_plan  # clean_plan builds on this module
 
+    result = run_plan(options, load_dataset(dataset_id), engine)
+    df = result["frame"]
     n_rows_after = int(df.shape[0])
-    n_missing_after = int(df.isna().sum().sum())
 
-    # Save cleaned dataset as CSV with a new id
-    cleaned_dataset_id = generate_dataset_id()
-    file_path = os.path.join(BASE_UPLOAD_DIR, f"{cleaned_dataset_id}.csv")
-    df.to_csv(file_path, index=False)
+    # Save cleaned dataset as partitions with a new id, recording its source
+    cleaned_dataset_id = save_dataset(df, generate_dataset_id(), source_dataset_id=dataset_id)
 
     preview = df.head(20).fillna("").astype(str).to_dict(orient="records")
+    steps = {r["step"]: r for r in result["steps"]}
+
+    def removed(step):
+        return steps[step]["rows_in"] - steps[step]["rows_out"] if step in steps else 0
 
     summary = {
         "source_dataset_id": dataset_id,
         "cleaned_dataset_id": cleaned_dataset_id,
-        "n_rows_before": n_rows_before,
+        "n_rows_before": result["n_rows_before"],
         "n_rows_after": n_rows_after,
-        "n_missing_before": n_missing_before,
-        "n_missing_after": n_missing_after,
-        "duplicate_rows_removed": duplicate_rows_removed,
-        "outlier_rows_removed": outlier_rows_removed,
+        "n_missing_before": result["n_missing_before"],
+        "n_missing_after": int(df.isna().sum().sum()),
+        "duplicate_rows_removed": removed("deduplicate"),
+        "outlier_rows_removed": removed("outliers"),
         "preview_rows": preview,
+        "steps": result["steps"],
     }
 
     return cleaned_dataset_id, summary
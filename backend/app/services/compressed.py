@@ -0,0 +1,161 @@
+# app/services/compressed.py
+"""
+Compressed inputs.
+
+Compression is detected from the file's magic bytes, not its name, and
+the inner format from the name with its compression suffixes removed
+("export.csv.gz" -> csv). Streaming readers (CSV, JSONL, XML, ...) get an
+opener that decompresses on the fly, so a compressed file is never
+inflated before it is parsed. Formats that need random access (Parquet,
+Excel, ...) have nothing to stream into; their decompressed bytes are
+spooled to a temporary file first.
+
+zstd uses the `zstandard` package (or compression.zstd on Python 3.14+).
+Zip archives are containers, read member by member by archive_readers.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Callable, Iterator, Optional
+
+from .ingestion_base import Source, is_streaming
+from .progress import progress_stream
+
+_MAGIC = [
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"PK\x03\x04", "zip"),
+    (b"PK\x05\x06", "zip"),  # empty archive
+]
+
+# Filename suffixes that name a compression, not a format
+COMPRESSION_SUFFIXES = {"gz", "gzip", "bz2", "xz", "zst", "zstd"}
+
+_SPOOL_BLOCK_SIZE = 1 << 20
+
+
+def sniff_bytes(head: bytes) -> Optional[str]:
+    """'gzip', 'bz2', 'xz', 'zstd', 'zip' or None, from a file's first bytes."""
+    for magic, codec in _MAGIC:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def sniff_compression(open_raw: Callable[[], IO[bytes]]) -> Optional[str]:
+    with open_raw() as f:
+        return sniff_bytes(f.read(8))
+
+
+def data_extension(filename: str) -> str:
+    """Extension of the data format, past any compression suffixes."""
+    parts = filename.lower().split(".")[1:]
+    while len(parts) > 1 and parts[-1] in COMPRESSION_SUFFIXES:
+        parts.pop()
+    return parts[-1] if parts else ""
+
+
+def _zstd_reader(raw: IO[bytes]) -> IO[bytes]:
+    try:
+        from compression import zstd  # Python 3.14+
+
+        return zstd.ZstdFile(raw)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ValueError(
+            "Missing zstd dependency 'zstandard'. "
+            "Install it in the backend environment with: pip install zstandard"
+        ) from e
+    return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+
+
+_DECOMPRESSORS = {
+    "gzip": lambda raw: gzip.GzipFile(fileobj=raw),
+    "bz2": bz2.BZ2File,
+    "xz": lzma.LZMAFile,
+    "zstd": _zstd_reader,
+}
+
+
+class _Decompressed(io.BufferedReader):
+    """A decompressing stream that also closes the compressed file."""
+
+    def __init__(self, stream: IO[bytes], raw: IO[bytes]):
+        super().__init__(stream)
+        self._compressed = raw
+
+    def fileno(self) -> int:
+        # the descriptor is the compressed file's; hiding it keeps readers
+        # from taking its size as the size of the decompressed data
+        raise io.UnsupportedOperation("fileno")
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._compressed.close()
+
+
+def decompressing(open_raw: Callable[[], IO[bytes]], codec: str) -> Callable[[], IO[bytes]]:
+    """Opener of the decompressed content of open_raw's stream; progress is in compressed bytes."""
+    decompress = _DECOMPRESSORS[codec]
+
+    def open_decompressed() -> IO[bytes]:
+        raw = open_raw()
+        try:
+            return _Decompressed(decompress(progress_stream(raw, "decompress")), raw)
+        except BaseException:
+            raw.close()
+            raise
+
+    return open_decompressed
+
+
+def spool(open_stream: Callable[[], IO[bytes]], ext: str) -> str:
+    """Copy a stream to a temporary .ext file and return its path (caller deletes it)."""
+    with open_stream() as src, tempfile.NamedTemporaryFile(suffix=f".{ext}", delete=False) as dst:
+        shutil.copyfileobj(src, dst, _SPOOL_BLOCK_SIZE)
+    return dst.name
+
+
+@contextmanager
+def stream_source(
+    open_raw: Callable[[], IO[bytes]], ext: str, path: Optional[str] = None
+) -> Iterator[Source]:
+    """
+    Source for reading a possibly compressed stream as format ext: `path`
+    (the stream's own file, if given) when it is not compressed, a
+    decompressing opener for streaming readers, otherwise a temporary
+    decompressed copy. Zip archives count as uncompressed: they are
+    containers (or xlsx / docx / ods files).
+    """
+    codec = sniff_compression(open_raw)
+    if codec in _DECOMPRESSORS:
+        open_raw = decompressing(open_raw, codec)
+    elif path is not None:
+        yield path
+        return
+    if is_streaming(ext):
+        yield open_raw
+        return
+    tmp_path = spool(open_raw, ext)
+    try:
+        yield tmp_path
+    finally:
+        os.unlink(tmp_path)
+
+
+def open_source(path: str, ext: str):
+    """stream_source() for a file on disk."""
+    return stream_source(lambda: open(path, "rb"), ext, path)
@@ -0,0 +1,197 @@
+# app/services/dataset_stats.py
+"""
+Mergeable per-dataset statistics.
+
+compute_stats() summarises one partition; merge_stats() combines two
+summaries, so a dataset's statistics can be kept up to date as
+partitions are appended without rescanning history. Per column we keep
+counts, sums, sums of squares, min/max, a few sample values and a KMV
+(k minimum values) sketch of value hashes for distinct-count estimates.
+Row hashes (for duplicate detection) are kept separately as a sorted
+numpy array because they grow with the dataset.
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Number of smallest value hashes kept per column. Distinct counts are
+# exact below this and estimated (about 3% error) above it.
+SKETCH_SIZE = 1024
+_HASH_SPACE = float(2**64)
+_N_SAMPLES = 5
+
+
+def is_numeric_column(s: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+
+
+def _canonical(s: pd.Series) -> pd.Series:
+    # hash 1 and 1.0 alike so partitions parsed with different dtypes
+    # agree, and -0.0 like 0.0 as pandas' own duplicate checks do
+    if is_numeric_column(s):
+        return s.astype("float64") + 0.0
+    return s.astype(object)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash per row, stable across partitions with different dtypes."""
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    canon = pd.DataFrame({c: _canonical(df[c]) for c in df.columns})
+    return pd.util.hash_pandas_object(canon, index=False).to_numpy()
+
+
+def _value_sketch(s: pd.Series) -> list:
+    values = s.dropna()
+    if values.empty:
+        return []
+    hashes = np.unique(pd.util.hash_pandas_object(_canonical(values), index=False).to_numpy())
+    return hashes[:SKETCH_SIZE].tolist()
+
+
+def compute_stats(df: pd.DataFrame) -> Dict[str, Any]:
+    """Summarise one partition."""
+    columns = {}
+    for col in df.columns:
+        s = df[col]
+        n_missing = int(s.isna().sum())
+        col_stats = {
+            "dtype": str(s.dtype),
+            "count": int(len(s) - n_missing),
+            "n_missing": n_missing,
+            "sum": None,
+            "sumsq": None,
+            "min": None,
+            "max": None,
+            "sketch": _value_sketch(s),
+            "samples": s.dropna().astype(str).head(_N_SAMPLES).tolist(),
+        }
+        if is_numeric_column(s) and len(s) > n_missing:
+            values = s.astype("float64")
+            col_stats.update(
+                sum=float(values.sum()),
+                sumsq=float((values**2).sum()),
+                min=float(values.min()),
+                max=float(values.max()),
+            )
+        columns[str(col)] = col_stats
+    return {"n_rows": int(len(df)), "columns": columns}
+
+
+def _merge_dtype(a: str, b: str) -> str:
+    if a == b:
+        return a
+    try:
+        return str(np.result_type(np.dtype(a), np.dtype(b)))
+    except TypeError:
+        return "object"
+
+
+def _merge_column(a: Optional[Dict], b: Optional[Dict], n_rows_a: int, n_rows_b: int) -> Dict:
+    # a column absent from one side counts as all-missing there
+    if a is None:
+        a = {"dtype": b["dtype"], "count": 0, "n_missing": n_rows_a, "sketch": [], "samples": []}
+    if b is None:
+        b = {"dtype": a["dtype"], "count": 0, "n_missing": n_rows_b, "sketch": [], "samples": []}
+
+    def combine(key, fn):
+        va, vb = a.get(key), b.get(key)
+        if va is None or vb is None:
+            return va if vb is None else vb
+        return fn(va, vb)
+
+    sketch = np.union1d(
+        np.asarray(a["sketch"], dtype=np.uint64), np.asarray(b["sketch"], dtype=np.uint64)
+    )
+    return {
+        "dtype": _merge_dtype(a["dtype"], b["dtype"]),
+        "count": a["count"] + b["count"],
+        "n_missing": a["n_missing"] + b["n_missing"],
+        "sum": combine("sum", lambda x, y: x + y),
+        "sumsq": combine("sumsq", lambda x, y: x + y),
+        "min": combine("min", min),
+        "max": combine("max", max),
+        "sketch": sketch[:SKETCH_SIZE].tolist(),
+        "samples": (a["samples"] + b["samples"])[:_N_SAMPLES],
+    }
+
+
+def merge_stats(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the summaries of two disjoint sets of rows."""
+    names = list(a["columns"]) + [c for c in b["columns"] if c not in a["columns"]]
+    columns = {
+        c: _merge_column(a["columns"].get(c), b["columns"].get(c), a["n_rows"], b["n_rows"])
+        for c in names
+    }
+    merged = {"n_rows": a["n_rows"] + b["n_rows"], "columns": columns}
+    if "n_distinct_rows" in a:
+        merged["n_distinct_rows"] = a["n_distinct_rows"]
+    return merged
+
+
+def unique_is_estimate(col_stats: Dict[str, Any]) -> bool:
+    """Whether estimate_unique() is an estimate rather than an exact count."""
+    return len(col_stats["sketch"]) >= SKETCH_SIZE
+
+
+def estimate_unique(col_stats: Dict[str, Any]) -> int:
+    """Distinct non-null values: exact below SKETCH_SIZE, KMV estimate above."""
+    sketch = col_stats["sketch"]
+    if len(sketch) < SKETCH_SIZE:
+        return len(sketch)
+    kth = float(sketch[-1]) / _HASH_SPACE
+    return int(round((SKETCH_SIZE - 1) / kth))
+
+
+def column_mean_std(col_stats: Dict[str, Any]) -> tuple[Optional[float], Optional[float]]:
+    """Population mean / std of a numeric column from its sums."""
+    n = col_stats["count"]
+    if not n or col_stats.get("sum") is None:
+        return None, None
+    mean = col_stats["sum"] / n
+    var = max(col_stats["sumsq"] / n - mean**2, 0.0)
+    return mean, var**0.5
+
+
+# --------- PERSISTENCE (next to the dataset's partitions) ----------
+
+def _stats_path(dataset_dir: str) -> str:
+    return os.path.join(dataset_dir, "stats.json")
+
+
+def _hashes_path(dataset_dir: str) -> str:
+    return os.path.join(dataset_dir, "row_hashes.npy")
+
+
+def load_stats(dataset_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_stats_path(dataset_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_stats(dataset_dir: str, stats: Dict[str, Any]) -> None:
+    os.makedirs(dataset_dir, exist_ok=True)
+    tmp_path = _stats_path(dataset_dir) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, _stats_path(dataset_dir))
+
+
+def load_row_hashes(dataset_dir: str) -> Optional[np.ndarray]:
+    try:
+        return np.load(_hashes_path(dataset_dir))
+    except FileNotFoundError:
+        return None
+
+
+def save_row_hashes(dataset_dir: str, hashes: np.ndarray) -> None:
+    os.makedirs(dataset_dir, exist_ok=True)
+    tmp_path = _hashes_path(dataset_dir) + ".tmp.npy"
+    np.save(tmp_path, hashes)
+    os.replace(tmp_path, _hashes_path(dataset_dir))
@@ -1,38 +1,155 @@
 # app/services/doc_readers.py
+import itertools
+import os
+import zipfile
+from concurrent.futures import as_completed
+from typing import Dict, Iterator, List, Tuple
+
 import pandas as pd
-import pdfplumber
-from docx import Document
-from bs4 import BeautifulSoup
-from PIL import Image
-import pytesseract
 
-from .ingestion_base import register_reader
+from ..config import CACHE_DIR, PDF_PAGE_BATCH
+from ..utils.hashing import file_sha256
+from ..utils.xml_stream import release
+from .ingestion_base import iter_row_batches, register_batch_reader, register_reader
+from .ocr import IMAGE_EXTENSIONS, ocr_images
+from .progress import report_progress
+from .workers import get_executor
+
+
+# --------- PDF: page batches in the worker pool, text cached per page ----------
+
+def _pdfplumber():
+    try:
+        import pdfplumber
+    except ImportError as e:
+        raise ValueError(
+            "Missing PDF dependency 'pdfplumber'. "
+            "Install it in the backend environment with: pip install pdfplumber"
+        ) from e
+    return pdfplumber
+
+
+def _page_cache_dir(file_hash: str) -> str:
+    return os.path.join(CACHE_DIR, "pdf", file_hash)
+
+
+def _read_cached_pages(cache_dir: str, n_pages: int) -> Dict[int, str]:
+    cached = {}
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            page_no, ext = os.path.splitext(name)
+            if ext == ".txt" and page_no.isdigit() and int(page_no) <= n_pages:
+                with open(os.path.join(cache_dir, name), "r", encoding="utf-8") as f:
+                    cached[int(page_no)] = f.read()
+    if cached:
+        os.utime(cache_dir)  # a hit counts as a use for the storage sweep
+    return cached
+
+
+def _extract_pages(path: str, page_numbers: List[int], cache_dir: str) -> List[Tuple[int, str]]:
+    """Extract (and cache) the text of some 1-based pages; runs in a worker."""
+    out = []
+    os.makedirs(cache_dir, exist_ok=True)
+    with _pdfplumber().open(path) as pdf:
+        for page_no in page_numbers:
+            page = pdf.pages[page_no - 1]
+            text = page.extract_text() or ""
+            page.close()  # drop parsed layout objects before the next page
+            tmp_path = os.path.join(cache_dir, f"{page_no}.txt.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, os.path.join(cache_dir, f"{page_no}.txt"))
+            out.append((page_no, text))
+    return out
+
+
+def iter_pdf_pages(path: str) -> Iterator[Dict[str, object]]:
+    """
+    Yield {"page", "text"} rows in page order. Pages not in the cache are
+    extracted in batches of PDF_PAGE_BATCH across the worker pool and
+    yielded as soon as every earlier page is available.
+    """
+    with _pdfplumber().open(path) as pdf:
+        n_pages = len(pdf.pages)
+
+    cache_dir = _page_cache_dir(file_sha256(path))
+    done = _read_cached_pages(cache_dir, n_pages)
+    missing = [p for p in range(1, n_pages + 1) if p not in done]
+    batches = [missing[i:i + PDF_PAGE_BATCH] for i in range(0, len(missing), PDF_PAGE_BATCH)]
+
+    if len(batches) <= 1:
+        results = [_extract_pages(path, b, cache_dir) for b in batches]
+    else:
+        futures = [get_executor().submit(_extract_pages, path, b, cache_dir) for b in batches]
+        results = (f.result() for f in as_completed(futures))
 
+    # the leading empty batch flushes pages that were already cached
+    next_page = 1
+    for batch in itertools.chain([[]], results):
+        done.update(batch)
+        while next_page in done:
+            yield {"page": next_page, "text": done.pop(next_page)}
+            report_progress("read", rows=next_page, total_rows=n_pages)
+            next_page += 1
 
 
 @register_reader(["pdf"])
 def read_pdf(path: str) -> pd.DataFrame:
     # Very simple: extract text per page as rows
-    rows = []
-    with pdfplumber.open(path) as pdf:
-        for i, page in enumerate(pdf.pages):
-            text = page.extract_text() or ""
-            rows.append({"page": i + 1, "text": text})
-    return pd.DataFrame(rows)
+    return pd.DataFrame(list(iter_pdf_pages(path)), columns=["page", "text"])
+
+
+@register_batch_reader(["pdf"])
+def iter_pdf(path: str) -> Iterator[pd.DataFrame]:
+    return iter_row_batches(iter_pdf_pages(path), infer_types=False, columns=["page", "text"])
+
+
+# --------- DOCX: body paragraphs streamed from word/document.xml ----------
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_RUN_TEXT = {_W + "t": None, _W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n"}
+
+
+def _paragraph_text(p) -> str:
+    # the same run content python-docx's Paragraph.text joins
+    parts = []
+    for run in p.iter(_W + "r"):
+        for child in run:
+            if child.tag in _RUN_TEXT:
+                parts.append(_RUN_TEXT[child.tag] or child.text or "")
+    return "".join(parts)
+
+
+def iter_docx_paragraphs(path: str) -> Iterator[Dict[str, object]]:
+    """
+    Yield {"paragraph"} rows for the non-empty top-level paragraphs (not
+    those inside tables), releasing each one once read.
+    """
+    from lxml import etree
+
+    with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as xml:
+        for _, elem in etree.iterparse(xml, events=("end",), tag=_W + "p", huge_tree=True):
+            parent = elem.getparent()
+            if parent is None or parent.tag != _W + "body":
+                continue
+            text = _paragraph_text(elem)
+            if text.strip():
+                yield {"paragraph": text}
+            release(elem)
 
 
 @register_reader(["docx"])
 def read_docx(path: str) -> pd.DataFrame:
-    doc = Document(path)
-    paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
-    return pd.DataFrame({"paragraph": paragraphs})
+    return pd.DataFrame(list(iter_docx_paragraphs(path)), columns=["paragraph"])
 
 
-@register_reader(["png", "jpg", "jpeg"])
+@register_batch_reader(["docx"])
+def iter_docx(path: str) -> Iterator[pd.DataFrame]:
+    return iter_row_batches(iter_docx_paragraphs(path), infer_types=False, columns=["paragraph"])
+
+
+@register_reader(IMAGE_EXTENSIONS)
 def read_image_ocr(path: str) -> pd.DataFrame:
     # OCR the entire image; later you can do table detection etc.
-    img = Image.open(path)
-    text = pytesseract.image_to_string(img)
-    return pd.DataFrame({"text": [text]})
-
+    return pd.DataFrame({"text": ocr_images([path])})
 
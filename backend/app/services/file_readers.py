@@ -1,25 +1,71 @@
 # app/services/file_readers.py
+"""
+Tabular file readers.
+
+Text formats (CSV / TSV / TXT / JSONL / XML / HTML) are registered as
+batch readers that yield DataFrames of about READ_BATCH_ROWS rows; their
+full-frame readers are derived by concatenation. They and the other text
+readers (JSON / YAML) are streaming readers: they read their input front
+to back, so they also take an opener (e.g. of a decompressing stream). Columnar formats keep a
+native full-frame reader and add a batch reader over their own units
+(Parquet row groups, ORC stripes, Arrow record batches). Spreadsheets,
+HDF5 and MAT files are batch readers that take a `key` to select the
+sheet / table / variable.
+"""
+import datetime
+import io
 import json
+import os
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
 import pandas as pd
 import yaml
-from scipy.io import loadmat
 
-from .ingestion_base import register_reader
+from ..config import READ_BATCH_ROWS
+from ..utils.xml_stream import localname, release
+from .ingestion_base import (
+    Source,
+    iter_row_batches,
+    open_binary,
+    pick_key,
+    register_batch_reader,
+    register_key_lister,
+    register_reader,
+)
+from .progress import progress_stream, report_progress
 
 
 # -------------------------------------------------------------------
 # Helper: robust CSV reader that tries multiple encodings
 # -------------------------------------------------------------------
-def _read_csv_with_encodings(path: str, **kwargs) -> pd.DataFrame:
+def _iter_csv_with_encodings(source: Source, **kwargs) -> Iterator[pd.DataFrame]:
     """
     Try several common encodings so Windows / Excel CSVs don't break.
+    A decode error can surface after some batches were already yielded;
+    the file is then re-read with the next encoding, skipping those rows.
     """
     encodings_to_try = ["utf-8", "utf-8-sig", "cp1252", "latin1"]
     last_err = None
+    n_yielded = 0
 
     for enc in encodings_to_try:
+        n_seen = 0
         try:
-            return pd.read_csv(path, encoding=enc, **kwargs)
+            with open_binary(source) as raw:
+                for chunk in pd.read_csv(
+                    progress_stream(raw, "read"), encoding=enc, chunksize=READ_BATCH_ROWS, **kwargs
+                ):
+                    n_seen += len(chunk)
+                    if n_seen > n_yielded:
+                        chunk = chunk.iloc[len(chunk) - (n_seen - n_yielded):]
+                        n_yielded = n_seen
+                        yield chunk
+            if n_yielded == 0:
+                # header only: no chunks, but keep the columns
+                with open_binary(source) as raw:
+                    yield pd.read_csv(raw, encoding=enc, nrows=0, **kwargs)
+            return
         except UnicodeDecodeError as e:
             last_err = e
             continue
@@ -31,74 +77,288 @@ def _read_csv_with_encodings(path: str, **kwargs) -> pd.DataFrame:
     )
 
 
-# --------- BASIC TABULAR: CSV / TSV / TXT / ODS / EXCEL ----------
+# --------- BASIC TABULAR: CSV / TSV / TXT / EXCEL / ODS ----------
 
-@register_reader(["csv"])
-def read_csv(path: str) -> pd.DataFrame:
+@register_batch_reader(["csv"], streaming=True)
+def iter_csv(source: Source) -> Iterator[pd.DataFrame]:
     # Plain CSV – robust encoding handling
-    return _read_csv_with_encodings(path)
+    return _iter_csv_with_encodings(source)
 
 
-@register_reader(["tsv"])
-def read_tsv(path: str) -> pd.DataFrame:
+@register_batch_reader(["tsv"], streaming=True)
+def iter_tsv(source: Source) -> Iterator[pd.DataFrame]:
     # Tab-separated
-    return _read_csv_with_encodings(path, sep="\t")
+    return _iter_csv_with_encodings(source, sep="\t")
 
 
-@register_reader(["txt", "log"])
-def read_txt(path: str) -> pd.DataFrame:
+@register_batch_reader(["txt", "log"], streaming=True)
+def iter_txt(source: Source) -> Iterator[pd.DataFrame]:
     # Try to auto-detect delimiter, with robust encodings
-    return _read_csv_with_encodings(path, sep=None, engine="python")
-
-
-@register_reader(["xlsx", "xls"])
-def read_excel(path: str) -> pd.DataFrame:
-    """
-    Excel reader. Requires 'openpyxl'.
-    """
+    return _iter_csv_with_encodings(source, sep=None, engine="python")
+
+
+# Spreadsheets are read row by row into batches. python-calamine (Rust)
+# is used when installed; otherwise openpyxl in read-only mode for xlsx /
+# xlsm and lxml's iterparse over content.xml for ODS (odfpy's DOM is far
+# too slow for large sheets), with pd.read_excel left for .xls / .xlsb.
+# The first row is the header; trailing blank rows and unnamed trailing
+# columns are dropped like pd.read_excel does.
+
+_SPREADSHEET_EXTENSIONS = ["xlsx", "xlsm", "xlsb", "xls", "ods"]
+
+def _sheet_batches(rows: Iterable[Sequence[Any]]) -> Iterator[pd.DataFrame]:
+    rows = iter(rows)
+    header = list(next(rows, None) or [])
+    while header and header[-1] is None:
+        header.pop()
+    width = len(header)
+    columns = _dedupe_columns(
+        [h if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+    )
+    blank_row = (None,) * width
+
+    def frame(rows):
+        df = pd.DataFrame(rows, columns=columns)
+        for col in df.columns[df.isna().all().to_numpy()]:
+            df[col] = df[col].astype("float64")  # empty columns as pandas reads them
+        return df
+
+    batch: List[tuple] = []
+    n_blank = n_rows = 0
+    for row in rows:
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if row == blank_row:
+            n_blank += 1  # kept only if more data follows
+            continue
+        batch.extend([blank_row] * n_blank)
+        n_blank = 0
+        batch.append(row)
+        if len(batch) >= READ_BATCH_ROWS:
+            n_rows += len(batch)
+            report_progress("read", rows=n_rows)
+            yield frame(batch)
+            batch = []
+    if batch or not n_rows:
+        yield frame(batch)
+
+
+def _open_workbook(path: str):
     try:
-        # pandas will use openpyxl; for old .xls this is usually fine too
-        return pd.read_excel(path, engine="openpyxl")
+        import openpyxl
     except ImportError as e:
-        # This is the error you saw: "Missing optional dependency 'openpyxl'"
         raise ValueError(
             "Missing Excel dependency 'openpyxl'. "
             "Install it in the backend environment with: pip install openpyxl"
         ) from e
+    return openpyxl.load_workbook(path, read_only=True, data_only=True)
 
 
-@register_reader(["ods"])
-def read_ods(path: str) -> pd.DataFrame:
-    """
-    ODS reader. Requires 'odfpy'.
-    """
+def _calamine():
     try:
-        # pandas can read ODS via engine="odf"
-        return pd.read_excel(path, engine="odf")
-    except ImportError as e:
-        raise ValueError(
-            "Missing ODS dependency 'odfpy'. "
-            "Install it in the backend environment with: pip install odfpy"
-        ) from e
+        import python_calamine
+    except ImportError:
+        return None
+    return python_calamine
+
+
+def _calamine_types(df: pd.DataFrame) -> pd.DataFrame:
+    # calamine returns every number as float and dates as datetime.date;
+    # convert like pandas' calamine engine does
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == "float64" and s.notna().all() and (s % 1 == 0).all():
+            df[col] = s.astype("int64")
+        elif s.dtype == object:
+            first = s.first_valid_index()
+            if first is not None and isinstance(s[first], datetime.date):
+                try:
+                    df[col] = pd.to_datetime(s)
+                except (TypeError, ValueError):
+                    pass
+    return df
+
+
+def _iter_calamine(calamine, path: str, key: Optional[str]) -> Iterator[pd.DataFrame]:
+    wb = calamine.CalamineWorkbook.from_path(path)
+    try:
+        if key is None:
+            sheet = wb.get_sheet_by_index(0)
+        elif key in wb.sheet_names:
+            sheet = wb.get_sheet_by_name(key)
+        else:
+            raise ValueError(f"No sheet named {key!r}. Sheets: {wb.sheet_names}")
+        rows = ([None if v == "" else v for v in row] for row in sheet.iter_rows())
+        for batch in _sheet_batches(rows):
+            yield _calamine_types(batch)
+    finally:
+        wb.close()
+
+
+def _iter_openpyxl(path: str, key: Optional[str]) -> Iterator[pd.DataFrame]:
+    wb = _open_workbook(path)
+    try:
+        if key is None:
+            ws = wb.worksheets[0]
+        elif key in wb.sheetnames:
+            ws = wb[key]
+        else:
+            raise ValueError(f"No sheet named {key!r}. Sheets: {wb.sheetnames}")
+        yield from _sheet_batches(ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+
+@register_key_lister(_SPREADSHEET_EXTENSIONS)
+def list_sheets(path: str) -> List[str]:
+    calamine = _calamine()
+    if calamine is not None:
+        wb = calamine.CalamineWorkbook.from_path(path)
+        try:
+            return list(wb.sheet_names)
+        finally:
+            wb.close()
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".ods":
+        return _list_ods_sheets(path)
+    if ext in (".xlsx", ".xlsm"):
+        wb = _open_workbook(path)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
+    return list(pd.ExcelFile(path).sheet_names)
+
+
+@register_batch_reader(_SPREADSHEET_EXTENSIONS)
+def iter_spreadsheet(path: str, key: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Rows of one sheet (the first unless `key` names another)."""
+    calamine = _calamine()
+    ext = os.path.splitext(path)[1].lower()
+    if calamine is not None:
+        yield from _iter_calamine(calamine, path, key)
+    elif ext == ".ods":
+        yield from _sheet_batches(_ods_rows(path, key))
+    elif ext in (".xlsx", ".xlsm"):
+        yield from _iter_openpyxl(path, key)
+    else:
+        # .xls / .xlsb without calamine: xlrd / pyxlsb through pandas
+        yield pd.read_excel(path, sheet_name=key if key is not None else 0)
+
+
+_ODS_TABLE = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+_ODS_OFFICE = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
+_ODS_TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+_ODS_CELLS = (_ODS_TABLE + "table-cell", _ODS_TABLE + "covered-table-cell")
+
+
+def _ods_cell_value(cell) -> Any:
+    # the same conversions as pandas' odf reader
+    value_type = cell.get(_ODS_OFFICE + "value-type")
+    if value_type in ("float", "percentage", "currency"):
+        value = float(cell.get(_ODS_OFFICE + "value"))
+        return int(value) if value.is_integer() else value
+    if value_type == "boolean":
+        return cell.get(_ODS_OFFICE + "boolean-value") == "true"
+    if value_type == "date":
+        return pd.Timestamp(cell.get(_ODS_OFFICE + "date-value"))
+    text = "\n".join("".join(p.itertext()) for p in cell.iter(_ODS_TEXT + "p"))
+    return text if value_type is not None or text else None
+
+
+def _ods_row(row) -> List[Any]:
+    values: List[Any] = []
+    n_blank = 0  # blank cells are only materialised when a value follows
+    for cell in row:
+        if cell.tag not in _ODS_CELLS:
+            continue
+        repeat = int(cell.get(_ODS_TABLE + "number-columns-repeated", 1))
+        value = _ods_cell_value(cell)
+        if value is None:
+            n_blank += repeat
+        else:
+            values.extend([None] * n_blank + [value] * repeat)
+            n_blank = 0
+    return values
+
+
+def _iter_ods_tables(path: str):
+    """(event, element) pairs for the tables and rows of an ODS file."""
+    from lxml import etree
+
+    with zipfile.ZipFile(path) as zf, zf.open("content.xml") as xml:
+        yield from etree.iterparse(
+            xml,
+            events=("start", "end"),
+            tag=(_ODS_TABLE + "table", _ODS_TABLE + "table-row"),
+            huge_tree=True,
+        )
+
+
+def _list_ods_sheets(path: str) -> List[str]:
+    names = []
+    for event, elem in _iter_ods_tables(path):
+        if event == "start" and elem.tag == _ODS_TABLE + "table":
+            names.append(elem.get(_ODS_TABLE + "name"))
+        elif event == "end" and elem.tag == _ODS_TABLE + "table-row":
+            release(elem)
+    return names
+
+
+def _ods_rows(path: str, key: Optional[str]) -> Iterator[Sequence[Any]]:
+    names: List[str] = []
+    selected = False
+    n_blank = 0  # blank rows (often repeated thousands of times at the end)
+    for event, elem in _iter_ods_tables(path):
+        if elem.tag == _ODS_TABLE + "table":
+            if event == "start":
+                names.append(elem.get(_ODS_TABLE + "name"))
+                selected = key is None or names[-1] == key
+            elif selected:
+                return
+            continue
+        if event == "start":
+            continue
+        if selected:
+            row = _ods_row(elem)
+            repeat = int(elem.get(_ODS_TABLE + "number-rows-repeated", 1))
+            if not row:
+                n_blank += repeat
+            else:
+                for _ in range(n_blank):
+                    yield ()
+                n_blank = 0
+                for _ in range(repeat):
+                    yield row
+        release(elem)
+    raise ValueError(f"No sheet named {key!r}. Sheets: {names}")
 
 
 # --------- JSON FAMILY: JSON / JSONL / NDJSON / GEOJSON ----------
 
-@register_reader(["json"])
-def read_json(path: str) -> pd.DataFrame:
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+@register_reader(["json"], streaming=True)
+def read_json(source: Source) -> pd.DataFrame:
+    with open_binary(source) as raw:
+        data = json.load(progress_stream(raw, "read"))
     return pd.json_normalize(data)
 
 
-@register_reader(["jsonl", "ndjson"])
-def read_jsonl(path: str) -> pd.DataFrame:
+@register_batch_reader(["jsonl", "ndjson"], streaming=True)
+def iter_jsonl(source: Source) -> Iterator[pd.DataFrame]:
     rows = []
-    with open(path, "r", encoding="utf-8") as f:
+    n_rows = 0
+    with open_binary(source) as raw:
+        f = io.TextIOWrapper(progress_stream(raw, "read"), encoding="utf-8")
         for line in f:
             if line.strip():
                 rows.append(json.loads(line))
-    return pd.json_normalize(rows)
+                n_rows += 1
+                if n_rows % 10_000 == 0:
+                    report_progress("read", rows=n_rows)
+                if len(rows) >= READ_BATCH_ROWS:
+                    yield pd.json_normalize(rows)
+                    rows = []
+    if rows:
+        yield pd.json_normalize(rows)
 
 
 @register_reader(["geojson"])
@@ -111,35 +371,116 @@ def read_geojson(path: str) -> pd.DataFrame:
 
 
 # --------- XML / HTML / YAML ----------
+# XML and HTML are parsed with lxml's iterparse: rows are emitted as soon
+# as their element closes and the parsed nodes are released, so memory is
+# bounded by the batch size rather than the document size.
 
-@register_reader(["xml"])
-def read_xml(path: str) -> pd.DataFrame:
-    # Simple XML -> DataFrame using pandas where possible
-    try:
-        return pd.read_xml(path)
-    except Exception:
-        # Fallback manual parser
-        from xml import etree
-
-        tree = etree.parse(path)
-        root = tree.getroot()
-        rows = []
-        for elem in root:
-            row = {child.tag: child.text for child in elem}
-            rows.append(row)
-        return pd.DataFrame(rows)
-
-
-@register_reader(["html", "htm"])
-def read_html(path: str) -> pd.DataFrame:
-    tables = pd.read_html(path)
-    return tables[0] if tables else pd.DataFrame()
-
-
-@register_reader(["yaml", "yml"])
-def read_yaml(path: str) -> pd.DataFrame:
-    with open(path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+def _xml_rows(source: Source) -> Iterator[Dict[str, Any]]:
+    # like pd.read_xml's default: children of the root are rows, their
+    # attributes and child elements are the fields
+    from lxml import etree
+
+    names: Dict[str, str] = {}  # tag -> local name, computed once per tag
+
+    def name(tag) -> str:
+        if tag not in names:
+            names[tag] = localname(tag)
+        return names[tag]
+
+    with open_binary(source) as raw:
+        for _, elem in etree.iterparse(
+            progress_stream(raw, "read"), huge_tree=True, remove_comments=True, remove_pis=True
+        ):
+            parent = elem.getparent()
+            if parent is None or parent.getparent() is not None:
+                continue
+            row = {name(k): v for k, v in elem.attrib.items()}
+            if len(elem) == 0 and elem.text and elem.text.strip():
+                row[name(elem.tag)] = elem.text.strip()
+            for child in elem:
+                text = child.text.strip() if child.text else None
+                row[name(child.tag)] = text or None
+            yield row
+            release(elem)
+
+
+@register_batch_reader(["xml"], streaming=True)
+def iter_xml(source: Source) -> Iterator[pd.DataFrame]:
+    return iter_row_batches(_xml_rows(source))
+
+
+def _dedupe_columns(names: List[str]) -> List[str]:
+    # "a", "a" -> "a", "a.1" as pandas does for repeated headers
+    seen: Dict[str, int] = {}
+    out = []
+    for name in names:
+        n = seen.get(name, 0)
+        seen[name] = n + 1
+        out.append(name if n == 0 else f"{name}.{n}")
+    return out
+
+
+def _html_cells(tr) -> Tuple[List[str], bool]:
+    cells, all_th = [], True
+    for cell in tr:
+        tag = localname(cell.tag).lower()
+        if tag not in ("td", "th"):
+            continue
+        all_th &= tag == "th"
+        text = " ".join("".join(cell.itertext()).split())
+        try:
+            span = max(1, int(cell.get("colspan", 1)))
+        except ValueError:
+            span = 1
+        cells.extend([text] * span)
+    return cells, all_th and bool(cells)
+
+
+def _html_table_rows(source: Source) -> Iterator[Dict[str, Any]]:
+    # rows of the first table only (as read_html()[0]); parsing stops
+    # once that table closes. A leading row of <th> cells is the header.
+    from lxml import etree
+
+    table_depth = 0
+    header: Optional[List[str]] = None
+    first_row = True
+    with open_binary(source) as raw:
+        for event, elem in etree.iterparse(
+            progress_stream(raw, "read"), events=("start", "end"), html=True, huge_tree=True
+        ):
+            tag = localname(elem.tag).lower()
+            if event == "start":
+                table_depth += tag == "table"
+                continue
+            if tag == "table":
+                table_depth -= 1
+                if table_depth == 0:
+                    return
+            elif tag == "tr" and table_depth == 1:
+                cells, is_header = _html_cells(elem)
+                if first_row and is_header:
+                    header = _dedupe_columns(cells)
+                elif cells:
+                    names = header or []
+                    yield {
+                        (names[i] if i < len(names) else i): value
+                        for i, value in enumerate(cells)
+                    }
+                first_row = False
+                release(elem)
+            elif table_depth == 0:
+                release(elem)
+
+
+@register_batch_reader(["html", "htm"], streaming=True)
+def iter_html(source: Source) -> Iterator[pd.DataFrame]:
+    return iter_row_batches(_html_table_rows(source))
+
+
+@register_reader(["yaml", "yml"], streaming=True)
+def read_yaml(source: Source) -> pd.DataFrame:
+    with open_binary(source) as raw:
+        data = yaml.safe_load(raw)
     return pd.json_normalize(data)
 
 
@@ -150,9 +491,45 @@ def read_parquet(path: str) -> pd.DataFrame:
     return pd.read_parquet(path)
 
 
-@register_reader(["feather"])
+@register_batch_reader(["parquet"])
+def iter_parquet(path: str) -> Iterator[pd.DataFrame]:
+    # one batch per row group
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    if pf.num_row_groups == 0:
+        yield pf.schema_arrow.empty_table().to_pandas()
+    for i in range(pf.num_row_groups):
+        yield pf.read_row_group(i).to_pandas()
+
+
+@register_reader(["feather", "arrow"])
 def read_feather(path: str) -> pd.DataFrame:
-    return pd.read_feather(path)
+    """
+    Feather v2 / Arrow IPC reader. The file is memory-mapped, so every
+    process reading it shares the OS page cache, and split_blocks lets
+    null-free numeric columns stay zero-copy views of the mapping.
+    """
+    import pyarrow.feather as feather
+
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+@register_batch_reader(["feather", "arrow"])
+def iter_feather(path: str) -> Iterator[pd.DataFrame]:
+    # one batch per record batch, memory-mapped like read_feather()
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    try:
+        reader = ipc.open_file(pa.memory_map(path))
+    except pa.ArrowInvalid:
+        # Feather v1 is not an IPC file; read it whole
+        yield read_feather(path)
+        return
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i).to_pandas(split_blocks=True)
 
 
 @register_reader(["orc"])
@@ -164,26 +541,150 @@ def read_orc(path: str) -> pd.DataFrame:
         return data.read().to_pandas()
 
 
-@register_reader(["hdf5", "h5"])
-def read_hdf(path: str) -> pd.DataFrame:
-    # Needs key; for now, assume the first key
-    store = pd.HDFStore(path)
+@register_batch_reader(["orc"])
+def iter_orc(path: str) -> Iterator[pd.DataFrame]:
+    # one batch per stripe
+    import pyarrow.orc as orc
+
+    with open(path, "rb") as f:
+        data = orc.ORCFile(f)
+        for i in range(data.nstripes):
+            yield data.read_stripe(i).to_pandas()
+
+
+# HDF5 and MAT files hold several named arrays / tables; only the one
+# selected by `key` is read (the first if none is given) and keys are
+# listed from metadata alone. pandas (PyTables) stores are read through
+# HDFStore - table-format ones in row chunks with optional `where` and
+# `columns` - and plain HDF5 arrays, including MAT v7.3 variables,
+# through h5py slices.
+
+HDF_EXTENSIONS = ["hdf5", "h5"]
+
+# MATLAB classes that do not become a numeric table
+_MAT_SKIP_CLASSES = {"char", "cell", "struct", "object", "sparse", "function_handle"}
+
+
+def _import_h5py():
     try:
-        key = store.keys()[0]
-        return store[key]
-    finally:
-        store.close()
-
-
-@register_reader(["mat"])
-def read_mat(path: str) -> pd.DataFrame:
-    mat = loadmat(path)
-    # choose one variable to convert; here we just take the first 2D array-like
-    for key, value in mat.items():
-        if (
-            not key.startswith("__")
-            and hasattr(value, "shape")
-            and len(value.shape) == 2
-        ):
-            return pd.DataFrame(value)
-    raise ValueError("No 2D array found in MAT file")
+        import h5py
+    except ImportError as e:
+        raise ValueError(
+            "Missing HDF5 dependency 'h5py'. "
+            "Install it in the backend environment with: pip install h5py"
+        ) from e
+    return h5py
+
+
+def _h5_arrays(path: str, matlab: bool = False) -> List[str]:
+    """Names of the 1-D / 2-D datasets of a plain HDF5 file, without reading them."""
+    h5py = _import_h5py()
+    names = []
+
+    def visit(name, obj):
+        if not isinstance(obj, h5py.Dataset) or obj.ndim not in (1, 2):
+            return
+        if matlab:
+            # v7.3 keeps cell / struct contents under "#refs#"
+            cls = obj.attrs.get("MATLAB_class", b"")
+            cls = cls.decode() if isinstance(cls, bytes) else str(cls)
+            if name.startswith("#") or cls in _MAT_SKIP_CLASSES:
+                return
+        names.append(name)
+
+    with h5py.File(path, "r") as f:
+        f.visititems(visit)
+    return names
+
+
+def _iter_h5_array(path: str, name: str, matlab: bool = False) -> Iterator[pd.DataFrame]:
+    """A dataset in row slices of READ_BATCH_ROWS (one column per 2nd axis)."""
+    h5py = _import_h5py()
+    with h5py.File(path, "r") as f:
+        ds = f[name]
+        # MATLAB writes column-major: a variable's rows are the last axis
+        transposed = matlab and ds.ndim == 2
+        n_rows = ds.shape[-1] if transposed else ds.shape[0]
+        for start in range(0, max(n_rows, 1), READ_BATCH_ROWS):
+            stop = start + READ_BATCH_ROWS
+            yield pd.DataFrame(ds[:, start:stop].T if transposed else ds[start:stop])
+
+
+def _hdf_store_keys(path: str) -> List[str]:
+    # keys of pandas objects only; empty for plain HDF5 files
+    try:
+        store = pd.HDFStore(path, mode="r")
+    except ImportError:  # no PyTables: only h5py can read the file
+        return []
+    with store:
+        return store.keys()
+
+
+@register_key_lister(HDF_EXTENSIONS)
+def list_hdf_keys(path: str) -> List[str]:
+    return _hdf_store_keys(path) or _h5_arrays(path)
+
+
+@register_batch_reader(HDF_EXTENSIONS)
+def iter_hdf(
+    path: str,
+    key: Optional[str] = None,
+    where: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    One key of an HDF5 file. Table-format stores are read in row chunks,
+    filtered by `where` and `columns` inside PyTables; fixed-format ones
+    can only be read whole.
+    """
+    store_keys = _hdf_store_keys(path)
+    if not store_keys:
+        if where is not None or columns:
+            raise ValueError("where / columns need a pandas table-format HDF5 store")
+        yield from _iter_h5_array(path, pick_key(key, _h5_arrays(path), "dataset"))
+        return
+
+    key = pick_key(key, store_keys, "key")
+    with pd.HDFStore(path, mode="r") as store:
+        if store.get_storer(key).is_table:
+            yield from store.select(key, where=where, columns=columns, chunksize=READ_BATCH_ROWS)
+            return
+        if where is not None:
+            raise ValueError(f"{key} is stored in fixed format; where needs table format")
+        df = store.get(key)
+        yield df[columns] if columns else df
+
+
+def _mat_is_hdf5(path: str) -> bool:
+    from scipy.io.matlab import matfile_version
+
+    return matfile_version(path)[0] == 2  # v7.3 files are HDF5
+
+
+@register_key_lister(["mat"])
+def list_mat_variables(path: str) -> List[str]:
+    """Numeric 1-D / 2-D variables, from the file's headers only."""
+    if _mat_is_hdf5(path):
+        return _h5_arrays(path, matlab=True)
+    from scipy.io import whosmat
+
+    return [
+        name
+        for name, shape, cls in whosmat(path)
+        if len(shape) == 2 and cls not in _MAT_SKIP_CLASSES
+    ]
+
+
+@register_batch_reader(["mat"])
+def iter_mat(path: str, key: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    One variable of a MAT file. v7.3 (HDF5) variables are read in h5py
+    slices; older versions load just the selected variable.
+    """
+    key = pick_key(key, list_mat_variables(path), "variable")
+    if _mat_is_hdf5(path):
+        yield from _iter_h5_array(path, key, matlab=True)
+        return
+    from scipy.io import loadmat
+
+    yield pd.DataFrame(loadmat(path, variable_names=[key])[key])
@@ -0,0 +1,174 @@
+# app/services/incremental.py
+"""
+Incremental appends: new row batches become extra partitions of an
+existing dataset. The dataset's mergeable statistics and row-hash set
+are updated from the new partition only, and only the new partition is
+cleaned - with the fill values and z-score baseline fitted on the last
+full clean. If the new rows drift too far from that baseline the whole
+dataset is re-cleaned and the baseline refitted.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config import APPEND_DRIFT_THRESHOLD
+from ..schemas.datasets import CleaningOptions
+from ..utils.id_gen import generate_dataset_id
+from . import catalog
+from .cleaning import apply_cleaning_params, fit_cleaning_params
+from .dataset_stats import (
+    column_mean_std,
+    compute_stats,
+    load_row_hashes,
+    load_stats,
+    merge_stats,
+    row_hashes,
+    save_row_hashes,
+    save_stats,
+)
+from .ingestion import (
+    add_partition,
+    dataset_dir,
+    dataset_partitions,
+    iter_partitions,
+    load_dataset,
+    replace_partitions,
+)
+
+# one append at a time per dataset
+_dataset_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+
+def _bootstrap_stats(dataset_id: str) -> tuple[Dict[str, Any], np.ndarray]:
+    """Stats and row hashes of a dataset, computed once partition by partition."""
+    directory = dataset_dir(dataset_id)
+    stats = load_stats(directory)
+    hashes = load_row_hashes(directory)
+    if stats is not None and hashes is not None:
+        return stats, hashes
+
+    stats, parts = None, []
+    for part in iter_partitions(dataset_id):
+        part_stats = compute_stats(part)
+        stats = part_stats if stats is None else merge_stats(stats, part_stats)
+        parts.append(row_hashes(part))
+    hashes = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.uint64)
+    stats["n_distinct_rows"] = int(len(hashes))
+    return stats, hashes
+
+
+def _align_batch(batch: pd.DataFrame, stats: Dict[str, Any]) -> pd.DataFrame:
+    columns = list(stats["columns"])
+    batch = batch.rename(columns=str)
+    extra = [c for c in batch.columns if c not in columns]
+    if extra:
+        raise ValueError(f"Appended rows have columns not in the dataset: {extra}")
+    return batch.reindex(columns=columns)
+
+
+def _drift(batch_stats: Dict[str, Any], params: Dict[str, Any]) -> float:
+    """Largest shift of a numeric column mean, in baseline standard deviations."""
+    drift = 0.0
+    for col, baseline_mean in params["means"].items():
+        col_stats = batch_stats["columns"].get(col)
+        baseline_std = params["stds"].get(col)
+        if col_stats is None or not baseline_std or np.isnan(baseline_std):
+            continue
+        mean, _ = column_mean_std(col_stats)
+        if mean is not None:
+            drift = max(drift, abs(mean - baseline_mean) / baseline_std)
+    return drift
+
+
+def _full_reclean(dataset_id: str, entry: Dict[str, Any], options: CleaningOptions) -> Dict[str, Any]:
+    df = load_dataset(dataset_id)
+    params = fit_cleaning_params(df, options)
+    cleaned, dup_removed, outliers_removed = apply_cleaning_params(df, params, options)
+
+    cleaned_id = entry.get("cleaned_dataset_id") or generate_dataset_id()
+    replace_partitions(cleaned_id, [cleaned], source_dataset_id=dataset_id)
+
+    def update(e):
+        e["cleaned_dataset_id"] = cleaned_id
+        e["clean_options"] = options.model_dump()
+        e["clean_params"] = params
+        return e
+
+    catalog.update_entry(dataset_id, update)
+    return {
+        "cleaned_dataset_id": cleaned_id,
+        "cleaned_rows_written": int(len(cleaned)),
+        "duplicate_rows_removed": dup_removed,
+        "outlier_rows_removed": outliers_removed,
+    }
+
+
+def append_rows(
+    dataset_id: str, batch: pd.DataFrame, drift_threshold: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Append batch to dataset_id as a new partition and update the cleaned
+    output incrementally. Returns a summary of what was done.
+    Raises FileNotFoundError for unknown datasets and ValueError if the
+    batch's columns do not fit the dataset.
+    """
+    if drift_threshold is None:
+        drift_threshold = APPEND_DRIFT_THRESHOLD
+    dataset_partitions(dataset_id)  # raises FileNotFoundError early
+
+    with _dataset_locks[dataset_id]:
+        stats, hashes = _bootstrap_stats(dataset_id)
+        batch = _align_batch(batch, stats)
+        batch_stats = compute_stats(batch)
+        batch_hashes = row_hashes(batch)
+
+        # global stats and row-hash set absorb the new partition only
+        stats = merge_stats(stats, batch_stats)
+        new_hashes = np.union1d(hashes, batch_hashes)
+        stats["n_distinct_rows"] = int(len(new_hashes))
+
+        entry = catalog.get_entry(dataset_id) or {}
+        options = CleaningOptions(**entry.get("clean_options", {}))
+        params = entry.get("clean_params")
+        drift = _drift(batch_stats, params) if params else None
+        full_recompute = (
+            params is None or drift > drift_threshold or not entry.get("cleaned_dataset_id")
+        )
+
+        if full_recompute:
+            partition = add_partition(dataset_id, batch)
+            summary = _full_reclean(dataset_id, entry, options)
+        else:
+            cleaned, dup_removed, outliers_removed = apply_cleaning_params(
+                batch, params, options, seen_hashes=hashes
+            )
+            partition = add_partition(dataset_id, batch)
+            add_partition(entry["cleaned_dataset_id"], cleaned)
+            summary = {
+                "cleaned_dataset_id": entry["cleaned_dataset_id"],
+                "cleaned_rows_written": int(len(cleaned)),
+                "duplicate_rows_removed": dup_removed,
+                "outlier_rows_removed": outliers_removed,
+            }
+
+        save_stats(dataset_dir(dataset_id), stats)
+        save_row_hashes(dataset_dir(dataset_id), new_hashes)
+
+    return {
+        "dataset_id": dataset_id,
+        "partition": partition,
+        "n_rows_appended": int(len(batch)),
+        "n_rows_total": int(stats["n_rows"]),
+        "drift": drift,
+        "full_recompute": full_recompute,
+        **summary,
+    }
+
+
+def dataset_stats(dataset_id: str) -> Optional[Dict[str, Any]]:
+    """Incrementally maintained stats of a dataset, if it has any."""
+    return load_stats(dataset_dir(dataset_id))
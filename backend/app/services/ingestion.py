@@ -1,10 +1,28 @@
 # app/services/ingestion.py
 
+import hashlib
 import os
+import shutil
+from typing import Iterable, Iterator, List, Optional
+
 import pandas as pd
-from ..config import BASE_UPLOAD_DIR
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+from ..config import BASE_UPLOAD_DIR, PARTITION_ROWS
+from ..utils.hashing import file_sha256
 from ..utils.id_gen import generate_dataset_id
+from . import catalog
+from . import file_readers  # noqa: F401  (registers the tabular readers)
+from . import archive_readers  # noqa: F401  (zip archives, member by member)
+from . import doc_readers  # noqa: F401  (PDF / DOCX / OCR; each reports its missing package)
+from .compressed import data_extension
 from .ingestion_base import get_reader
+from .instrumentation import timed
+from .progress import report_progress
+
+# Uploads are copied to disk in blocks of this size
+_COPY_BLOCK_SIZE = 1 << 20
 
 
 def save_uploaded_file(file_obj) -> tuple[str, str]:
@@ -13,9 +31,10 @@ def save_uploaded_file(file_obj) -> tuple[str, str]:
     """
     dataset_id = generate_dataset_id()
 
-    # Get original extension (e.g. ".csv")
-    _, ext = os.path.splitext(file_obj.filename or "")
-    ext = ext.lower()
+    # Get original extension, compression suffixes included (e.g. ".csv.gz")
+    name = (file_obj.filename or "").lower()
+    data_ext = data_extension(name)
+    ext = name[name.rfind(f".{data_ext}"):] if data_ext else ""
 
     if not ext:
         # default to .csv if no extension
@@ -24,10 +43,17 @@ def save_uploaded_file(file_obj) -> tuple[str, str]:
     # Build path
     file_path = os.path.join(BASE_UPLOAD_DIR, f"{dataset_id}{ext}")
 
-    # Write bytes to disk
+    # Write bytes to disk block by block (FastAPI's UploadFile has .file)
+    total_bytes = getattr(file_obj, "size", None)
+    written = 0
     with open(file_path, "wb") as f:
-        # FastAPI's UploadFile has .file
-        f.write(file_obj.file.read())
+        while True:
+            block = file_obj.file.read(_COPY_BLOCK_SIZE)
+            if not block:
+                break
+            f.write(block)
+            written += len(block)
+            report_progress("upload", bytes_read=written, total_bytes=total_bytes)
 
     return dataset_id, file_path
 
@@ -37,23 +63,277 @@ def _find_file_by_dataset_id(dataset_id: str) -> str:
     Locate the physical file on disk whose name starts with dataset_id.
     """
     for name in os.listdir(BASE_UPLOAD_DIR):
-        if name.startswith(dataset_id):
-            return os.path.join(BASE_UPLOAD_DIR, name)
+        path = os.path.join(BASE_UPLOAD_DIR, name)
+        if name.startswith(dataset_id) and os.path.isfile(path):
+            return path
     raise FileNotFoundError(f"Dataset {dataset_id} not found")
 
 
+# --------- PARTITIONS ----------
+# A dataset is one or more partition files. Datasets with a catalog entry
+# list them (relative to BASE_UPLOAD_DIR) under "partitions"; older
+# datasets are a single file named after their id.
+
+def dataset_dir(dataset_id: str) -> str:
+    """Directory holding a dataset's partition files."""
+    return os.path.join(BASE_UPLOAD_DIR, f"{dataset_id}.parts")
+
+
+def dataset_partitions(dataset_id: str) -> List[str]:
+    """
+    Return the absolute paths of a dataset's partitions, in order.
+    Raises FileNotFoundError if the dataset does not exist.
+    """
+    entry = catalog.get_entry(dataset_id)
+    if entry and entry.get("partitions"):
+        return [os.path.join(BASE_UPLOAD_DIR, p) for p in entry["partitions"]]
+    return [_find_file_by_dataset_id(dataset_id)]
+
+
+@timed("read_partition")
+def read_partition(path: str) -> pd.DataFrame:
+    """Read one partition file with the reader registered for its extension."""
+    _, ext = os.path.splitext(path)
+    return get_reader(ext)(path)
+
+
+def iter_partitions(dataset_id: str) -> Iterator[pd.DataFrame]:
+    """Yield a dataset's partitions one frame at a time."""
+    for path in dataset_partitions(dataset_id):
+        yield read_partition(path)
+
+
+@timed("load")
 def load_dataset(dataset_id: str) -> pd.DataFrame:
     """
     Load a previously saved dataset as a pandas DataFrame,
     using the registered reader based on file extension.
+    Partitioned datasets are concatenated in partition order.
+    """
+    frames = list(iter_partitions(dataset_id))
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    report_progress("read", rows=len(df), total_rows=len(df))
+    return df
+
+
+# Formats Arrow can scan lazily; other (legacy) files are read whole
+_ARROW_FORMATS = {".arrow": "ipc", ".feather": "ipc", ".parquet": "parquet", ".csv": "csv"}
+
+
+def open_dataset(dataset_id: str) -> ds.Dataset:
+    """
+    A dataset's partitions as one pyarrow Dataset, for engines that scan
+    them with projection / filter pushdown (IPC files are memory-mapped).
+    Partitions whose dtypes diverged after appends are read with a common
+    schema. Raises FileNotFoundError if the dataset does not exist.
+    """
+    paths = dataset_partitions(dataset_id)
+    formats = {_ARROW_FORMATS.get(os.path.splitext(p)[1].lower()) for p in paths}
+    if len(formats) != 1 or None in formats:
+        return ds.dataset(_to_arrow(load_dataset(dataset_id)))
+    fmt = formats.pop()
+    schema = pa.unify_schemas(
+        [ds.dataset(p, format=fmt).schema for p in paths], promote_options="permissive"
+    )
+    return ds.dataset(paths, format=fmt, schema=schema)
+
+
+def list_datasets() -> List[str]:
+    """Ids of the datasets recorded in the catalog."""
+    return [d for d, entry in catalog.list_entries().items() if entry.get("partitions")]
+
+
+def partition_relpath(dataset_id: str, index: int) -> str:
+    """Path (relative to BASE_UPLOAD_DIR) of a dataset's index-th partition."""
+    return os.path.join(f"{dataset_id}.parts", f"part-{index:05d}.arrow")
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    df = df.rename(columns=str)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # mixed-type object columns (e.g. from Excel / JSON) are stored as text
+        df = df.copy()
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+@timed("write_partition")
+def write_partition(dataset_id: str, df: pd.DataFrame, index: int) -> str:
+    """
+    Write one partition file (without touching the catalog).
+    Partitions are uncompressed Arrow IPC (Feather v2) so readers can
+    memory-map them instead of parsing and copying.
+    """
+    os.makedirs(dataset_dir(dataset_id), exist_ok=True)
+    rel_path = partition_relpath(dataset_id, index)
+    table = _to_arrow(df)
+    # one record batch per partition: columns can then be read zero-copy
+    feather.write_feather(
+        table,
+        os.path.join(BASE_UPLOAD_DIR, rel_path),
+        compression="uncompressed",
+        chunksize=max(table.num_rows, 1),
+    )
+    return rel_path
+
+
+def set_partitions(dataset_id: str, rel_paths: List[str], **metadata) -> None:
+    """Record a dataset's partition manifest (and extra metadata) in the catalog."""
+
+    def update(entry):
+        entry.update(metadata)
+        entry["partitions"] = rel_paths
+        entry.pop("content_hash", None)
+        entry.pop("compressed_partitions", None)
+        return entry
+
+    catalog.update_entry(dataset_id, update)
+
+
+def add_partition(dataset_id: str, df: pd.DataFrame) -> str:
+    """
+    Store df as a new partition at the end of the dataset and record it
+    in the catalog. Returns the partition path relative to BASE_UPLOAD_DIR.
+    """
+    existing = [os.path.relpath(p, BASE_UPLOAD_DIR) for p in dataset_partitions(dataset_id)]
+    rel_path = write_partition(dataset_id, df, len(existing))
+
+    def update(entry):
+        entry["partitions"] = entry.get("partitions") or existing
+        entry["partitions"] = entry["partitions"] + [rel_path]
+        entry.pop("content_hash", None)
+        return entry
+
+    catalog.update_entry(dataset_id, update)
+    return rel_path
+
+
+def content_hash(dataset_id: str) -> str:
+    """
+    SHA-256 over the dataset's partition contents. Hashed on first use and
+    kept in the catalog until the partitions change, so it is usually one
+    catalog lookup. Raises FileNotFoundError if the dataset does not exist.
+    """
+    entry = catalog.get_entry(dataset_id) or {}
+    if entry.get("content_hash"):
+        return entry["content_hash"]
+    paths = dataset_partitions(dataset_id)
+    digest = hashlib.sha256("".join(file_sha256(p) for p in paths).encode()).hexdigest()
+    snapshot = entry.get("partitions")
+
+    def update(entry):
+        # skip if partitions were added while hashing
+        if entry.get("partitions") == snapshot:
+            entry["content_hash"] = digest
+        return entry
+
+    catalog.update_entry(dataset_id, update)
+    return digest
+
+
+def delete_dataset(dataset_id: str) -> None:
+    """Remove a dataset's partitions (or legacy single file) and catalog entry."""
+    entry = catalog.get_entry(dataset_id)
+    if not (entry and entry.get("partitions")):
+        try:
+            os.remove(_find_file_by_dataset_id(dataset_id))
+        except FileNotFoundError:
+            pass
+    shutil.rmtree(dataset_dir(dataset_id), ignore_errors=True)
+    catalog.delete_entry(dataset_id)
+
+
+def replace_partitions(dataset_id: str, frames: List[pd.DataFrame], **metadata) -> None:
+    """
+    Rewrite a dataset from scratch as the given partitions and record it
+    in the catalog together with any extra metadata (e.g. lineage).
+    """
+    shutil.rmtree(dataset_dir(dataset_id), ignore_errors=True)
+    rel_paths = [write_partition(dataset_id, df, i) for i, df in enumerate(frames)]
+    set_partitions(dataset_id, rel_paths, **metadata)
+
+
+def split_partitions(df: pd.DataFrame, rows: Optional[int] = None) -> List[pd.DataFrame]:
+    """Split df into row-group partitions of at most `rows` (default PARTITION_ROWS) rows."""
+    if rows is None:
+        rows = PARTITION_ROWS
+    if len(df) <= rows:
+        return [df]
+    return [df.iloc[start:start + rows] for start in range(0, len(df), rows)]
+
+
+@timed("save")
+def save_dataset(df: pd.DataFrame, dataset_id: Optional[str] = None, **metadata) -> str:
+    """
+    Store df as a new partitioned dataset and return its id.
+    Extra keyword arguments are recorded in the catalog entry.
+    """
+    dataset_id = dataset_id or generate_dataset_id()
+    report_progress("save", rows=0, total_rows=len(df))
+    replace_partitions(dataset_id, split_partitions(df), **metadata)
+    report_progress("save", rows=len(df), total_rows=len(df))
+    return dataset_id
+
+
+def write_batches(batches: Iterable[pd.DataFrame], dataset_id: str) -> List[str]:
+    """
+    Write a stream of DataFrame batches as a dataset's partitions, without
+    touching the catalog, and return their relative paths. Batches are
+    regrouped into partitions of PARTITION_ROWS, each written as soon as
+    it is full, so at most one partition is held in memory.
+    """
+    shutil.rmtree(dataset_dir(dataset_id), ignore_errors=True)
+    rel_paths: List[str] = []
+    buffer: List[pd.DataFrame] = []
+    n_buffered = n_rows = 0
+
+    def flush():
+        nonlocal buffer, n_buffered
+        df = pd.concat(buffer, ignore_index=True) if len(buffer) > 1 else buffer[0]
+        rel_paths.append(write_partition(dataset_id, df, len(rel_paths)))
+        buffer, n_buffered = [], 0
+
+    try:
+        empty = pd.DataFrame()
+        for batch in batches:
+            if not n_rows:
+                empty = batch.iloc[:0]  # keeps the columns of an empty input
+            n_rows += len(batch)
+            while len(batch):
+                take = PARTITION_ROWS - n_buffered
+                buffer.append(batch.iloc[:take])
+                n_buffered += len(buffer[-1])
+                batch = batch.iloc[take:]
+                if n_buffered == PARTITION_ROWS:
+                    flush()
+            report_progress("save", rows=n_rows)
+        if buffer or not rel_paths:
+            buffer = buffer or [empty]
+            flush()
+    except BaseException:
+        shutil.rmtree(dataset_dir(dataset_id), ignore_errors=True)
+        raise
+    return rel_paths
+
+
+@timed("ingest")
+def save_batches(
+    batches: Iterable[pd.DataFrame], dataset_id: Optional[str] = None, **metadata
+) -> str:
+    """
+    Store a stream of DataFrame batches (e.g. from a batch reader) as a new
+    partitioned dataset and return its id (see write_batches()).
     """
-    file_path = _find_file_by_dataset_id(dataset_id)
+    dataset_id = dataset_id or generate_dataset_id()
+    rel_paths = write_batches(batches, dataset_id)
+    set_partitions(dataset_id, rel_paths, **metadata)
+    return dataset_id
 
-    _, ext = os.path.splitext(file_path)
-    ext = ext.lower().lstrip(".")
 
-    reader = get_reader(ext)
-    return reader(file_path)
 def get_dataset_file_path(dataset_id: str) -> str:
     """
     Return the physical file path for a given dataset_id.
@@ -1,36 +1,113 @@
 # app/services/ingestion_base.py
 
-from typing import Callable, Dict
+import os
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+import numpy as np
 import pandas as pd
 
+from ..config import READ_BATCH_ROWS
+
 # Type alias for all reader functions
 ReaderFn = Callable[[str], pd.DataFrame]
 
+# Batch readers yield a file as a sequence of DataFrames of bounded size,
+# so callers can process inputs larger than memory
+BatchReaderFn = Callable[..., Iterator[pd.DataFrame]]
+
+# Container formats (workbooks, HDF5 stores, MAT files) hold several
+# tables; their readers take a `key` option (sheet / HDF5 key / variable)
+# and a key lister returns the available keys without loading data
+KeyListerFn = Callable[[str], List[str]]
+
+# Streaming readers (registered with streaming=True) read their input
+# front to back, so besides a path they accept an opener: a callable
+# returning a fresh binary stream, e.g. a decompressor or a zip member
+Source = Union[str, Callable[[], IO[bytes]]]
+
 # Global registry: extension -> reader function
 _reader_registry: Dict[str, ReaderFn] = {}
+_batch_reader_registry: Dict[str, BatchReaderFn] = {}
+_key_lister_registry: Dict[str, KeyListerFn] = {}
+_streaming_extensions: Set[str] = set()
+
+
+def _normalize_extensions(extensions) -> list:
+    if isinstance(extensions, str):
+        extensions = [extensions]
+    return [ext.lower().lstrip(".") for ext in extensions]
 
 
-def register_reader(extensions):
+def register_reader(extensions, streaming: bool = False):
     """
     Decorator to register a file reader function for one or more extensions.
+    With streaming=True the reader also accepts an opener (see Source).
 
     Example:
         @register_reader(["csv"])
         def read_csv(path: str) -> pd.DataFrame:
             ...
     """
-    if isinstance(extensions, str):
-        extensions = [extensions]
-
     def decorator(func: ReaderFn) -> ReaderFn:
-        for ext in extensions:
-            ext_norm = ext.lower().lstrip(".")
-            _reader_registry[ext_norm] = func
+        for ext in _normalize_extensions(extensions):
+            _reader_registry[ext] = func
+            if streaming:
+                _streaming_extensions.add(ext)
+        return func
+
+    return decorator
+
+
+def register_batch_reader(extensions, streaming: bool = False):
+    """
+    Decorator to register a batch reader (path -> iterator of DataFrames)
+    for one or more extensions. A full-frame reader that concatenates the
+    batches is registered too, unless the extension already has one.
+    With streaming=True the reader also accepts an opener (see Source).
+
+    Example:
+        @register_batch_reader(["csv"])
+        def iter_csv(path: str) -> Iterator[pd.DataFrame]:
+            ...
+    """
+    def decorator(func: BatchReaderFn) -> BatchReaderFn:
+        for ext in _normalize_extensions(extensions):
+            _batch_reader_registry[ext] = func
+            _reader_registry.setdefault(ext, _concatenating(func))
+            if streaming:
+                _streaming_extensions.add(ext)
+        return func
+
+    return decorator
+
+
+def register_key_lister(extensions):
+    """Decorator to register the key lister of a container format."""
+    def decorator(func: KeyListerFn) -> KeyListerFn:
+        for ext in _normalize_extensions(extensions):
+            _key_lister_registry[ext] = func
         return func
 
     return decorator
 
 
+def _concatenating(func: BatchReaderFn) -> ReaderFn:
+    def read(path: str, **options) -> pd.DataFrame:
+        return concat_batches(func(path, **options))
+
+    read.__name__ = func.__name__
+    return read
+
+
+def concat_batches(batches: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """One DataFrame from a batch reader's output."""
+    batches = list(batches)
+    if not batches:
+        return pd.DataFrame()
+    if len(batches) == 1:
+        return batches[0]
+    return pd.concat(batches, ignore_index=True)
+
+
 def get_reader(ext: str) -> ReaderFn:
     """
     Return the registered reader for a given file extension.
@@ -41,3 +118,114 @@ def get_reader(ext: str) -> ReaderFn:
         return _reader_registry[ext_norm]
     except KeyError:
         raise ValueError(f"No reader registered for extension: {ext_norm}")
+
+
+def get_batch_reader(ext: str) -> BatchReaderFn:
+    """
+    Return the batch reader for a given file extension. Extensions with
+    only a full-frame reader get it wrapped as a single batch.
+    Raises ValueError if no reader is registered.
+    """
+    ext_norm = ext.lower().lstrip(".")
+    if ext_norm in _batch_reader_registry:
+        return _batch_reader_registry[ext_norm]
+    reader = get_reader(ext_norm)
+
+    def read_batches(path: str, **options) -> Iterator[pd.DataFrame]:
+        yield reader(path, **options)
+
+    return read_batches
+
+
+def is_streaming(ext: str) -> bool:
+    """Whether the reader for this extension accepts an opener as well as a path."""
+    return ext.lower().lstrip(".") in _streaming_extensions
+
+
+def open_binary(source: Source) -> IO[bytes]:
+    """Open a reader's input - a path or an opener - as a binary stream."""
+    if callable(source):
+        return source()
+    return open(source, "rb")
+
+
+def has_keys(ext: str) -> bool:
+    """Whether files with this extension hold several keyed tables."""
+    return ext.lower().lstrip(".") in _key_lister_registry
+
+
+def pick_key(key: Optional[str], keys: List[str], what: str = "key") -> str:
+    """
+    The entry of `keys` that `key` names (the first one if key is None),
+    ignoring a leading "/" as HDF5 paths have. Raises ValueError if none.
+    """
+    if not keys:
+        raise ValueError(f"No {what}s found in file")
+    if key is None:
+        return keys[0]
+    for candidate in (key, "/" + key.lstrip("/"), key.lstrip("/")):
+        if candidate in keys:
+            return candidate
+    raise ValueError(f"No {what} named {key!r}. Available: {keys}")
+
+
+def list_keys(path: str, ext: Optional[str] = None) -> List[str]:
+    """
+    Keys (sheets / HDF5 keys / variables) of a container file, without
+    loading its data. Raises ValueError for formats without keys.
+    """
+    ext_norm = (ext or os.path.splitext(path)[1]).lower().lstrip(".")
+    try:
+        lister = _key_lister_registry[ext_norm]
+    except KeyError:
+        raise ValueError(f"Files of type .{ext_norm} have no sheets or keys")
+    return lister(path)
+
+
+def _infer_types(df: pd.DataFrame, types: Dict[str, Any]) -> pd.DataFrame:
+    # text parsed out of markup: numeric-looking columns become numbers,
+    # empty cells become missing, as pd.read_xml / pd.read_html do. A
+    # column's type is decided by the first batch holding a value in it and
+    # recorded in `types`, so every batch of a file agrees: later values
+    # that do not parse as numbers become missing
+    for col in df.columns:
+        s = df[col].replace("", None)
+        if col not in types and s.notna().any():
+            numeric = pd.to_numeric(s, errors="coerce")
+            types[col] = numeric.dtype if numeric.notna().sum() == s.notna().sum() else None
+        dtype = types.get(col)
+        if dtype is None:
+            df[col] = s  # text, or no values yet
+            continue
+        numeric = pd.to_numeric(s, errors="coerce")
+        # an int column read as floats in this batch (e.g. missing values)
+        # widens, a float column stays float
+        df[col] = numeric.astype(np.result_type(numeric.dtype, dtype))
+    return df
+
+
+def iter_row_batches(
+    rows: Iterable[Dict[str, Any]],
+    batch_rows: int = READ_BATCH_ROWS,
+    infer_types: bool = True,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Group dict rows from a streaming parser into DataFrame batches. With
+    infer_types, columns whose first values all parse as numbers become
+    numeric, in every batch.
+    """
+    types: Dict[str, Any] = {}
+
+    def frame(batch):
+        df = pd.DataFrame(batch, columns=columns)
+        return _infer_types(df, types) if infer_types else df
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield frame(batch)
+            batch = []
+    if batch:
+        yield frame(batch)
@@ -0,0 +1,310 @@
+# app/services/instrumentation.py
+"""
+Lightweight performance instrumentation.
+
+Stages of ingestion, reading, profiling, quality scoring, cleaning and
+saving run inside span("stage") (or functions decorated with
+@timed("stage")). A span records its wall time and the change in process
+RSS. With TRACE_MEMORY it also records the stage's tracemalloc
+high-water mark above its starting allocation. tracemalloc is
+process-wide, so concurrent requests add to each other's peaks.
+
+Spans feed per-stage histograms, and TimingMiddleware feeds per-route
+request latency histograms. Both are rendered in Prometheus text format
+by render_metrics() (served at /metrics). A request sent with an
+"X-Timing" header gets its own per-stage breakdown back in an "X-Timing"
+response header ("stage;dur=ms;n=count;rss=MB", Server-Timing style).
+
+With METRICS_ENABLED off, span() returns a shared no-op context and
+@timed functions call straight through, so the cost is one flag check.
+Spans in worker processes are not exported; the parent times the
+parallel call as a whole.
+"""
+
+import bisect
+import contextvars
+import functools
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from ..config import METRICS_ENABLED, TRACE_MEMORY
+
+T = TypeVar("T")
+
+# Seconds; the Prometheus client's default buckets plus longer ones for big files
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_NO_SPAN = nullcontext()
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# per-request breakdown: stage -> [seconds, count, rss_delta]
+_request_timings: contextvars.ContextVar[Optional[Dict[str, List[float]]]] = (
+    contextvars.ContextVar("request_timings", default=None)
+)
+# tracemalloc peaks of the spans open in this context (innermost last)
+_open_peaks: contextvars.ContextVar[Tuple[List[int], ...]] = contextvars.ContextVar(
+    "open_peaks", default=()
+)
+
+if METRICS_ENABLED and TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+_lock = threading.Lock()
+_request_hist: Dict[Tuple[str, str, str], _Histogram] = {}
+_stage_hist: Dict[str, _Histogram] = {}
+_stage_rss_delta: Dict[str, int] = {}   # largest RSS growth seen per stage
+_stage_peak_bytes: Dict[str, int] = {}  # largest tracemalloc high-water per stage
+
+
+def _rss() -> int:
+    """Current resident set size in bytes (the high-water mark off Linux)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _max_rss() -> int:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def _span(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    rss_before = _rss()
+    tracing = TRACE_MEMORY and tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        # the enclosing span keeps the peak reached before we reset it
+        parents = _open_peaks.get()
+        if parents:
+            parents[-1][0] = max(parents[-1][0], peak)
+        tracemalloc.reset_peak()
+        mine = [current]
+        token = _open_peaks.set(parents + (mine,))
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        rss_delta = _rss() - rss_before
+        peak_bytes = None
+        if tracing:
+            _open_peaks.reset(token)
+            peak = max(tracemalloc.get_traced_memory()[1], mine[0])
+            if parents:
+                parents[-1][0] = max(parents[-1][0], peak)
+            peak_bytes = peak - current
+        record_stage(stage, seconds, rss_delta, peak_bytes)
+
+
+def span(stage: str):
+    """Context manager timing a stage (a no-op when metrics are disabled)."""
+    if not METRICS_ENABLED:
+        return _NO_SPAN
+    return _span(stage)
+
+
+def timed(stage: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator running every call of a function inside span(stage)."""
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _span(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_iter(stage: str, items: Iterable[T]) -> Iterator[T]:
+    """
+    Yield from items, timing only the time spent producing them (not the
+    consumer's work between items) as one span when exhausted.
+    """
+    if not METRICS_ENABLED:
+        yield from items
+        return
+    seconds = 0.0
+    rss_before = _rss()
+    iterator = iter(items)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - started
+            yield item
+    finally:
+        record_stage(stage, seconds, _rss() - rss_before)
+
+
+def record_stage(
+    stage: str, seconds: float, rss_delta: int = 0, peak_bytes: Optional[int] = None
+) -> None:
+    with _lock:
+        _stage_hist.setdefault(stage, _Histogram()).observe(seconds)
+        _stage_rss_delta[stage] = max(_stage_rss_delta.get(stage, 0), rss_delta)
+        if peak_bytes is not None:
+            _stage_peak_bytes[stage] = max(_stage_peak_bytes.get(stage, 0), peak_bytes)
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(stage, [0.0, 0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+        entry[2] += rss_delta
+
+
+def record_request(method: str, route: str, status: int, seconds: float) -> None:
+    with _lock:
+        _request_hist.setdefault((method, route, str(status)), _Histogram()).observe(seconds)
+
+
+# --------- PROMETHEUS ----------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+
+
+def _histogram_lines(name: str, hist: _Histogram, labels: str) -> List[str]:
+    lines, cumulative = [], 0
+    for bound, count in zip(_BUCKETS + (float("inf"),), hist.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {hist.sum}")
+    lines.append(f"{name}_count{{{labels}}} {hist.count}")
+    return lines
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP cleanmind_request_duration_seconds HTTP request latency by route.",
+        "# TYPE cleanmind_request_duration_seconds histogram",
+    ]
+    with _lock:
+        for (method, route, status), hist in sorted(_request_hist.items()):
+            labels = _labels(method=method, route=route, status=status)
+            lines += _histogram_lines("cleanmind_request_duration_seconds", hist, labels)
+        lines += [
+            "# HELP cleanmind_stage_duration_seconds Time spent per processing stage.",
+            "# TYPE cleanmind_stage_duration_seconds histogram",
+        ]
+        for stage, hist in sorted(_stage_hist.items()):
+            lines += _histogram_lines("cleanmind_stage_duration_seconds", hist, _labels(stage=stage))
+        lines += [
+            "# HELP cleanmind_stage_rss_growth_bytes Largest RSS growth over one run of a stage.",
+            "# TYPE cleanmind_stage_rss_growth_bytes gauge",
+        ]
+        lines += [
+            f"cleanmind_stage_rss_growth_bytes{{{_labels(stage=s)}}} {v}"
+            for s, v in sorted(_stage_rss_delta.items())
+        ]
+        if _stage_peak_bytes:
+            lines += [
+                "# HELP cleanmind_stage_peak_traced_bytes Largest tracemalloc high-water mark of a stage.",
+                "# TYPE cleanmind_stage_peak_traced_bytes gauge",
+            ]
+            lines += [
+                f"cleanmind_stage_peak_traced_bytes{{{_labels(stage=s)}}} {v}"
+                for s, v in sorted(_stage_peak_bytes.items())
+            ]
+    lines += [
+        "# HELP cleanmind_process_resident_memory_bytes Resident memory of the API process.",
+        "# TYPE cleanmind_process_resident_memory_bytes gauge",
+        f"cleanmind_process_resident_memory_bytes {_rss()}",
+        "# HELP cleanmind_process_max_resident_memory_bytes Peak resident memory of the API process.",
+        "# TYPE cleanmind_process_max_resident_memory_bytes gauge",
+        f"cleanmind_process_max_resident_memory_bytes {_max_rss()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+# --------- MIDDLEWARE ----------
+
+def _timing_header(timings: Dict[str, List[float]]) -> str:
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.1f};n={count};rss={rss / 2**20:.1f}"
+        for stage, (seconds, count, rss) in timings.items()
+    )
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    """The matched route with its parameters as {name} (ids would explode the label set)."""
+    if scope.get("route") is None:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware recording each request's latency under its route
+    template (until the last body chunk, so streamed responses count in
+    full) and answering "X-Timing" requests with a stage breakdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        wants_timing = any(k == b"x-timing" for k, _ in scope.get("headers", ()))
+        timings: Optional[Dict[str, List[float]]] = {} if wants_timing else None
+        token = _request_timings.set(timings)
+        status = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-timing", _timing_header(timings).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            record_request(
+                scope["method"], _route_template(scope), status, time.perf_counter() - started
+            )
@@ -0,0 +1,194 @@
+# app/services/ocr.py
+"""
+OCR stage for image readers.
+
+Images are converted to grayscale, downsampled so their longest side is
+at most OCR_MAX_SIDE and cut into horizontal strips of about
+OCR_TILE_HEIGHT pixels (cuts are moved to the blankest row nearby so
+they do not split a line of text). Strips are recognised in the shared
+worker pool, at most OCR_MAX_PENDING at a time, and each image's text is
+cached by content hash, so re-ingesting an image costs one file hash.
+
+The engine is named by OCR_ENGINE: "tesseract" (pytesseract) or a
+"module:function" path to any callable taking a PIL image and returning
+text - e.g. a stub for tests. It is resolved inside the workers, which
+is why it is passed around by name.
+"""
+
+import hashlib
+import importlib
+import os
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import CACHE_DIR, OCR_ENGINE, OCR_MAX_PENDING, OCR_MAX_SIDE, OCR_TILE_HEIGHT
+from ..utils.hashing import file_sha256
+from .progress import report_progress
+from .workers import get_executor
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+IMAGE_EXTENSIONS = ["png", "jpg", "jpeg", "tif", "tiff", "bmp"]
+
+# rows either side of a strip boundary searched for a blank row to cut at
+_CUT_SEARCH = 64
+
+
+def _pil_image():
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise ValueError(
+            "Missing image dependency 'Pillow'. "
+            "Install it in the backend environment with: pip install Pillow"
+        ) from e
+    return Image
+
+
+def tesseract_engine(img: "Image.Image") -> str:
+    import pytesseract  # optional: only needed when OCR actually runs
+
+    return pytesseract.image_to_string(img)
+
+
+def resolve_engine(name: str) -> Callable[["Image.Image"], str]:
+    if name == "tesseract":
+        return tesseract_engine
+    module, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"OCR engine must be 'tesseract' or 'module:function', got {name!r}")
+    return getattr(importlib.import_module(module), attr)
+
+
+# --------- TILING ----------
+
+def _downsample(img: "Image.Image") -> "Image.Image":
+    scale = OCR_MAX_SIDE / max(img.size)
+    if scale >= 1:
+        return img
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, _pil_image().LANCZOS)
+
+
+def _cut_rows(pixels: np.ndarray) -> List[int]:
+    """Row offsets splitting the image into strips of about OCR_TILE_HEIGHT."""
+    height = pixels.shape[0]
+    row_ink = 255.0 - pixels.mean(axis=1)  # 0 for a blank (white) row
+    cuts = [0]
+    while height - cuts[-1] > OCR_TILE_HEIGHT:
+        target = cuts[-1] + OCR_TILE_HEIGHT
+        lo = max(cuts[-1] + 1, target - _CUT_SEARCH)
+        hi = min(height - 1, target + _CUT_SEARCH)
+        cuts.append(lo + int(np.argmin(row_ink[lo:hi + 1])))
+    cuts.append(height)
+    return cuts
+
+
+def tile_image(path: str) -> List[np.ndarray]:
+    """Grayscale, downsampled strips of an image, top to bottom."""
+    with _pil_image().open(path) as img:
+        pixels = np.asarray(_downsample(img.convert("L")))
+    cuts = _cut_rows(pixels)
+    return [pixels[top:bottom] for top, bottom in zip(cuts, cuts[1:])]
+
+
+def _recognise(tile: np.ndarray, engine: str) -> str:
+    """OCR one strip; runs in a worker."""
+    return resolve_engine(engine)(_pil_image().fromarray(tile)).strip()
+
+
+# --------- CACHE ----------
+
+def _cache_path(file_hash: str, engine: str) -> str:
+    # the key covers everything that changes the text for the same image
+    settings = f"{engine}|{OCR_MAX_SIDE}|{OCR_TILE_HEIGHT}".encode()
+    return os.path.join(
+        CACHE_DIR, "ocr", f"{file_hash}-{hashlib.sha256(settings).hexdigest()[:12]}.txt"
+    )
+
+
+def _read_cache(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        os.utime(path)  # a hit counts as a use for the storage sweep
+    except FileNotFoundError:
+        return None
+    return text
+
+
+def _write_cache(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# --------- PIPELINE ----------
+
+def _iter_tiles(
+    paths: Iterable[str], engine: str
+) -> Iterator[Tuple[int, str, Optional[str], Optional[np.ndarray], bool]]:
+    """
+    (image index, cache path, cached text, tile, is last tile): one item
+    with the text for cached images, one item per tile otherwise.
+    """
+    for i, path in enumerate(paths):
+        cache_path = _cache_path(file_sha256(path), engine)
+        text = _read_cache(cache_path)
+        if text is not None:
+            yield i, cache_path, text, None, True
+            continue
+        tiles = tile_image(path)
+        for n, tile in enumerate(tiles, start=1):
+            yield i, cache_path, None, tile, n == len(tiles)
+
+
+def ocr_images(paths: List[str], engine: Optional[str] = None) -> List[str]:
+    """
+    Text of each image, in order. Uncached images are tiled and their
+    strips recognised in the worker pool with at most OCR_MAX_PENDING in
+    flight, so memory stays flat however many images are submitted.
+    """
+    engine = engine or OCR_ENGINE
+    texts: List[Optional[str]] = [None] * len(paths)
+    tile_texts: Dict[int, List[str]] = defaultdict(list)
+    in_flight: Deque[Tuple[int, str, Future, bool]] = deque()
+    n_done = 0
+    report_progress("ocr", rows=0, total_rows=len(paths))
+
+    def finish(i: int, text: str, cache_path: Optional[str] = None) -> None:
+        nonlocal n_done
+        if cache_path is not None:
+            _write_cache(cache_path, text)
+        texts[i] = text
+        n_done += 1
+        report_progress("ocr", rows=n_done, total_rows=len(paths))
+
+    def wait_oldest() -> None:
+        # tiles are queued image by image, so an image's last tile
+        # leaving the queue means all of its tiles are recognised
+        i, cache_path, future, last = in_flight.popleft()
+        tile_texts[i].append(future.result())
+        if last:
+            finish(i, "\n".join(tile_texts.pop(i)).strip(), cache_path)
+
+    for i, cache_path, text, tile, last in _iter_tiles(paths, engine):
+        if text is not None:
+            finish(i, text)
+        elif len(paths) == 1 and last and i not in tile_texts and not in_flight:
+            # a single small image is not worth a round trip to the pool
+            finish(i, _recognise(tile, engine), cache_path)
+        else:
+            future = get_executor().submit(_recognise, tile, engine)
+            in_flight.append((i, cache_path, future, last))
+            while len(in_flight) > OCR_MAX_PENDING:
+                wait_oldest()
+    while in_flight:
+        wait_oldest()
+    return texts
@@ -0,0 +1,325 @@
+# app/services/parallel.py
+"""
+Parallel processing of partitioned datasets.
+
+Work is mapped over partition files in a process pool: workers open the
+partitions themselves (only paths and small results cross process
+boundaries) and the partial results are merged here.
+
+- scan_partitions(): mergeable stats + row hashes, enough for the
+  profile and the quality score.
+- clean_partitions(): the same cleaning as a single-frame clean, done in
+  three passes - global first-occurrence dedupe mask from row hashes,
+  fill values / z-score baseline fitted from merged per-partition
+  aggregates, then each partition cleaned and written independently.
+  Each pass is timed and reported like a clean_plan step.
+- save_keys(): every key of a container file (sheets, HDF5 keys, zip
+  members) ingested as its own dataset, one key per worker.
+"""
+
+import shutil
+import time
+from concurrent.futures import as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+from ..schemas.datasets import CleaningOptions
+from .cleaning import apply_cleaning_params
+from .dataset_stats import compute_stats, is_numeric_column, merge_stats, row_hashes
+from .ingestion import (
+    dataset_dir,
+    partition_relpath,
+    read_partition,
+    set_partitions,
+    write_batches,
+    write_partition,
+)
+from .ingestion_base import get_batch_reader
+from .instrumentation import span, timed
+from .progress import report_progress
+from .workers import get_executor
+
+def map_partitions(
+    fn: Callable[..., Any], arg_lists: Sequence[Tuple], stage: str
+) -> List[Any]:
+    """
+    Call fn(*args) for every args tuple, in the process pool when there is
+    more than one, and return the results in order.
+    """
+    if len(arg_lists) == 1:
+        return [fn(*arg_lists[0])]
+
+    futures = [get_executor().submit(fn, *args) for args in arg_lists]
+    for done, _ in enumerate(as_completed(futures), start=1):
+        report_progress(stage, rows=done, total_rows=len(futures))
+    return [f.result() for f in futures]
+
+
+# --------- SCAN: profile + quality statistics ----------
+
+def _scan_partition(path: str) -> Tuple[Dict[str, Any], np.ndarray]:
+    df = read_partition(path)
+    return compute_stats(df), row_hashes(df)
+
+
+@timed("scan")
+def scan_partitions(paths: Sequence[str]) -> Tuple[Dict[str, Any], List[np.ndarray]]:
+    """
+    Merged stats of all partitions (with n_distinct_rows) and the row
+    hashes of each partition, which clean_partitions() can reuse.
+    """
+    results = map_partitions(_scan_partition, [(p,) for p in paths], "scan")
+    stats = None
+    for part_stats, _ in results:
+        stats = part_stats if stats is None else merge_stats(stats, part_stats)
+    hashes = [h for _, h in results]
+    stats["n_distinct_rows"] = int(len(np.unique(np.concatenate(hashes))))
+    return stats, hashes
+
+
+# --------- CLEAN ----------
+
+def _keep_masks(hashes: List[np.ndarray]) -> List[np.ndarray]:
+    """Per-partition masks keeping the first occurrence of every row."""
+    all_hashes = np.concatenate(hashes)
+    _, first = np.unique(all_hashes, return_index=True)
+    keep = np.zeros(len(all_hashes), dtype=bool)
+    keep[first] = True
+    bounds = np.cumsum([len(h) for h in hashes])[:-1]
+    return np.split(keep, bounds)
+
+
+def _fit_partition(
+    path: str, keep: Optional[np.ndarray], strategy: str
+) -> Dict[str, Dict[str, Any]]:
+    """Per-column aggregates of one (deduplicated) partition."""
+    df = read_partition(path)
+    if keep is not None:
+        df = df.loc[keep]
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        numeric = is_numeric_column(s)
+        values = s.astype("float64") if numeric else s
+        out[str(col)] = {
+            "numeric": numeric,
+            "count": int(s.notna().sum()),
+            "n_missing": int(s.isna().sum()),
+            "sum": float(values.sum()) if numeric else None,
+            "sumsq": float((values**2).sum()) if numeric else None,
+            # value counts give exact medians / modes after merging
+            "counts": (
+                s.value_counts(dropna=True)
+                if not numeric or strategy in ("median", "mode")
+                else s.iloc[:0].value_counts()
+            ),
+        }
+    return out
+
+
+def _mode(counts: pd.Series):
+    # pandas' mode() returns ties sorted; take the smallest like it does
+    top = counts[counts == counts.max()]
+    try:
+        return sorted(top.index)[0]
+    except TypeError:
+        return top.index[0]
+
+
+def _median(counts: pd.Series) -> float:
+    counts = counts.sort_index()
+    cum = counts.to_numpy().cumsum()
+    n = int(cum[-1])
+    values = counts.index.to_numpy(dtype="float64")
+    lower = values[np.searchsorted(cum, (n - 1) // 2, side="right")]
+    upper = values[np.searchsorted(cum, n // 2, side="right")]
+    return float((lower + upper) / 2)
+
+
+def _fit_params(parts: List[Dict[str, Dict[str, Any]]], options: CleaningOptions) -> Dict[str, Any]:
+    """Merge per-partition aggregates into fill values and z-score baseline."""
+    params = {"fill_values": {}, "means": {}, "stds": {}}
+    for col in parts[0]:
+        aggs = [p[col] for p in parts if col in p]
+        numeric = all(a["numeric"] for a in aggs)
+        count = sum(a["count"] for a in aggs)
+        n_missing = sum(a["n_missing"] for a in aggs)
+        counts = pd.concat([a["counts"] for a in aggs]).groupby(level=0).sum()
+
+        fill = None
+        if options.impute_missing:
+            strategy = options.impute_strategy
+            if strategy == "zero":
+                fill = 0
+            elif strategy == "mode" or not numeric:
+                fill = _mode(counts) if not counts.empty else (0 if strategy == "mode" else "")
+            elif strategy == "mean":
+                fill = sum(a["sum"] for a in aggs) / count if count else np.nan
+            else:
+                fill = _median(counts) if count else np.nan
+            if isinstance(fill, np.generic):
+                fill = fill.item()
+            params["fill_values"][col] = fill
+
+        if numeric:
+            total = sum(a["sum"] for a in aggs)
+            total_sq = sum(a["sumsq"] for a in aggs)
+            # imputed cells join the numeric stats with the fill value
+            if fill is not None and not pd.isna(fill) and n_missing:
+                total += n_missing * float(fill)
+                total_sq += n_missing * float(fill) ** 2
+                count += n_missing
+            mean = total / count if count else np.nan
+            var = max(total_sq / count - mean**2, 0.0) if count else np.nan
+            params["means"][col] = float(mean)
+            params["stds"][col] = float(np.sqrt(var))
+    return params
+
+
+def _clean_partition(
+    path: str,
+    keep: Optional[np.ndarray],
+    params: Dict[str, Any],
+    options: Dict[str, Any],
+    out_dataset_id: str,
+    out_index: int,
+) -> Dict[str, Any]:
+    df = read_partition(path)
+    n_missing_before = int(df.isna().sum().sum())
+    if keep is not None:
+        df = df.loc[keep]
+    opts = CleaningOptions(**{**options, "drop_duplicates": False})
+    cleaned, _, outliers = apply_cleaning_params(df, params, opts)
+
+    write_partition(out_dataset_id, cleaned, out_index)
+    return {
+        "n_rows_before": int(len(keep)) if keep is not None else int(len(df)),
+        "n_rows_in": int(len(df)),
+        "n_rows_after": int(len(cleaned)),
+        "n_missing_before": n_missing_before,
+        "n_missing_after": int(cleaned.isna().sum().sum()),
+        "outlier_rows_removed": outliers,
+        "preview": cleaned.head(20),
+    }
+
+
+def clean_partitions(
+    paths: Sequence[str],
+    options: CleaningOptions,
+    cleaned_dataset_id: str,
+    hashes: Optional[List[np.ndarray]] = None,
+    **metadata,
+) -> Dict[str, Any]:
+    """
+    Clean a partitioned dataset into cleaned_dataset_id (one output
+    partition per input partition). `hashes` are the per-partition row
+    hashes from scan_partitions(), if already computed.
+    """
+    keeps: List[Optional[np.ndarray]] = [None] * len(paths)
+    duplicate_rows_removed = 0
+    steps = []
+    started = time.perf_counter()
+    if options.drop_duplicates:
+        with span("clean.deduplicate"):
+            if hashes is None:
+                hashes = map_partitions(_hash_partition, [(p,) for p in paths], "deduplicate")
+            keeps = _keep_masks(hashes)
+        duplicate_rows_removed = int(sum(len(k) - k.sum() for k in keeps))
+        n_rows = sum(len(k) for k in keeps)
+        steps.append(_step("deduplicate", n_rows, n_rows - duplicate_rows_removed, started))
+
+    params = {"fill_values": {}, "means": {}, "stds": {}}
+    if options.impute_missing or options.remove_outliers:
+        started = time.perf_counter()
+        with span("clean.fit"):
+            parts = map_partitions(
+                _fit_partition,
+                [(p, k, options.impute_strategy) for p, k in zip(paths, keeps)],
+                "impute",
+            )
+            params = _fit_params(parts, options)
+        steps.append(_step("fit", None, None, started))
+
+    started = time.perf_counter()
+    with span("clean.apply"):
+        results = map_partitions(
+            _clean_partition,
+            [
+                (p, k, params, options.model_dump(), cleaned_dataset_id, i)
+                for i, (p, k) in enumerate(zip(paths, keeps))
+            ],
+            "clean",
+        )
+    out_paths = [partition_relpath(cleaned_dataset_id, i) for i in range(len(paths))]
+    set_partitions(cleaned_dataset_id, out_paths, **metadata)
+
+    n_rows_after = sum(r["n_rows_after"] for r in results)
+    # fill and outlier filter are applied together, partition by partition
+    steps.append(_step("apply", sum(r["n_rows_in"] for r in results), n_rows_after, started))
+
+    preview = pd.concat([r["preview"] for r in results]).head(20)
+    return {
+        "n_rows_before": sum(r["n_rows_before"] for r in results),
+        "n_rows_after": n_rows_after,
+        "n_missing_before": sum(r["n_missing_before"] for r in results),
+        "n_missing_after": sum(r["n_missing_after"] for r in results),
+        "duplicate_rows_removed": duplicate_rows_removed,
+        "outlier_rows_removed": sum(r["outlier_rows_removed"] for r in results),
+        "preview": preview,
+        "params": params,
+        "steps": steps,
+    }
+
+
+def _step(name: str, rows_in: Optional[int], rows_out: Optional[int], started: float) -> Dict[str, Any]:
+    """A step report shaped like clean_plan's ({"step", "rows_in", "rows_out", "seconds"})."""
+    return {
+        "step": name,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "seconds": round(time.perf_counter() - started, 6),
+    }
+
+
+def _hash_partition(path: str) -> np.ndarray:
+    return row_hashes(read_partition(path))
+
+
+# --------- INGEST: the keys of a container file ----------
+
+def _write_key(
+    path: str, ext: str, key: str, dataset_id: str, options: Dict[str, Any]
+) -> List[str]:
+    # catalog updates stay in the parent: the catalog is not process-safe
+    return write_batches(get_batch_reader(ext)(path, key=key, **options), dataset_id)
+
+
+def save_keys(
+    path: str,
+    ext: str,
+    keys: Sequence[str],
+    options: Optional[Dict[str, Any]] = None,
+    **metadata,
+) -> List[str]:
+    """
+    Store each key of a container file as a new dataset (recording it as
+    source_key) and return their ids, in key order. Keys are read in
+    parallel; if any fails, none of the datasets is kept.
+    """
+    dataset_ids = [str(uuid4()) for _ in keys]
+    try:
+        results = map_partitions(
+            _write_key,
+            [(path, ext, k, d, options or {}) for k, d in zip(keys, dataset_ids)],
+            "ingest",
+        )
+    except BaseException:
+        for dataset_id in dataset_ids:
+            shutil.rmtree(dataset_dir(dataset_id), ignore_errors=True)
+        raise
+    for key, dataset_id, rel_paths in zip(keys, dataset_ids, results):
+        set_partitions(dataset_id, rel_paths, source_key=key, **metadata)
+    return dataset_ids
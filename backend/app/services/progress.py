@@ -0,0 +1,182 @@
+# app/services/progress.py
+"""
+Progress reporting for long-running ingest and cleaning.
+
+Code deep inside the readers and cleaning stages calls report_progress();
+it is a no-op unless the caller installed a tracker with track_progress()
+(or runs the work through run_with_progress(), which turns the reports
+into a stream of events for SSE / NDJSON responses).
+"""
+
+import contextvars
+import io
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+ProgressFn = Callable[[Dict[str, Any]], None]
+
+_current_tracker: contextvars.ContextVar[Optional["ProgressTracker"]] = (
+    contextvars.ContextVar("progress_tracker", default=None)
+)
+
+
+class ProgressTracker:
+    """Turns raw reports into events with elapsed time and ETA."""
+
+    def __init__(self, callback: ProgressFn):
+        self.callback = callback
+        self.started = time.monotonic()
+        self._stage: Optional[str] = None
+        self._stage_started = self.started
+
+    def report(
+        self,
+        stage: str,
+        rows: Optional[int] = None,
+        total_rows: Optional[int] = None,
+        bytes_read: Optional[int] = None,
+        total_bytes: Optional[int] = None,
+    ) -> None:
+        now = time.monotonic()
+        if stage != self._stage:
+            self._stage = stage
+            self._stage_started = now
+
+        # ETA from whichever ratio we know: bytes first, then rows
+        done, total = bytes_read, total_bytes
+        if not (done and total):
+            done, total = rows, total_rows
+        eta = None
+        if done and total and total >= done:
+            eta = (now - self._stage_started) * (total - done) / done
+
+        self.callback(
+            {
+                "stage": stage,
+                "rows": rows,
+                "total_rows": total_rows,
+                "bytes_read": bytes_read,
+                "total_bytes": total_bytes,
+                "elapsed_s": round(now - self.started, 3),
+                "eta_s": round(eta, 3) if eta is not None else None,
+            }
+        )
+
+
+def report_progress(stage: str, **fields: Optional[int]) -> None:
+    """Report progress of the current stage (rows, total_rows, bytes_read, total_bytes)."""
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.report(stage, **fields)
+
+
+@contextmanager
+def track_progress(callback: ProgressFn):
+    """Send every report_progress() made inside the block to callback."""
+    token = _current_tracker.set(ProgressTracker(callback))
+    try:
+        yield
+    finally:
+        _current_tracker.reset(token)
+
+
+class ProgressReader(io.RawIOBase):
+    """
+    Wraps a binary file object and reports bytes read as it is consumed.
+    Use through progress_stream() so readers get a buffered handle.
+    """
+
+    def __init__(self, raw, stage: str, total_bytes: Optional[int] = None):
+        self._raw = raw
+        self.stage = stage
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        # report roughly every 0.5% of the file, but not more often than 1 MiB
+        self._step = max(1 << 20, (total_bytes or 0) // 200)
+        self._next_report = self._step
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._raw.seekable()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+    def readinto(self, b) -> int:
+        data = self._raw.read(len(b))
+        n = len(data)
+        b[:n] = data
+        self.bytes_read += n
+        if self.bytes_read >= self._next_report or n == 0:
+            self._next_report = self.bytes_read + self._step
+            report_progress(
+                self.stage, bytes_read=self.bytes_read, total_bytes=self.total_bytes
+            )
+        return n
+
+
+def progress_stream(raw, stage: str, total_bytes: Optional[int] = None):
+    """Buffered binary handle over raw that reports bytes read under stage."""
+    if _current_tracker.get() is None:
+        return raw
+    if total_bytes is None:
+        try:
+            total_bytes = os.fstat(raw.fileno()).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            total_bytes = None
+    report_progress(stage, bytes_read=0, total_bytes=total_bytes)
+    return io.BufferedReader(ProgressReader(raw, stage, total_bytes))
+
+
+def run_with_progress(
+    fn: Callable[..., Any], *args: Any, heartbeat: float = 5.0, **kwargs: Any
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run fn in a worker thread and yield (stage, event) pairs as it reports.
+
+    A "heartbeat" event is emitted whenever nothing was reported for
+    `heartbeat` seconds so proxies do not drop idle connections. The last
+    event is ("done", result) or ("error", {"status_code", "detail"}).
+    """
+    events: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue()
+    started = time.monotonic()
+
+    def target():
+        try:
+            with track_progress(lambda e: events.put((e["stage"], e))):
+                result = fn(*args, **kwargs)
+            if hasattr(result, "model_dump"):
+                result = result.model_dump()
+            events.put(("done", result))
+        except Exception as e:  # surfaced to the client as the final event
+            events.put(
+                (
+                    "error",
+                    {
+                        "status_code": getattr(e, "status_code", 500),
+                        "detail": getattr(e, "detail", str(e)),
+                    },
+                )
+            )
+
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(target,), daemon=True).start()
+
+    while True:
+        try:
+            stage, event = events.get(timeout=heartbeat)
+        except queue.Empty:
+            yield "heartbeat", {"elapsed_s": round(time.monotonic() - started, 3)}
+            continue
+        yield stage, event
+        if stage in ("done", "error"):
+            return
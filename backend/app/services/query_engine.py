@@ -0,0 +1,106 @@
+# app/services/query_engine.py
+"""
+SQL over stored datasets, run by an embedded DuckDB.
+
+Every dataset in the catalog is a table named after its id (quote it:
+SELECT * FROM "3f2c...") and callers can add short aliases. Tables are
+pyarrow Datasets over the partition files (ingestion.open_dataset), so
+DuckDB scans them in parallel, reads only the columns a query uses and
+pushes filters into the scan; joins and aggregations run in the engine.
+
+Each query gets its own in-memory connection with file access disabled,
+so a query can only read the datasets registered for it. Only single
+SELECT statements are accepted.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from ..config import QUERY_BATCH_ROWS, QUERY_THREADS
+from .ingestion import list_datasets, open_dataset, save_batches
+from .progress import report_progress
+
+
+def _connect():
+    try:
+        import duckdb
+    except ImportError:
+        raise RuntimeError("SQL queries need the duckdb package") from None
+    return duckdb, duckdb.connect(config={"threads": QUERY_THREADS})
+
+
+def iter_query(
+    sql: str,
+    tables: Optional[Dict[str, str]] = None,
+    batch_rows: int = QUERY_BATCH_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    Run a SELECT over the datasets it names (by id, or by an alias given
+    in tables: alias -> dataset_id) and yield its result in DataFrame
+    batches (at least one, possibly empty). The query runs when the first
+    batch is requested, which raises FileNotFoundError for an unknown
+    aliased dataset and ValueError for anything but one valid SELECT.
+    """
+    duckdb, con = _connect()
+    try:
+        try:
+            statements = con.extract_statements(sql)
+        except duckdb.Error as e:
+            raise ValueError(str(e)) from e
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise ValueError("Only a single SELECT statement is supported")
+
+        for alias, dataset_id in (tables or {}).items():
+            con.register(alias, open_dataset(dataset_id))
+        # ids are UUIDs, so a substring match finds the datasets used
+        # (DuckDB's get_table_names() has to bind the query, which fails
+        # while its tables are not registered yet)
+        for dataset_id in list_datasets():
+            if dataset_id in sql and dataset_id not in (tables or {}):
+                con.register(dataset_id, open_dataset(dataset_id))
+
+        # after registering: nothing but the datasets above is readable
+        con.execute("SET enable_external_access = false")
+        con.execute("SET lock_configuration = true")
+        try:
+            result = con.execute(sql)
+        except duckdb.Error as e:
+            raise ValueError(str(e)) from e
+        # to_arrow_reader() replaces fetch_record_batch() in newer DuckDB
+        if hasattr(result, "to_arrow_reader"):
+            reader = result.to_arrow_reader(batch_rows)
+        else:
+            reader = result.fetch_record_batch(batch_rows)
+
+        n_rows = 0
+        for batch in reader:
+            if batch.num_rows:
+                n_rows += batch.num_rows
+                report_progress("query", rows=n_rows)
+                yield batch.to_pandas()
+        if n_rows == 0:
+            yield reader.schema.empty_table().to_pandas()
+    finally:
+        con.close()
+
+
+def save_query(sql: str, tables: Optional[Dict[str, str]] = None) -> str:
+    """Store the result of a query as a new dataset and return its id."""
+    return save_batches(
+        iter_query(sql, tables), query={"sql": sql, "tables": dict(tables or {})}
+    )
+
+
+def describe_tables(dataset_ids: List[str]) -> List[Dict[str, object]]:
+    """Column names and Arrow types of the given datasets, read from file metadata."""
+    out = []
+    for dataset_id in dataset_ids:
+        try:
+            schema = open_dataset(dataset_id).schema
+        except FileNotFoundError:
+            continue  # deleted meanwhile
+        out.append(
+            {"dataset_id": dataset_id, "columns": {f.name: str(f.type) for f in schema}}
+        )
+    return out
@@ -0,0 +1,380 @@
+# app/services/sampling.py
+"""
+Sampled previews: quality and profile estimates read from a sample of a
+dataset instead of a full scan, and the exact results computed behind
+them.
+
+A sample is drawn in blocks of SAMPLE_BLOCK_ROWS contiguous rows,
+stratified over the dataset: its rows are split into as many equal
+strata as blocks are needed and one block is taken at random from each.
+Only those blocks are read:
+  - Arrow IPC partitions (how datasets are stored) are memory-mapped and
+    sliced, so only the sampled pages are touched;
+  - Parquet files are read one whole row group per stratum;
+  - CSV files are read from random byte offsets (the rest of the line
+    is skipped, then SAMPLE_BLOCK_ROWS lines are parsed). Their row
+    count is estimated from the sampled line lengths, and quoted fields
+    containing newlines can be split wrongly;
+  - other (legacy) files are streamed through a reservoir sample.
+
+The estimates treat the blocks as a cluster sample: missing ratios get
+a ratio-estimator confidence interval over the blocks, the duplicate
+ratio is scaled up from the duplicates seen within and across blocks,
+and a column that is constant in the sample is reported with an upper
+bound on the share of rows that may differ.
+
+The first sampled request for a dataset also schedules the exact result
+on a background thread. It is cached under CACHE_DIR, keyed by the
+partition files' sizes and mtimes, and later requests get it instead of
+an estimate. Jobs are per process, so each API worker computes its own.
+"""
+
+import io
+import json
+import math
+import os
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from ..config import CACHE_DIR, SAMPLE_BLOCK_ROWS, SAMPLE_EXACT_WORKERS, SAMPLE_MAX_ROWS
+from .dataset_stats import row_hashes
+from .ingestion import read_partition
+
+# two-sided 95% normal quantile
+_Z = 1.96
+
+_EXACT_DIR = os.path.join(CACHE_DIR, "exact")
+os.makedirs(_EXACT_DIR, exist_ok=True)
+
+
+# --------- SAMPLERS ----------
+# sampler(paths, n_blocks, rng) -> (blocks, n_rows, n_rows_exact); each
+# block is a DataFrame of up to SAMPLE_BLOCK_ROWS contiguous rows
+
+def _strata(n_rows: int, n_blocks: int, rng: random.Random) -> List[Tuple[int, int]]:
+    """
+    (start, length) of one random block per stratum of n_rows / n_blocks
+    rows. Blocks stay inside their stratum, so they never overlap; strata
+    narrower than a block are taken whole.
+    """
+    width = n_rows / n_blocks
+    blocks = []
+    for i in range(n_blocks):
+        low, high = int(i * width), int((i + 1) * width)
+        start = rng.randint(low, max(low, high - SAMPLE_BLOCK_ROWS))
+        blocks.append((start, min(SAMPLE_BLOCK_ROWS, high - start)))
+    return blocks
+
+
+def _sample_arrow(paths: List[str], n_blocks: int, rng: random.Random):
+    tables = [pa.ipc.open_file(pa.memory_map(p)).read_all() for p in paths]
+    offsets = np.cumsum([0] + [t.num_rows for t in tables])
+    n_rows = int(offsets[-1])
+    blocks = []
+    for start, length in _strata(n_rows, n_blocks, rng):
+        part = int(np.searchsorted(offsets, start, side="right")) - 1
+        # a block does not run on into the next partition
+        blocks.append(tables[part].slice(start - offsets[part], length).to_pandas())
+    return blocks, n_rows, True
+
+
+def _sample_parquet(paths: List[str], n_blocks: int, rng: random.Random):
+    import pyarrow.parquet as pq
+
+    files = [pq.ParquetFile(p) for p in paths]
+    groups = [(f, i) for f in files for i in range(f.metadata.num_row_groups)]
+    n_rows = sum(f.metadata.num_rows for f in files)
+    if not groups:
+        return [], 0, True
+    # whole row groups are the blocks: as many as cover the wanted rows
+    wanted = math.ceil(n_blocks * SAMPLE_BLOCK_ROWS / max(n_rows / len(groups), 1))
+    n_groups = min(len(groups), max(1, wanted))
+    width = len(groups) / n_groups
+    picked = [
+        groups[rng.randint(int(i * width), max(int(i * width), int((i + 1) * width) - 1))]
+        for i in range(n_groups)
+    ]
+    return [f.read_row_group(i).to_pandas() for f, i in picked], n_rows, True
+
+
+def _read_lines(f, limit: int, end: float) -> List[bytes]:
+    """Up to limit lines from the current offset, none starting at or after end."""
+    lines = []
+    while len(lines) < limit and f.tell() < end:
+        line = f.readline()
+        if not line:
+            break
+        lines.append(line if line.endswith(b"\n") else line + b"\n")
+    return lines
+
+
+def _sample_csv(paths: List[str], n_blocks: int, rng: random.Random):
+    blocks, n_rows, n_rows_exact = [], 0, True
+    sizes = [os.path.getsize(p) for p in paths]
+    for path, size in zip(paths, sizes):
+        # blocks shared out by file size
+        share = max(1, round(n_blocks * size / max(sum(sizes), 1)))
+        with open(path, "rb") as f:
+            header = f.readline()
+            data_start = f.tell()
+            # the first lines give the average line length
+            probe = _read_lines(f, SAMPLE_BLOCK_ROWS, size)
+            line_bytes = sum(map(len, probe)) / max(len(probe), 1)
+            est_lines = (size - data_start) / max(line_bytes, 1)
+            if est_lines <= share * SAMPLE_BLOCK_ROWS:
+                # small enough to take whole
+                whole = pd.read_csv(path)
+                blocks.append(whole)
+                n_rows += len(whole)
+                continue
+            width = (size - data_start) / share
+            block_bytes = int(SAMPLE_BLOCK_ROWS * line_bytes)
+            for i in range(share):
+                start, end = data_start + int(i * width), data_start + int((i + 1) * width)
+                offset = rng.randint(start, max(start, end - block_bytes))
+                f.seek(offset)
+                if offset > data_start:
+                    f.readline()  # the line the offset fell into
+                lines = _read_lines(f, SAMPLE_BLOCK_ROWS, end)
+                if lines:
+                    blocks.append(pd.read_csv(io.BytesIO(header + b"".join(lines))))
+            n_rows += int(round(est_lines))
+            n_rows_exact = False
+    return blocks, n_rows, n_rows_exact
+
+
+def _sample_reservoir(paths: List[str], n_blocks: int, rng: random.Random):
+    """
+    Uniform sample of n_blocks * SAMPLE_BLOCK_ROWS rows kept while streaming
+    every partition: the rows with the smallest random keys (one key per
+    row). Returned as one block; sample_dataset makes each row its own
+    cluster.
+    """
+    size = n_blocks * SAMPLE_BLOCK_ROWS
+    gen = np.random.default_rng(rng.getrandbits(32))
+    kept: Optional[pd.DataFrame] = None
+    keys = np.empty(0)
+    n_rows = 0
+    for path in paths:
+        part = read_partition(path)
+        n_rows += len(part)
+        candidates = part if kept is None else pd.concat([kept, part], ignore_index=True)
+        keys = np.concatenate([keys, gen.random(len(part))])
+        if len(candidates) > size:
+            order = np.argpartition(keys, size)[:size]
+            candidates, keys = candidates.iloc[order].reset_index(drop=True), keys[order]
+        kept = candidates
+    return ([] if kept is None else [kept]), n_rows, True
+
+
+_SAMPLERS: Dict[str, Callable] = {
+    ".arrow": _sample_arrow,
+    ".feather": _sample_arrow,
+    ".parquet": _sample_parquet,
+    ".csv": _sample_csv,
+}
+
+
+def sample_dataset(
+    paths: List[str], rows: int, seed: Optional[int] = None
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    About `rows` rows of the dataset stored in paths, and a description
+    of the sample: method, n_rows (the dataset's), n_rows_exact,
+    n_sampled, fraction and block_ids (the block of each sampled row).
+    Raises ValueError for a non-positive or too large `rows`.
+    """
+    if not 0 < rows <= SAMPLE_MAX_ROWS:
+        raise ValueError(f"sample must be in 1..{SAMPLE_MAX_ROWS}")
+    exts = {os.path.splitext(p)[1].lower() for p in paths}
+    sampler = _SAMPLERS.get(exts.pop()) if len(exts) == 1 else None
+    sampler = sampler or _sample_reservoir
+    rng = random.Random(seed)
+    blocks, n_rows, n_rows_exact = sampler(paths, math.ceil(rows / SAMPLE_BLOCK_ROWS), rng)
+
+    blocks = [b for b in blocks if len(b)]
+    sample = pd.concat(blocks, ignore_index=True) if blocks else pd.DataFrame()
+    if sampler is _sample_reservoir:
+        block_ids = np.arange(len(sample))
+    else:
+        block_ids = np.repeat(np.arange(len(blocks)), [len(b) for b in blocks])
+    n_rows = max(n_rows, len(sample))
+    info = {
+        "method": sampler.__name__.replace("_sample_", ""),
+        "n_rows": int(n_rows),
+        "n_rows_exact": n_rows_exact,
+        "n_sampled": int(len(sample)),
+        "fraction": len(sample) / n_rows if n_rows else 1.0,
+        "block_ids": block_ids,
+    }
+    return sample, info
+
+
+# --------- ESTIMATES ----------
+
+def _clip(low: float, high: float) -> List[float]:
+    return [max(0.0, low), min(1.0, high)]
+
+
+def _cluster_ratio(
+    counts: np.ndarray, sizes: np.ndarray, fraction: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ratio estimates sum(counts) / sum(sizes) per column of counts (one
+    row per block) and their 95% interval half-widths: the ratio
+    estimator's variance over blocks with the finite population
+    correction, or the binomial variance when there is a single block.
+    """
+    ratio = counts.sum(axis=0) / max(sizes.sum(), 1)
+    k = len(sizes)
+    if k > 1:
+        residuals = counts - np.outer(sizes, ratio)
+        var = (residuals**2).sum(axis=0) / (k - 1) / k / sizes.mean() ** 2
+        var = var * max(0.0, 1.0 - fraction)
+    else:
+        var = ratio * (1 - ratio) / max(sizes.sum(), 1)
+    return ratio, _Z * np.sqrt(var)
+
+
+def missing_ratios(sample: pd.DataFrame, info: Dict[str, Any]) -> pd.DataFrame:
+    """Per-column missing ratio estimates ("ratio") with 95% intervals ("low", "high")."""
+    counts = sample.isna().groupby(info["block_ids"]).sum().to_numpy(dtype=float)
+    sizes = np.bincount(info["block_ids"]).astype(float)
+    ratio, half = _cluster_ratio(counts, sizes, info["fraction"])
+    return pd.DataFrame(
+        {"ratio": ratio, "low": np.clip(ratio - half, 0, 1), "high": np.clip(ratio + half, 0, 1)},
+        index=sample.columns,
+    )
+
+
+def overall_missing_ratio(sample: pd.DataFrame, info: Dict[str, Any]) -> Tuple[float, List[float]]:
+    """Estimated missing share of all cells, with its 95% interval."""
+    if sample.shape[1] == 0 or not len(sample):
+        return 1.0, [1.0, 1.0]
+    counts = sample.isna().sum(axis=1).groupby(info["block_ids"]).sum().to_numpy(dtype=float)
+    sizes = np.bincount(info["block_ids"]).astype(float) * sample.shape[1]
+    ratio, half = _cluster_ratio(counts[:, None], sizes, info["fraction"])
+    return float(ratio[0]), _clip(float(ratio[0] - half[0]), float(ratio[0] + half[0]))
+
+
+def duplicate_ratio(sample: pd.DataFrame, info: Dict[str, Any]) -> Tuple[float, List[float]]:
+    """
+    Estimated share of rows repeating an earlier row, with a 95% interval.
+    A duplicate pair inside one block is sampled with the block fraction
+    f, so duplicates seen within blocks are scaled by 1/f. A pair in two
+    different strata is sampled with f**2 and one in a single stratum
+    but different blocks never is (one block per stratum), so duplicates
+    seen across blocks are scaled by 1/f**2 and by k/(k-1) for the k
+    blocks. The interval treats both counts as Poisson.
+    """
+    n_rows, f = info["n_rows"], info["fraction"]
+    if not len(sample) or not n_rows:
+        return 0.0, [0.0, 0.0]
+    frame = pd.DataFrame({"hash": row_hashes(sample), "block": info["block_ids"]})
+    duplicated = frame["hash"].duplicated()
+    first_block = frame.groupby("hash")["block"].transform("first")
+    within = int((duplicated & (first_block == frame["block"])).sum())
+    across = int(duplicated.sum()) - within
+    k = int(frame["block"].max()) + 1
+    across_scale = k / (k - 1) / f**2 if k > 1 else 1 / f**2
+    estimate = within / f + across * across_scale
+    # +1 so that seeing no duplicates still leaves an upper bound
+    var = (within + 1) / f**2 + (across + 1) * across_scale**2 if f < 1 else 0.0
+    half = _Z * math.sqrt(var)
+    ratio = min(estimate / n_rows, 1.0)
+    return ratio, _clip((estimate - half) / n_rows, (estimate + half) / n_rows)
+
+
+def constant_columns(sample: pd.DataFrame) -> Dict[str, float]:
+    """
+    Columns with a single value (missing counting as one) in the sample,
+    each with a 95% upper bound on the share of rows that could still
+    hold another value: 1 - 0.05 ** (1 / rows sampled).
+    """
+    n = len(sample)
+    if not n:
+        return {}
+    nunique = sample.nunique(dropna=True) + sample.isna().any().astype(int)
+    bound = 1.0 - 0.05 ** (1.0 / n)
+    return {str(c): bound for c in nunique.index[nunique == 1]}
+
+
+# --------- EXACT RESULTS ----------
+
+_executor = ThreadPoolExecutor(max_workers=SAMPLE_EXACT_WORKERS, thread_name_prefix="exact")
+_jobs: Dict[Tuple[str, str], Future] = {}
+_jobs_lock = threading.Lock()
+
+
+def _fingerprint(paths: List[str]) -> List[List[Any]]:
+    stats = [os.stat(p) for p in paths]
+    return [[os.path.basename(p), s.st_size, s.st_mtime_ns] for p, s in zip(paths, stats)]
+
+
+def _exact_path(kind: str, dataset_id: str) -> str:
+    return os.path.join(_EXACT_DIR, f"{dataset_id}.{kind}.json")
+
+
+def load_exact(kind: str, dataset_id: str, paths: List[str]) -> Optional[Dict[str, Any]]:
+    """The cached exact result, if there is one for the current partitions."""
+    try:
+        with open(_exact_path(kind, dataset_id), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if cached.get("fingerprint") != _fingerprint(paths):
+        return None
+    return cached["result"]
+
+
+def _run_exact(kind: str, dataset_id: str, paths: List[str], compute: Callable[[], Dict]) -> None:
+    fingerprint = _fingerprint(paths)
+    result = compute()
+    # partitions replaced while computing: the result is already stale
+    if _fingerprint(paths) != fingerprint:
+        return
+    path = _exact_path(kind, dataset_id)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "result": result}, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def schedule_exact(
+    kind: str, dataset_id: str, paths: List[str], compute: Callable[[], Dict]
+) -> str:
+    """
+    Compute `kind` exactly in the background (once at a time per dataset)
+    and return the job's status: "pending", "running", or "failed" (the
+    failure is reported once; the next call schedules it again).
+    """
+    key = (kind, dataset_id)
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None and job.done():
+            del _jobs[key]
+            if job.exception() is not None:
+                return "failed"
+            job = None
+        if job is None:
+            job = _jobs[key] = _executor.submit(_run_exact, kind, dataset_id, paths, compute)
+        return "running" if job.running() else "pending"
+
+
+def drop_stale_exact(dataset_ids: Set[str]) -> int:
+    """Delete cached exact results of datasets not in dataset_ids; returns how many."""
+    dropped = 0
+    for name in os.listdir(_EXACT_DIR):
+        if name.split(".", 1)[0] not in dataset_ids:
+            try:
+                os.remove(os.path.join(_EXACT_DIR, name))
+                dropped += 1
+            except FileNotFoundError:
+                pass
+    return dropped
@@ -1,26 +1,261 @@
 # app/services/sql_loader.py
+"""
+SQL ingestion.
+
+Query results are fetched with fetchmany() in batches of READ_BATCH_ROWS
+(SQLite steps its cursor lazily, so rows are produced as they are
+fetched) and written straight into partitions with save_batches(), so an
+extract of any size runs in the memory of one partition. Connections are
+read-only and pooled per database file.
+
+A query registered as a source with a watermark column (a monotonic id
+or updated_at) can be synced: each sync fetches only the rows past the
+stored watermark and appends them through incremental.append_rows(), so
+its cost follows the delta rather than the table size.
+"""
 
 import os
+import queue
 import sqlite3
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
 import pandas as pd
 
-from ..utils.id_gen import generate_dataset_id
-from ..config import BASE_UPLOAD_DIR
+from ..config import PARTITION_ROWS, READ_BATCH_ROWS, SQL_POOL_SIZE
+from . import catalog
+from .incremental import append_rows
+from .ingestion import save_batches
+from .progress import report_progress
+
+QueryParams = Optional[Union[Sequence[Any], Dict[str, Any]]]
+
+
+class _ConnectionPool:
+    """Read-only connections to one SQLite database, reused across calls."""
+
+    def __init__(self, db_path: str, size: int):
+        self.db_path = db_path
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = f"{Path(self.db_path).as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; at most `size` are in use at once."""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                # e.g. a half-read cursor from an abandoned stream
+                conn.close()
+                raise
+            self._idle.put(conn)
+
+
+_pools: Dict[str, _ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(db_path: str) -> _ConnectionPool:
+    db_path = os.path.realpath(db_path)
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"Database not found: {db_path}")
+    with _pools_lock:
+        if db_path not in _pools:
+            _pools[db_path] = _ConnectionPool(db_path, SQL_POOL_SIZE)
+        return _pools[db_path]
+
+
+def iter_query(
+    db_path: str, query: str, params: QueryParams = None, batch_rows: int = READ_BATCH_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Run a parameterized query (sqlite3 "?" or ":name" placeholders) and
+    yield its result in DataFrame batches. Raises FileNotFoundError for a
+    missing database and ValueError for statements that return no rows.
+    """
+    with _pool(db_path).connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params if params is not None else ())
+            if cursor.description is None:
+                raise ValueError("Query returned no result set (only SELECT queries are supported)")
+            columns = [d[0] for d in cursor.description]
+            n_rows = 0
+            while rows := cursor.fetchmany(batch_rows):
+                n_rows += len(rows)
+                report_progress("read", rows=n_rows)
+                yield pd.DataFrame.from_records(rows, columns=columns)
+            if n_rows == 0:
+                yield pd.DataFrame(columns=columns)
+        finally:
+            cursor.close()
+
+
+def load_from_sqlite(
+    db_path: str, query: str, params: QueryParams = None, **metadata
+) -> str:
+    """
+    Load the result of a SQLite query as a new partitioned dataset and
+    return its id. The query and its source are recorded in the catalog.
+    """
+    source = {"type": "sqlite", "db_path": os.path.realpath(db_path), "query": query}
+    if params is not None:
+        source["params"] = params
+    return save_batches(iter_query(db_path, query, params), sql_source=source, **metadata)
+
+
+# --------- WATERMARK SOURCES ----------
+
+# one sync at a time per dataset
+_sync_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _json_value(value: Any) -> Any:
+    # watermarks are stored in the JSON catalog
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        value = value.isoformat()
+    return value
+
+
+def _batch_max(batch: pd.DataFrame, column: str, current: Any) -> Any:
+    values = batch[column].dropna()
+    if values.empty:
+        return current
+    top = _json_value(values.max())
+    return top if current is None or top > current else current
+
+
+def _delta_query(source: Dict[str, Any]) -> tuple[str, QueryParams]:
+    """The source query restricted to rows past the watermark, in watermark order."""
+    query = source["query"].strip().rstrip(";")
+    column = _quote(source["watermark_column"])
+    params = source.get("params")
+    if source.get("watermark") is None:
+        return f"SELECT * FROM ({query}) ORDER BY {column}", params
+    if isinstance(params, dict):
+        return (
+            f"SELECT * FROM ({query}) WHERE {column} > :_watermark ORDER BY {column}",
+            {**params, "_watermark": source["watermark"]},
+        )
+    return (
+        f"SELECT * FROM ({query}) WHERE {column} > ? ORDER BY {column}",
+        [*(params or []), source["watermark"]],
+    )
+
+
+def register_source(
+    db_path: str, query: str, watermark_column: str, params: QueryParams = None
+) -> Dict[str, Any]:
+    """
+    Load a query as a new dataset and record it as a source that sync_source()
+    can refresh incrementally. Raises ValueError if the query has no
+    watermark_column.
+    """
+    source = {
+        "type": "sqlite",
+        "db_path": os.path.realpath(db_path),
+        "query": query,
+        "params": params,
+        "watermark_column": watermark_column,
+        "watermark": None,
+    }
+    n_rows = 0
+
+    def tracked(batches: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        nonlocal n_rows
+        for batch in batches:
+            if watermark_column not in batch.columns:
+                raise ValueError(f"Query has no column {watermark_column!r}")
+            source["watermark"] = _batch_max(batch, watermark_column, source["watermark"])
+            n_rows += len(batch)
+            yield batch
+
+    dataset_id = save_batches(tracked(iter_query(db_path, query, params)))
+    catalog.update_entry(dataset_id, lambda e: {**e, "sql_source": source})
+    return {"dataset_id": dataset_id, "n_rows": n_rows, "watermark": source["watermark"]}
+
+
+def _group_by_watermark(
+    batches: Iterable[pd.DataFrame], column: str, rows: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Regroup watermark-ordered batches into frames of about `rows` rows
+    (default PARTITION_ROWS), never splitting rows that share a watermark
+    value - the watermark is committed after each frame, and a resumed
+    sync must not skip ties.
+    """
+    if rows is None:
+        rows = PARTITION_ROWS
+    pending: List[pd.DataFrame] = []
+    n_pending = 0
+    for batch in batches:
+        pending.append(batch)
+        n_pending += len(batch)
+        if n_pending < rows:
+            continue
+        frame = pd.concat(pending, ignore_index=True)
+        # rows are in watermark order, so ties with the last row are at the end
+        tied = (frame[column] == frame[column].iloc[-1]).to_numpy()
+        cut = len(frame) - int(tied[::-1].argmin()) if not tied.all() else 0
+        if cut == 0:
+            pending = [frame]
+            continue
+        yield frame.iloc[:cut]
+        pending = [frame.iloc[cut:].reset_index(drop=True)]
+        n_pending = len(pending[0])
+    if n_pending:
+        yield pd.concat(pending, ignore_index=True)
 
 
-def load_from_sqlite(db_path: str, query: str) -> tuple[str, str]:
+def sync_source(dataset_id: str) -> Dict[str, Any]:
     """
-    Load data from a SQLite database using a SQL query,
-    save it as CSV into the uploads folder, and return (dataset_id, file_path).
+    Append the rows of a registered source past its watermark to the
+    dataset. Raises FileNotFoundError for unknown datasets and ValueError
+    for datasets that are not watermark sources.
     """
-    conn = sqlite3.connect(db_path)
-    try:
-        df = pd.read_sql_query(query, conn)
-    finally:
-        conn.close()
+    with _sync_locks[dataset_id]:
+        entry = catalog.get_entry(dataset_id)
+        if entry is None:
+            raise FileNotFoundError(dataset_id)
+        source = entry.get("sql_source") or {}
+        if not source.get("watermark_column"):
+            raise ValueError("Dataset is not a registered SQL source with a watermark column")
 
-    dataset_id = generate_dataset_id()
-    file_path = os.path.join(BASE_UPLOAD_DIR, f"{dataset_id}.csv")
-    df.to_csv(file_path, index=False)
+        query, params = _delta_query(source)
+        column = source["watermark_column"]
+        partitions, n_rows, full_recompute = [], 0, False
+        for frame in _group_by_watermark(iter_query(source["db_path"], query, params), column):
+            summary = append_rows(dataset_id, frame)
+            source["watermark"] = _batch_max(frame, column, source["watermark"])
+            catalog.update_entry(dataset_id, lambda e: {**e, "sql_source": source})
+            partitions.append(summary["partition"])
+            n_rows += len(frame)
+            full_recompute |= summary["full_recompute"]
 
-    return dataset_id, file_path
+    return {
+        "dataset_id": dataset_id,
+        "n_rows_appended": n_rows,
+        "partitions": partitions,
+        "watermark": source["watermark"],
+        "full_recompute": full_recompute,
+    }
@@ -0,0 +1,542 @@
+# app/services/storage.py
+"""
+Storage lifecycle of the dataset store (BASE_UPLOAD_DIR).
+
+Using a dataset through the API records when it was last used (touch():
+"last_used" in its catalog entry, rewritten at most once a minute).
+Datasets with no recorded use yet - stored before this existed, legacy
+single files, moved in from LEGACY_UPLOAD_DIR - are stamped as used by
+the first sweep that sees them, never aged by their file times. sweep()
+then:
+  - deletes datasets not used for their TTL - the entry's own "ttl_s",
+    else DATASET_TTL_S (0: never) - unless they are "pinned";
+  - deletes derived datasets (those with a source_dataset_id, e.g.
+    cleaned outputs) nothing refers to any more: not owned by
+    the clean memo, not a dataset's cleaned_dataset_id and without a TTL
+    of their own, once unused for ORPHAN_GRACE_S;
+  - deletes partition directories without a catalog entry and temporary
+    files older than ORPHAN_GRACE_S (left by interrupted writes), cached
+    exact results of deleted datasets, expired clean memo entries and
+    expired resumable uploads;
+  - deletes cached PDF page text and OCR results (CACHE_DIR/pdf,
+    CACHE_DIR/ocr) not used for CACHE_TTL_S, then the least recently used
+    beyond CACHE_MAX_BYTES;
+  - recompresses the partitions of datasets not used for COLD_AFTER_S
+    with zstd. They stay Arrow IPC files every reader handles, but are
+    decompressed when read instead of memory-mapped zero-copy;
+  - if the store is larger than STORAGE_QUOTA_BYTES, deletes the least
+    recently used datasets (derived ones first) until it fits, sparing
+    pinned datasets and those in use.
+
+When LEGACY_UPLOAD_DIR is set (MIGRATE_LEGACY_UPLOADS=1), files left
+there (where uploads were stored before uploaded_datasets/) are first
+moved into the store as legacy datasets, so they stay readable; the sweep
+that moves them never deletes them.
+
+ensure_capacity() is checked before ingesting and refuses new data with
+OSError(ENOSPC) when a sweep cannot bring the store under the quota.
+Sweeps run on demand, and on a background thread (start_sweeper) when
+STORAGE_SWEEP_INTERVAL_S is set; a lock file keeps the sweeps of several
+API workers from overlapping. With the defaults (no DATASET_TTL_S, no
+quota) a sweep deletes no dataset that is in use or referenced.
+"""
+
+import errno
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow.feather as feather
+
+from ..config import (
+    BASE_UPLOAD_DIR,
+    CACHE_DIR,
+    CACHE_MAX_BYTES,
+    CACHE_TTL_S,
+    CATALOG_PATH,
+    CLEAN_MEMO_PATH,
+    COLD_AFTER_S,
+    DATASET_TTL_S,
+    LEGACY_UPLOAD_DIR,
+    ORPHAN_GRACE_S,
+    STORAGE_QUOTA_BYTES,
+    STORAGE_SWEEP_INTERVAL_S,
+)
+from . import catalog, clean_memo, sampling, uploads
+from .ingestion import content_hash, dataset_partitions, delete_dataset
+from .instrumentation import timed
+
+# last_used is only rewritten when older than this, so reads stay read-only
+_TOUCH_INTERVAL_S = 60
+
+# Datasets used this recently are never deleted to make room
+_QUOTA_MIN_IDLE_S = 15 * 60
+
+# usage() rescans the store at most this often
+_USAGE_MAX_AGE_S = 30
+
+_LOCK_PATH = os.path.join(BASE_UPLOAD_DIR, ".sweep.lock")
+
+# Reader caches bounded by the sweep: one entry per file or directory in each
+_CACHE_SUBDIRS = ("pdf", "ocr")
+
+# Files of the store that are not datasets
+_STORE_FILES = {
+    os.path.basename(p)
+    for table in (CATALOG_PATH, CLEAN_MEMO_PATH)
+    for p in (table, f"{table}.lock")
+} | {os.path.basename(_LOCK_PATH)}
+
+_sweep_thread_lock = threading.Lock()
+_usage: Optional[Tuple[float, int]] = None
+_last_sweep: Dict[str, Any] = {}
+_stop = threading.Event()
+_sweeper: Optional[threading.Thread] = None
+
+
+# --------- USE ----------
+
+def touch(dataset_id: str) -> None:
+    """Record that a dataset was used (no-op for datasets that do not exist)."""
+    now = time.time()
+    entry = catalog.get_entry(dataset_id)
+    if not (entry and entry.get("partitions")):
+        # legacy file: gets an entry holding only its last_used
+        try:
+            dataset_partitions(dataset_id)
+        except FileNotFoundError:
+            return
+    if now - (entry or {}).get("last_used", 0) > _TOUCH_INTERVAL_S:
+
+        def update(e):
+            e["last_used"] = now
+            return e
+
+        catalog.update_entry(dataset_id, update)
+
+
+def set_lifecycle(
+    dataset_id: str, ttl_s: Optional[int] = None, pinned: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    Give a dataset its own TTL (0: never expires) and / or pin it, which
+    exempts it from expiry, orphan collection and quota eviction. Raises
+    FileNotFoundError if the dataset does not exist, ValueError for a
+    negative TTL.
+    """
+    dataset_partitions(dataset_id)
+    if ttl_s is not None and ttl_s < 0:
+        raise ValueError("ttl_s must not be negative")
+    changes = {k: v for k, v in (("ttl_s", ttl_s), ("pinned", pinned)) if v is not None}
+    entry = catalog.get_entry(dataset_id) or {}
+    if changes:
+
+        def update(e):
+            e.update(changes)
+            return e
+
+        entry = catalog.update_entry(dataset_id, update)
+    return {
+        "dataset_id": dataset_id,
+        "ttl_s": entry.get("ttl_s", DATASET_TTL_S),
+        "pinned": bool(entry.get("pinned")),
+        "last_used": entry.get("last_used"),
+    }
+
+
+# --------- INVENTORY ----------
+
+def _scan(now: float) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, int]], int]:
+    """
+    One listing of the store: dataset_id -> {"entry", "bytes", "last_used"},
+    the stray (path, bytes) to delete, and the store's size in bytes.
+    "last_used" is None for datasets with no recorded use.
+    """
+    entries = catalog.list_entries()
+    datasets: Dict[str, Dict[str, Any]] = {}
+    strays: List[Tuple[str, int]] = []
+    total = 0
+    with os.scandir(BASE_UPLOAD_DIR) as items:
+        for item in items:
+            st = item.stat()
+            stale = now - st.st_mtime > ORPHAN_GRACE_S
+            if item.is_dir():
+                if not item.name.endswith(".parts"):
+                    continue
+                size = 0
+                with os.scandir(item.path) as parts:
+                    for part in parts:
+                        part_st = part.stat()
+                        size += part_st.st_size
+                        if part.name.endswith(".tmp") and now - part_st.st_mtime > ORPHAN_GRACE_S:
+                            strays.append((part.path, part_st.st_size))
+                total += size
+                dataset_id = item.name[: -len(".parts")]
+                entry = entries.get(dataset_id)
+                if entry and entry.get("partitions"):
+                    last_used = entry.get("last_used")
+                    datasets[dataset_id] = {"entry": entry, "bytes": size, "last_used": last_used}
+                elif stale:
+                    # written but never recorded (e.g. an interrupted upload)
+                    strays.append((item.path, size))
+                continue
+
+            total += st.st_size
+            if item.name in _STORE_FILES:
+                continue
+            if item.name.endswith(".tmp"):
+                if stale:
+                    strays.append((item.path, st.st_size))
+                continue
+            # legacy dataset: one file named after its id
+            dataset_id = item.name.split(".", 1)[0]
+            entry = entries.get(dataset_id) or {}
+            if not entry.get("partitions"):
+                last_used = entry.get("last_used")
+                datasets[dataset_id] = {"entry": entry, "bytes": st.st_size, "last_used": last_used}
+
+    # entries whose partitions are gone still expire (and take the entry along)
+    for dataset_id, entry in entries.items():
+        if entry.get("partitions") and dataset_id not in datasets:
+            datasets[dataset_id] = {"entry": entry, "bytes": 0, "last_used": entry.get("last_used", 0)}
+    return datasets, strays, total
+
+
+def _tree_size(path: str) -> int:
+    size = 0
+    with os.scandir(path) as items:
+        for item in items:
+            size += _tree_size(item.path) if item.is_dir() else item.stat().st_size
+    return size
+
+
+def _cache_entries() -> List[Tuple[float, int, str]]:
+    """(last used, bytes, path) of every reader cache entry; hits bump the mtime."""
+    entries = []
+    for sub in _CACHE_SUBDIRS:
+        try:
+            items = os.scandir(os.path.join(CACHE_DIR, sub))
+        except FileNotFoundError:
+            continue
+        with items:
+            for item in items:
+                try:
+                    size = _tree_size(item.path) if item.is_dir() else item.stat().st_size
+                    entries.append((item.stat().st_mtime, size, item.path))
+                except FileNotFoundError:
+                    continue
+    return entries
+
+
+def _migrate_legacy_uploads() -> List[str]:
+    """Move the files left in LEGACY_UPLOAD_DIR into the store; returns their dataset ids."""
+    if LEGACY_UPLOAD_DIR is None:
+        return []
+    try:
+        items = os.scandir(LEGACY_UPLOAD_DIR)
+    except FileNotFoundError:
+        return []
+    moved = []
+    with items:
+        for item in items:
+            # directories are resumable uploads in progress
+            target = os.path.join(BASE_UPLOAD_DIR, item.name)
+            if not item.is_file() or os.path.exists(target):
+                continue
+            shutil.move(item.path, target)
+            moved.append(item.name.split(".", 1)[0])
+    return moved
+
+
+def usage(max_age_s: float = _USAGE_MAX_AGE_S) -> int:
+    """Size of the dataset store in bytes, rescanned when older than max_age_s."""
+    global _usage
+    now = time.time()
+    if _usage is None or now - _usage[0] > max_age_s:
+        _usage = (now, _scan(now)[2])
+    return _usage[1]
+
+
+def storage_report() -> Dict[str, Any]:
+    """Size and make-up of the dataset store, and the last sweep's outcome."""
+    now = time.time()
+    datasets, strays, total = _scan(now)
+    entries = [d["entry"] for d in datasets.values()]
+    return {
+        "bytes_used": total,
+        "quota_bytes": STORAGE_QUOTA_BYTES,
+        "datasets": len(datasets),
+        "derived": sum(1 for e in entries if e.get("source_dataset_id")),
+        "pinned": sum(1 for e in entries if e.get("pinned")),
+        "compressed": sum(
+            1
+            for e in entries
+            if e.get("partitions") and set(e["partitions"]) <= set(e.get("compressed_partitions", []))
+        ),
+        "strays": len(strays),
+        "cache_bytes": sum(size for _, size, _ in _cache_entries()),
+        "cache_quota_bytes": CACHE_MAX_BYTES,
+        "last_sweep": dict(_last_sweep),
+    }
+
+
+def ensure_capacity() -> None:
+    """
+    Raise OSError(ENOSPC) if the store is over STORAGE_QUOTA_BYTES even
+    after a sweep.
+    """
+    if not STORAGE_QUOTA_BYTES or usage() < STORAGE_QUOTA_BYTES:
+        return
+    sweep()
+    if usage(max_age_s=0) >= STORAGE_QUOTA_BYTES:
+        raise OSError(errno.ENOSPC, "Dataset storage quota exceeded")
+
+
+# --------- SWEEP ----------
+
+@contextmanager
+def _sweep_lock() -> Iterator[bool]:
+    """Yields whether this sweep may run: one at a time, across processes where fcntl exists."""
+    if not _sweep_thread_lock.acquire(blocking=False):
+        yield False
+        return
+    try:
+        try:
+            import fcntl
+        except ImportError:  # Windows: sweeps only exclude each other within a process
+            yield True
+            return
+        with open(_LOCK_PATH, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True  # released when the file is closed
+    finally:
+        _sweep_thread_lock.release()
+
+
+def _compress(dataset_id: str, dataset: Dict[str, Any]) -> int:
+    """Rewrite a dataset's uncompressed partitions with zstd; returns the bytes saved."""
+    entry = dataset["entry"]
+    done = set(entry.get("compressed_partitions", []))
+    todo = [p for p in entry["partitions"] if p not in done and p.endswith(".arrow")]
+    if not todo:
+        return 0
+    # hashed as stored so far, so clean memo keys stay the same
+    content_hash(dataset_id)
+    saved = 0
+    for rel_path in todo:
+        path = os.path.join(BASE_UPLOAD_DIR, rel_path)
+        try:
+            before = os.stat(path)
+            table = feather.read_table(path, memory_map=False)
+        except FileNotFoundError:
+            return saved
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(
+            table, tmp_path, compression="zstd", chunksize=max(table.num_rows, 1)
+        )
+        after = os.stat(path)
+        if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+            # rewritten meanwhile: leave the new data alone
+            os.remove(tmp_path)
+            return saved
+        saved += before.st_size - os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        done.add(rel_path)
+
+    def update(e):
+        if e.get("partitions") == entry["partitions"]:
+            e["compressed_partitions"] = sorted(done)
+            # the rewrite must not count as a use
+            e.setdefault("last_used", dataset["last_used"])
+        return e
+
+    catalog.update_entry(dataset_id, update)
+    return saved
+
+
+def _sweep(now: float) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "expired": [],
+        "orphaned": [],
+        "evicted": [],
+        "compressed": [],
+        "strays_removed": 0,
+        "bytes_freed": 0,
+    }
+    migrated = set(_migrate_legacy_uploads())
+    report["legacy_uploads_moved"] = len(migrated)
+    report["memo_entries_evicted"] = clean_memo.evict(now)
+    datasets, strays, used = _scan(now)
+
+    # the TTL of datasets with no recorded use starts now
+    for dataset_id, d in datasets.items():
+        if d["last_used"] is None:
+
+            def stamp(e):
+                e.setdefault("last_used", now)
+                return e
+
+            d["entry"] = catalog.update_entry(dataset_id, stamp)
+            d["last_used"] = d["entry"]["last_used"]
+    # nothing moved in by this sweep is deleted by it
+    for dataset_id in migrated:
+        datasets.pop(dataset_id, None)
+
+    def remove(dataset_id: str, reason: str) -> None:
+        nonlocal used
+        delete_dataset(dataset_id)
+        size = datasets.pop(dataset_id)["bytes"]
+        used -= size
+        report["bytes_freed"] += size
+        report[reason].append(dataset_id)
+
+    for dataset_id, d in list(datasets.items()):
+        ttl_s = d["entry"].get("ttl_s", DATASET_TTL_S)
+        if ttl_s and not d["entry"].get("pinned") and now - d["last_used"] > ttl_s:
+            remove(dataset_id, "expired")
+
+    referenced = clean_memo.memoized_outputs()
+    referenced |= {d["entry"].get("cleaned_dataset_id") for d in datasets.values()}
+    for dataset_id, d in list(datasets.items()):
+        entry = d["entry"]
+        if (
+            entry.get("source_dataset_id")
+            and dataset_id not in referenced
+            and not entry.get("pinned")
+            and "ttl_s" not in entry
+            and now - d["last_used"] > ORPHAN_GRACE_S
+        ):
+            remove(dataset_id, "orphaned")
+
+    for path, size in strays:
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            continue
+        used -= size
+        report["strays_removed"] += 1
+        report["bytes_freed"] += size
+    # entries emptied by an update racing a delete
+    for dataset_id, entry in catalog.list_entries().items():
+        if not entry:
+            catalog.delete_entry(dataset_id)
+    report["exact_results_dropped"] = sampling.drop_stale_exact(
+        set(datasets) | set(catalog.list_entries())
+    )
+    report["uploads_expired"] = uploads.sweep_expired()
+    report["cache_entries_removed"], report["cache_bytes_freed"] = _sweep_caches(now)
+
+    if COLD_AFTER_S:
+        for dataset_id, d in datasets.items():
+            if d["entry"].get("partitions") and now - d["last_used"] > COLD_AFTER_S:
+                saved = _compress(dataset_id, d)
+                if saved:
+                    used -= saved
+                    report["compressed"].append(dataset_id)
+                    report["bytes_freed"] += saved
+
+    if STORAGE_QUOTA_BYTES and used > STORAGE_QUOTA_BYTES:
+        candidates = sorted(
+            (
+                (dataset_id, d)
+                for dataset_id, d in datasets.items()
+                if not d["entry"].get("pinned") and now - d["last_used"] > _QUOTA_MIN_IDLE_S
+            ),
+            # derived datasets first, then least recently used
+            key=lambda kv: (not kv[1]["entry"].get("source_dataset_id"), kv[1]["last_used"]),
+        )
+        for dataset_id, _ in candidates:
+            if used <= STORAGE_QUOTA_BYTES:
+                break
+            remove(dataset_id, "evicted")
+
+    report["bytes_used"] = used
+    return report
+
+
+def _sweep_caches(now: float) -> Tuple[int, int]:
+    """Apply CACHE_TTL_S and CACHE_MAX_BYTES; returns (entries, bytes) removed."""
+    entries = sorted(_cache_entries(), reverse=True)  # most recently used first
+    kept_bytes = 0
+    removed = freed = 0
+    for last_used, size, path in entries:
+        if (CACHE_TTL_S and now - last_used > CACHE_TTL_S) or (
+            CACHE_MAX_BYTES and kept_bytes + size > CACHE_MAX_BYTES
+        ):
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            removed += 1
+            freed += size
+        else:
+            kept_bytes += size
+    return removed, freed
+
+
+@timed("storage.sweep")
+def sweep() -> Dict[str, Any]:
+    """
+    Run one sweep (see the module docstring) and return what it did, or
+    {"skipped": True} if another sweep is running.
+    """
+    global _usage
+    with _sweep_lock() as acquired:
+        if not acquired:
+            return {"skipped": True}
+        started = time.time()
+        report = _sweep(started)
+        _usage = (time.time(), report["bytes_used"])
+        _last_sweep.clear()
+        _last_sweep.update(
+            finished=time.time(),
+            seconds=round(time.time() - started, 3),
+            bytes_freed=report["bytes_freed"],
+            bytes_used=report["bytes_used"],
+        )
+        return report
+
+
+def _run_sweeper(interval_s: float) -> None:
+    while True:
+        try:
+            sweep()
+        except Exception as e:  # reported by storage_report(); the next sweep retries
+            _last_sweep.update(finished=time.time(), error=f"{type(e).__name__}: {e}")
+        if _stop.wait(interval_s):
+            return
+
+
+def start_sweeper(interval_s: float = STORAGE_SWEEP_INTERVAL_S) -> None:
+    """Sweep now and every interval_s seconds on a daemon thread (0: never)."""
+    global _sweeper
+    if interval_s <= 0 or (_sweeper is not None and _sweeper.is_alive()):
+        return
+    _stop.clear()
+    _sweeper = threading.Thread(
+        target=_run_sweeper, args=(interval_s,), name="storage-sweeper", daemon=True
+    )
+    _sweeper.start()
+
+
+def stop_sweeper(timeout: float = 5.0) -> None:
+    """
+    Stop the background sweeper. A sweep still running after timeout is
+    abandoned with the process; every file it writes is replaced atomically.
+    """
+    _stop.set()
+    if _sweeper is not None:
+        _sweeper.join(timeout)
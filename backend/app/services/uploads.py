@@ -0,0 +1,252 @@
+# app/services/uploads.py
+"""
+Resumable multipart uploads.
+
+A client creates an upload with the file's name and size, then sends
+parts 1..n_parts (each part_size bytes except the last) in any order,
+retrying any that fail, and finally completes it. Each part is streamed
+to a staging file and hashed as it is written; only once its size and
+checksum are verified is it copied to its offset in a file preallocated
+at creation, fsynced and recorded. So every part is written twice and
+read back once, which is the price of a failed resend leaving the part
+received before intact. The list of received parts survives a restart,
+and completing touches no part data: the file is already assembled, and
+the upload digest is the SHA-256 of the part digests (like S3 multipart
+ETags), suffixed with the number of parts.
+
+Layout: RESUMABLE_UPLOAD_DIR/<upload_id>/{session.json, data.<ext>,
+parts/<n>.json, parts/<n>.<token>.tmp while a part is arriving}.
+Uploads untouched for UPLOAD_SESSION_TTL_S are swept when a new one is
+created.
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import (
+    RESUMABLE_UPLOAD_DIR,
+    UPLOAD_MAX_PART_SIZE,
+    UPLOAD_PART_SIZE,
+    UPLOAD_SESSION_TTL_S,
+)
+from .compressed import data_extension
+from .ingestion_base import get_batch_reader
+
+# Staged parts are copied into the upload file in blocks of this size
+_COPY_BLOCK_SIZE = 1 << 20
+
+
+def _upload_dir(upload_id: str) -> str:
+    try:
+        upload_id = str(uuid.UUID(upload_id))  # also rules out path tricks
+    except ValueError:
+        raise FileNotFoundError(f"Upload not found: {upload_id}")
+    path = os.path.join(RESUMABLE_UPLOAD_DIR, upload_id)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Upload not found: {upload_id}")
+    return path
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _load_session(upload_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(upload_dir, "session.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _part_size(session: Dict[str, Any], n: int) -> int:
+    if n == session["n_parts"]:
+        return session["total_bytes"] - (n - 1) * session["part_size"]
+    return session["part_size"]
+
+
+def sweep_expired() -> int:
+    """Discard uploads not touched for UPLOAD_SESSION_TTL_S; returns how many."""
+    swept = 0
+    cutoff = time.time() - UPLOAD_SESSION_TTL_S
+    for name in os.listdir(RESUMABLE_UPLOAD_DIR):
+        session_path = os.path.join(RESUMABLE_UPLOAD_DIR, name, "session.json")
+        try:
+            if os.path.getmtime(session_path) < cutoff:
+                shutil.rmtree(os.path.join(RESUMABLE_UPLOAD_DIR, name), ignore_errors=True)
+                swept += 1
+        except FileNotFoundError:
+            continue
+    return swept
+
+
+def create_upload(
+    filename: str, total_bytes: int, part_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Start an upload and preallocate its file. Raises ValueError for
+    unsupported file types and invalid sizes.
+    """
+    ext = data_extension(filename)
+    try:
+        get_batch_reader(ext)
+    except ValueError:
+        raise ValueError(f"Unsupported file type: .{ext}")
+    part_size = part_size or UPLOAD_PART_SIZE
+    if total_bytes < 0:
+        raise ValueError("total_bytes must not be negative")
+    if not 0 < part_size <= UPLOAD_MAX_PART_SIZE:
+        raise ValueError(f"part_size must be between 1 and {UPLOAD_MAX_PART_SIZE} bytes")
+
+    sweep_expired()
+    upload_id = str(uuid.uuid4())
+    upload_dir = os.path.join(RESUMABLE_UPLOAD_DIR, upload_id)
+    os.makedirs(os.path.join(upload_dir, "parts"))
+    session = {
+        "upload_id": upload_id,
+        "filename": filename,
+        "ext": ext,
+        "total_bytes": total_bytes,
+        "part_size": part_size,
+        "n_parts": max(1, math.ceil(total_bytes / part_size)),
+        "created": time.time(),
+    }
+    # sparse on most filesystems: space is only used as parts arrive
+    with open(os.path.join(upload_dir, f"data.{ext}"), "wb") as f:
+        f.truncate(total_bytes)
+    _write_json(os.path.join(upload_dir, "session.json"), session)
+    return session
+
+
+class PartWriter:
+    """
+    Streams one part to a staging file. Use as a context manager; the part
+    only reaches the upload file, and counts as received, after commit().
+    """
+
+    def __init__(self, upload_dir: str, session: Dict[str, Any], n: int):
+        self.upload_dir = upload_dir
+        self.session = session
+        self.n = n
+        self.expected = _part_size(session, n)
+        self.written = 0
+        self._hash = hashlib.sha256()
+        # one staging file per attempt, so concurrent resends do not mix
+        self._staging_path = os.path.join(
+            upload_dir, "parts", f"{n:05d}.{uuid.uuid4().hex}.tmp"
+        )
+        self._file = open(self._staging_path, "w+b")
+
+    def write(self, chunk: bytes) -> None:
+        if self.written + len(chunk) > self.expected:
+            raise ValueError(f"Part {self.n} is larger than its {self.expected} bytes")
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.written += len(chunk)
+
+    def commit(self, checksum: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Record the part. Raises ValueError if its size is wrong or its
+        SHA-256 (hex) does not match checksum; the client then resends it.
+        """
+        if self.written != self.expected:
+            raise ValueError(f"Part {self.n} has {self.written} bytes, expected {self.expected}")
+        digest = self._hash.hexdigest()
+        if checksum is not None and checksum.lower() != digest:
+            raise ValueError(f"Checksum mismatch for part {self.n}")
+
+        record_path = os.path.join(self.upload_dir, "parts", f"{self.n:05d}.json")
+        # the range is about to change: a crash while copying must not
+        # leave it described by the previous attempt's record
+        try:
+            os.remove(record_path)
+        except FileNotFoundError:
+            pass
+        self._file.seek(0)
+        with open(os.path.join(self.upload_dir, f"data.{self.session['ext']}"), "r+b") as data:
+            data.seek((self.n - 1) * self.session["part_size"])
+            while True:
+                block = self._file.read(_COPY_BLOCK_SIZE)
+                if not block:
+                    break
+                data.write(block)
+            data.flush()
+            os.fsync(data.fileno())
+        self.close()
+
+        record = {"part": self.n, "size": self.written, "sha256": digest}
+        _write_json(record_path, record)
+        os.utime(os.path.join(self.upload_dir, "session.json"))  # keeps it from expiring
+        return record
+
+    def close(self) -> None:
+        self._file.close()
+        try:
+            os.remove(self._staging_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "PartWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_part(upload_id: str, n: int) -> PartWriter:
+    """
+    Writer for part n (1-based). Raises FileNotFoundError for unknown
+    uploads and ValueError for part numbers out of range.
+    """
+    upload_dir = _upload_dir(upload_id)
+    session = _load_session(upload_dir)
+    if not 1 <= n <= session["n_parts"]:
+        raise ValueError(f"Part number must be between 1 and {session['n_parts']}")
+    return PartWriter(upload_dir, session, n)
+
+
+def _received_parts(upload_dir: str) -> List[Dict[str, Any]]:
+    parts = []
+    for name in os.listdir(os.path.join(upload_dir, "parts")):
+        if name.endswith(".json"):
+            with open(os.path.join(upload_dir, "parts", name), "r", encoding="utf-8") as f:
+                parts.append(json.load(f))
+    return sorted(parts, key=lambda p: p["part"])
+
+
+def upload_status(upload_id: str) -> Dict[str, Any]:
+    """The upload's session plus its received and missing part numbers."""
+    upload_dir = _upload_dir(upload_id)
+    session = _load_session(upload_dir)
+    parts = _received_parts(upload_dir)
+    received = {p["part"] for p in parts}
+    return {
+        **session,
+        "parts": parts,
+        "missing": [n for n in range(1, session["n_parts"] + 1) if n not in received],
+    }
+
+
+def complete_upload(upload_id: str) -> Tuple[str, str, str]:
+    """
+    (path, extension, digest) of a fully received upload, ready to be
+    ingested. Raises ValueError while parts are missing.
+    """
+    status = upload_status(upload_id)
+    if status["missing"]:
+        missing = status["missing"]
+        raise ValueError(f"{len(missing)} parts missing, starting with {missing[:10]}")
+    combined = hashlib.sha256(b"".join(bytes.fromhex(p["sha256"]) for p in status["parts"]))
+    digest = f"{combined.hexdigest()}-{status['n_parts']}"
+    path = os.path.join(_upload_dir(upload_id), f"data.{status['ext']}")
+    return path, status["ext"], digest
+
+
+def discard_upload(upload_id: str) -> None:
+    shutil.rmtree(_upload_dir(upload_id))
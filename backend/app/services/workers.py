@@ -0,0 +1,28 @@
+# app/services/workers.py
+"""
+Shared process pool for CPU-heavy work (partition scans, cleaning, PDF
+pages, ...). Kept free of other service imports so any module can use it.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+from ..config import COMPUTE_WORKERS
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> Executor:
+    """The process pool, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded server process is not safe
+            _executor = ProcessPoolExecutor(
+                max_workers=COMPUTE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
@@ -0,0 +1,80 @@
+# app/utils/fast_response.py
+"""
+Opt-in fast response encoding for large payloads (wide profiles, previews).
+
+FastAPI's default path validates the return value against the response
+model, converts it with jsonable_encoder and encodes it with json.dumps.
+Endpoints that offer the fast path instead build plain dicts / lists
+and encode them once with orjson (json.dumps when orjson is missing),
+or send an Arrow IPC stream when the client accepts one.
+"""
+
+import io
+import json
+from typing import Any, Dict, Optional
+
+import pyarrow as pa
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def _default(value: Any) -> Any:
+    # numpy scalars, Timestamps, Decimals, ...
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON bytes; NaN / inf become null (json.dumps would emit invalid NaN)."""
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(_nan_to_none(obj), default=_default, allow_nan=False).encode()
+
+
+def _nan_to_none(obj: Any) -> Any:
+    if isinstance(obj, float):
+        return obj if obj == obj and obj not in (float("inf"), float("-inf")) else None
+    if isinstance(obj, dict):
+        return {k: _nan_to_none(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_nan_to_none(v) for v in obj]
+    return obj
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def wants_arrow(accept: Optional[str]) -> bool:
+    return bool(accept) and ARROW_STREAM in accept
+
+
+def arrow_response(table: pa.Table, metadata: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    table as an Arrow IPC stream. Scalars that do not fit the table (ids,
+    totals) travel as JSON-encoded schema metadata.
+    """
+    if metadata:
+        table = table.replace_schema_metadata(
+            {k: json.dumps(v, default=_default) for k, v in metadata.items()}
+        )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue(), media_type=ARROW_STREAM)
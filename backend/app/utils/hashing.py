@@ -0,0 +1,14 @@
+# app/utils/hashing.py
+
+import hashlib
+
+_BLOCK_SIZE = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file's content, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_BLOCK_SIZE):
+            h.update(block)
+    return h.hexdigest()
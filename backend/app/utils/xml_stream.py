@@ -0,0 +1,22 @@
+# app/utils/xml_stream.py
+"""Helpers for lxml iterparse loops that must run in bounded memory."""
+
+
+def localname(tag) -> str:
+    """Tag without its "{namespace}" prefix (comments / PIs have no str tag)."""
+    if not isinstance(tag, str):
+        return ""
+    return tag.rsplit("}", 1)[-1]
+
+
+def release(elem) -> None:
+    """
+    Free a fully processed element: clear its content and drop the
+    (already processed) earlier siblings from its parent, so the tree
+    built by iterparse does not grow with the document.
+    """
+    elem.clear(keep_tail=True)
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
@@ -0,0 +1,83 @@
+# benchmarks/bench_excel.py
+"""
+Spreadsheet ingestion benchmark: the batch xlsx reader (with calamine,
+and with its openpyxl read-only fallback) against pd.read_excel on a
+generated workbook. Each reader runs in a fresh process so peak RSS is
+its own.
+
+    cd backend
+    python -m benchmarks.bench_excel --rows 500000
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+_COLUMNS = ["id", "name", "amount", "ratio", "flag", "category"]
+
+
+def write_workbook(path: str, rows: int) -> None:
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("data")
+    ws.append(_COLUMNS)
+    for i in range(rows):
+        ws.append([i, f"name-{i}", i * 1.25, (i % 97) / 97, i % 2 == 0, f"cat-{i % 13}"])
+    wb.save(path)
+
+
+def _run(reader: str, path: str, out) -> None:
+    import pandas as pd
+
+    from app.services import file_readers
+    from app.services.ingestion_base import concat_batches
+
+    started = time.perf_counter()
+    if reader == "calamine":
+        df = concat_batches(file_readers.iter_spreadsheet(path))
+    elif reader == "openpyxl-streaming":
+        df = concat_batches(file_readers._iter_openpyxl(path, None))
+    else:
+        df = pd.read_excel(path, engine="openpyxl")
+    out.put(
+        {
+            "reader": reader,
+            "rows": len(df),
+            "seconds": round(time.perf_counter() - started, 2),
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024,
+        }
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--path", help="existing .xlsx to read instead of a generated one")
+    args = parser.parse_args()
+
+    path = args.path
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"bench_excel_{args.rows}.xlsx")
+        if not os.path.exists(path):
+            print(f"writing {args.rows} rows to {path} ...")
+            write_workbook(path, args.rows)
+
+    ctx = multiprocessing.get_context("spawn")
+    readers = ["pandas", "openpyxl-streaming"]
+    if importlib.util.find_spec("python_calamine") is not None:
+        readers.append("calamine")
+    for reader in readers:
+        out = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(reader, path, out))
+        proc.start()
+        print(out.get())
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
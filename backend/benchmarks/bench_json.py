@@ -0,0 +1,86 @@
+# benchmarks/bench_json.py
+"""
+Profile / preview response encoding benchmark: the default response-model
+path (pydantic models, jsonable_encoder, json.dumps, as FastAPI does it)
+against the fast paths (orjson rows, orjson columnar, Arrow IPC) on a
+generated wide dataset. Reports payload size and encode time.
+
+    cd backend
+    python -m benchmarks.bench_json --cols 5000 --rows 1000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+
+def make_frame(rows: int, cols: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    data = {}
+    for i in range(cols):
+        if i % 3 == 2:
+            data[f"text_{i}"] = rng.choice(["alpha", "beta", "gamma", None], rows)
+        else:
+            values = rng.normal(size=rows)
+            values[rng.random(rows) < 0.05] = np.nan
+            data[f"num_{i}"] = values
+    return pd.DataFrame(data)
+
+
+def _time(fn, repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--cols", type=int, default=5000)
+    parser.add_argument("--preview-rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.routers import datasets
+    from app.utils import fast_response
+
+    df = make_frame(args.rows, args.cols)
+    seconds, table = _time(lambda: datasets._profile_table(df), 1)
+    print({"case": "profile statistics", "seconds": round(seconds, 4)})
+
+    def render(layout=None, accept=None):
+        response = datasets._render_profile(table, "bench", len(df), layout, accept)
+        if layout is None and accept is None:
+            # what FastAPI does with a response model
+            return json.dumps(jsonable_encoder(response)).encode()
+        return response.body
+
+    preview = datasets._arrow_table(df.head(args.preview_rows))
+    cases = {
+        "profile / response model": lambda: render(),
+        "profile / orjson rows": lambda: render("rows"),
+        "profile / orjson columnar": lambda: render("columnar"),
+        "profile / arrow": lambda: render(accept=fast_response.ARROW_STREAM),
+        "preview / records of str": lambda: json.dumps(
+            jsonable_encoder(datasets._preview_records(preview))
+        ).encode(),
+        "preview / orjson columnar": lambda: fast_response.dumps(
+            {"columns": preview.column_names, "data": preview.to_pydict()}
+        ),
+        "preview / arrow": lambda: fast_response.arrow_response(preview).body,
+    }
+    print({"orjson": fast_response.orjson is not None})
+    for name, fn in cases.items():
+        seconds, body = _time(fn, args.repeat)
+        print({"case": name, "seconds": round(seconds, 4), "bytes": len(body)})
+
+
+if __name__ == "__main__":
+    main()
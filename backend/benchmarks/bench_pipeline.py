@@ -0,0 +1,334 @@
+# benchmarks/bench_pipeline.py
+"""
+End-to-end benchmark of ingest -> profile -> score -> clean -> download,
+per service function and per HTTP route (FastAPI TestClient), on
+generated data (see datagen) in CSV / Parquet / JSONL / XLSX.
+
+Each case runs in a fresh process against a scratch dataset store, so
+its memory is its own. It reports the best time of --repeat runs,
+throughput (rows/s, and MB/s of input where it applies) and peak RSS
+above the process's size before the run. --save-baseline stores the
+results as JSON; --baseline compares against such a file and exits with
+status 1 when a case got slower (or bigger) by more than --tolerance.
+
+benchmarks/baseline.json is committed, recorded with the command below;
+it also records the machine, and comparing on another one warns, as
+timings only compare on the same hardware. Re-record it (in the same
+change) when a change is meant to move the numbers or the reference
+machine changes.
+
+    cd backend
+    python -m benchmarks.bench_pipeline --rows 200000 --cols 20 --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --rows 200000 --cols 20 --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from . import datagen
+
+# Format -> module its writer needs
+_WRITER_DEPENDENCIES = {"parquet": "pyarrow", "xlsx": "openpyxl"}
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm", "rb") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+class _RssSampler(threading.Thread):
+    """
+    Polls the process RSS while a case runs. ru_maxrss would do, but the
+    imports before the case often set a high-water mark the case never
+    reaches.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, _rss_mb())
+
+    def stop(self) -> float:
+        self._stop_event.set()
+        self.join()
+        return max(self.peak, _rss_mb())
+
+
+# --------- CASES ----------
+# A case is prepared in its worker process: prepare(ctx) returns the
+# function to time (called --repeat times) and an optional reset run
+# before each call, untimed.
+
+def _service_read(ctx: Dict[str, Any], fmt: str):
+    from app.services import ingestion  # noqa: F401  (registers the readers)
+    from app.services.ingestion_base import concat_batches, get_batch_reader
+
+    path = ctx["files"][fmt]
+    return lambda: concat_batches(get_batch_reader(fmt)(path)), None
+
+
+def _service_ingest(ctx: Dict[str, Any], fmt: str):
+    from app.services import ingestion
+    from app.services.ingestion_base import get_batch_reader
+
+    path = ctx["files"][fmt]
+    return lambda: ingestion.save_batches(get_batch_reader(fmt)(path)), None
+
+
+def _service_profile(ctx: Dict[str, Any]):
+    from app.routers import datasets
+    from app.services import ingestion
+
+    return lambda: datasets._profile_table(ingestion.load_dataset(ctx["dataset_id"])), None
+
+
+def _service_quality(ctx: Dict[str, Any]):
+    from app.routers import datasets
+    from app.services import ingestion
+
+    def run():
+        return datasets._quality_score(ingestion.load_dataset(ctx["dataset_id"]), ctx["dataset_id"])
+
+    return run, None
+
+
+def _service_clean(ctx: Dict[str, Any], engine: str):
+    from app.schemas.datasets import CleaningOptions
+    from app.services import clean_plan, ingestion
+
+    paths = ingestion.dataset_partitions(ctx["dataset_id"])
+    return lambda: clean_plan.run_plan(CleaningOptions(), paths, engine), None
+
+
+def _service_download(ctx: Dict[str, Any]):
+    from pathlib import Path
+
+    from app.routers import datasets
+    from app.services import ingestion
+
+    paths = [Path(p) for p in ingestion.dataset_partitions(ctx["dataset_id"])]
+    return lambda: sum(len(block) for block in datasets._iter_csv(paths)), None
+
+
+def _client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
+
+
+def _checked(response):
+    response.raise_for_status()
+    return response
+
+
+def _http_upload(ctx: Dict[str, Any], fmt: str):
+    client, path = _client(), ctx["files"][fmt]
+    with open(path, "rb") as f:
+        content = f.read()
+    name = os.path.basename(path)
+    return lambda: _checked(client.post("/datasets/upload", files={"file": (name, content)})), None
+
+
+def _http_get(ctx: Dict[str, Any], route: str):
+    client, url = _client(), f"/datasets/{ctx['dataset_id']}/{route}"
+    return lambda: _checked(client.get(url)).content, None
+
+
+def _http_clean(ctx: Dict[str, Any], engine: str):
+    from app.services import clean_memo
+
+    client = _client()
+    url = f"/datasets/{ctx['dataset_id']}/clean?engine={engine}"
+
+    def forget():
+        # a memoized clean would return without doing any work
+        clean_memo._memo.delete(*clean_memo._memo.items())
+
+    return lambda: _checked(client.post(url)), forget
+
+
+def build_cases(formats: List[str], engines: List[str]) -> List[Tuple[str, Callable, tuple, str]]:
+    """(name, prepare, args, throughput basis: "file" bytes or "rows") per case."""
+    cases = []
+    for fmt in formats:
+        cases.append((f"service.read.{fmt}", _service_read, (fmt,), "file"))
+        cases.append((f"service.ingest.{fmt}", _service_ingest, (fmt,), "file"))
+    cases += [
+        ("service.profile", _service_profile, (), "rows"),
+        ("service.quality", _service_quality, (), "rows"),
+    ]
+    cases += [(f"service.clean.{e}", _service_clean, (e,), "rows") for e in engines]
+    cases.append(("service.download", _service_download, (), "rows"))
+    cases += [(f"http.upload.{fmt}", _http_upload, (fmt,), "file") for fmt in formats]
+    cases += [
+        ("http.profile", _http_get, ("profile",), "rows"),
+        ("http.quality_score", _http_get, ("quality_score",), "rows"),
+    ]
+    cases += [(f"http.clean.{e}", _http_clean, (e,), "rows") for e in engines]
+    cases.append(("http.download", _http_get, ("download",), "rows"))
+    return cases
+
+
+def _run_case(prepare: Callable, args: tuple, ctx: Dict[str, Any], repeat: int, out) -> None:
+    try:
+        fn, reset = prepare(ctx, *args)
+        best, peak = float("inf"), 0.0
+        for _ in range(repeat):
+            if reset is not None:
+                reset()
+            gc.collect()
+            sampler = _RssSampler()
+            idle_mb = sampler.peak
+            sampler.start()
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+            peak = max(peak, sampler.stop() - idle_mb)
+        out.put({"seconds": best, "peak_rss_mb": peak})
+    except Exception as e:  # reported, so one broken case does not stop the suite
+        out.put({"error": f"{type(e).__name__}: {e}"})
+
+
+# --------- BASELINE ----------
+
+def compare(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Cases slower or bigger than the baseline by more than tolerance."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None or "error" in base or "error" in result:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            # ignore noise on tiny values (under 10 ms / 5 MB)
+            floor = 0.01 if metric == "seconds" else 5.0
+            limit = max(base[metric], floor) * (1 + tolerance)
+            if result[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:.3f} > {base[metric]:.3f} "
+                    f"(+{tolerance:.0%} allowed)"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--dup-rate", type=float, default=0.02)
+    parser.add_argument("--cardinality", type=int, default=1000)
+    parser.add_argument("--outlier-rate", type=float, default=0.01)
+    parser.add_argument("--formats", default=",".join(datagen.FORMATS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="run only cases whose name contains this")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    params = {
+        k: getattr(args, k)
+        for k in ("rows", "cols", "null_rate", "dup_rate", "cardinality", "outlier_rate")
+    }
+    formats = []
+    for fmt in args.formats.split(","):
+        dependency = _WRITER_DEPENDENCIES.get(fmt)
+        if dependency and importlib.util.find_spec(dependency) is None:
+            print(f"skipping {fmt}: {dependency} is not installed")
+        else:
+            formats.append(fmt)
+
+    scratch = tempfile.mkdtemp(prefix="bench_pipeline_")
+    # the store the workers (and the app imported below) use
+    os.environ["UPLOAD_DIR"] = os.path.join(scratch, "datasets")
+    os.makedirs(os.environ["UPLOAD_DIR"])
+    try:
+        df = datagen.generate(**params)
+        files = {}
+        for fmt in formats:
+            print(f"writing {len(df)} rows as {fmt} ...")
+            files[fmt] = datagen.write(df, os.path.join(scratch, f"data.{fmt}"), fmt)
+
+        from app.services import clean_plan, ingestion
+        from app.services.ingestion_base import get_batch_reader
+
+        source = files.get("csv") or next(iter(files.values()))
+        ext = os.path.splitext(source)[1].lstrip(".")
+        ctx = {
+            "files": files,
+            "dataset_id": ingestion.save_batches(get_batch_reader(ext)(source)),
+        }
+        cases = build_cases(formats, clean_plan.available_engines())
+        if args.only:
+            cases = [c for c in cases if args.only in c[0]]
+
+        mp = multiprocessing.get_context("spawn")
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, prepare, case_args, basis in cases:
+            out = mp.Queue()
+            proc = mp.Process(target=_run_case, args=(prepare, case_args, ctx, args.repeat, out))
+            proc.start()
+            result = out.get()
+            proc.join()
+            if "error" not in result:
+                result["rows_per_s"] = round(args.rows / result["seconds"])
+                if basis == "file":
+                    size_mb = os.path.getsize(files[case_args[0]]) / 2**20
+                    result["mb_per_s"] = round(size_mb / result["seconds"], 2)
+                result["seconds"] = round(result["seconds"], 4)
+                result["peak_rss_mb"] = round(result["peak_rss_mb"], 1)
+            results[name] = result
+            print(json.dumps({"case": name, **result}))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    machine = {"platform": platform.platform(), "cpus": os.cpu_count()}
+    report = {
+        "params": params,
+        "python": sys.version.split()[0],
+        "machine": machine,
+        "results": results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(f"warning: baseline was recorded with {baseline.get('params')}")
+        if baseline.get("machine") != machine:
+            print(f"warning: baseline was recorded on {baseline.get('machine')}")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("no regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
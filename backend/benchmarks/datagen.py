@@ -0,0 +1,72 @@
+# benchmarks/datagen.py
+"""
+Synthetic datasets for the benchmarks, with the properties cleaning cares
+about under control: missing cells, duplicate rows, column cardinality
+and numeric outliers. Generation is seeded, so the same parameters give
+the same file.
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("csv", "parquet", "jsonl", "xlsx")
+
+
+def generate(
+    rows: int,
+    cols: int,
+    null_rate: float = 0.05,
+    dup_rate: float = 0.02,
+    cardinality: int = 1000,
+    outlier_rate: float = 0.01,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    A frame of `cols` columns cycling through float, int and text types.
+    Text and int columns draw from `cardinality` distinct values; float
+    columns are standard normal with outlier_rate of values at +-10 sigma.
+    null_rate of the cells are then blanked and dup_rate of the rows
+    replaced by copies of other rows.
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        kind = i % 3
+        if kind == 0:
+            values = rng.normal(size=rows)
+            outliers = rng.random(rows) < outlier_rate
+            values[outliers] = rng.choice([-10.0, 10.0], int(outliers.sum()))
+            data[f"num_{i}"] = values
+        elif kind == 1:
+            data[f"int_{i}"] = rng.integers(0, cardinality, rows)
+        else:
+            labels = np.array([f"cat-{j}" for j in range(cardinality)], dtype=object)
+            data[f"text_{i}"] = labels[rng.integers(0, cardinality, rows)]
+    df = pd.DataFrame(data)
+
+    if null_rate:
+        df = df.mask(rng.random(df.shape) < null_rate)
+    if dup_rate and rows > 1:
+        targets = np.flatnonzero(rng.random(rows) < dup_rate)
+        sources = rng.integers(0, rows, len(targets))
+        df.iloc[targets] = df.iloc[sources].to_numpy()
+    return df
+
+
+def write(df: pd.DataFrame, path: str, fmt: Optional[str] = None) -> str:
+    """Write df in fmt (default: from the extension) and return the path."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".")
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "jsonl":
+        df.to_json(path, orient="records", lines=True)
+    elif fmt == "xlsx":
+        df.to_excel(path, index=False, engine="openpyxl")
+    else:
+        raise ValueError(f"Unsupported benchmark format: {fmt}")
+    return path
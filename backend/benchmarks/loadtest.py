@@ -0,0 +1,428 @@
+# benchmarks/loadtest.py
+"""
+Load test: N concurrent simulated users replaying the frontend workflow
+(frontend/app.py) against a locally started backend, or a running one
+given by --url.
+
+The "frontend" workflow (the default) is exactly what the Streamlit app
+does: upload, one streamed /analyze (profile, quality and cleaning),
+then download the cleaned dataset. The "routes" workflow calls
+/profile, /quality_score, /clean and /download separately. Each user
+draws its files from a size mix (--mix name=rows:weight,...) and runs
+workflows back to back for --duration seconds, at each concurrency in
+--users.
+
+Each concurrency step reports workflows/s and requests/s, the error rate,
+per-route latency percentiles, and the server's RSS. RSS is summed over
+the server process tree (uvicorn workers and the compute pool) when the
+server is started here. With --url it is read from /metrics instead,
+which covers the API process only.
+
+    cd backend
+    python -m benchmarks.loadtest --users 1,2,4,8,16 --duration 30
+    python -m benchmarks.loadtest --mix small=1000:8,large=200000:2 --workflow routes --out load.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Tuple
+
+import httpx
+
+from . import datagen
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+# --------- FILES ----------
+
+def parse_mix(spec: str) -> List[Tuple[str, int, float]]:
+    """"small=1000:6,large=100000:1" -> [(name, rows, weight), ...]"""
+    mix = []
+    for part in spec.split(","):
+        name, _, value = part.strip().partition("=")
+        rows, _, weight = value.partition(":")
+        if not name or not rows:
+            raise ValueError(f"Bad --mix entry {part!r}; expected name=rows[:weight]")
+        mix.append((name, int(rows), float(weight or 1)))
+    return mix
+
+
+def make_files(
+    mix: List[Tuple[str, int, float]], cols: int, fmt: str, scratch: str
+) -> Dict[str, bytes]:
+    files = {}
+    for i, (name, rows, _) in enumerate(mix):
+        path = datagen.write(
+            datagen.generate(rows, cols, seed=i), os.path.join(scratch, f"{name}.{fmt}"), fmt
+        )
+        with open(path, "rb") as f:
+            files[name] = f.read()
+    return files
+
+
+def unique_content(content: bytes, fmt: str, n: int) -> bytes:
+    """
+    content plus one row carrying n, so every upload has its own content
+    hash (the backend reuses cleans of identical content). Only csv and
+    jsonl can be extended this way; other formats are sent as they are.
+    """
+    if fmt == "csv":
+        width = content[: content.index(b"\n")].count(b",")
+        return content + f"{n}{',' * width}\n".encode()
+    if fmt == "jsonl":
+        first = json.loads(content[: content.index(b"\n")])
+        return content + json.dumps({next(iter(first)): n}).encode() + b"\n"
+    return content
+
+
+# --------- SERVER ----------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, upload_dir: str) -> Tuple[subprocess.Popen, str]:
+    """uvicorn serving app.main:app on a free port, storing datasets in upload_dir."""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=_BACKEND_DIR,
+        env={**os.environ, "UPLOAD_DIR": upload_dir},
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Backend exited with status {proc.returncode}")
+        try:
+            httpx.get(f"{url}/", timeout=1).raise_for_status()
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Backend did not start within 60 s")
+
+
+def _children() -> Dict[int, List[int]]:
+    children = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                # the command name (field 2) may contain spaces; ppid follows it
+                ppid = int(f.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children[ppid].append(int(entry))
+    return children
+
+
+def tree_rss(pid: int) -> int:
+    """Resident bytes of pid and all its descendants."""
+    children, total, todo = _children(), 0, [pid]
+    while todo:
+        current = todo.pop()
+        try:
+            with open(f"/proc/{current}/statm", "rb") as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+        except OSError:
+            continue
+        todo += children.get(current, [])
+    return total
+
+
+def metrics_rss(url: str) -> int:
+    text = httpx.get(f"{url}/metrics", timeout=5).text
+    for line in text.splitlines():
+        if line.startswith("cleanmind_process_resident_memory_bytes "):
+            return int(float(line.split()[1]))
+    raise ValueError("/metrics has no cleanmind_process_resident_memory_bytes")
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, read_rss, interval: float):
+        super().__init__(daemon=True)
+        self.read_rss = read_rss
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.samples.append(self.read_rss())
+            except (OSError, ValueError, httpx.HTTPError):
+                pass
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self) -> Dict[str, float]:
+        self._stop_event.set()
+        self.join()
+        if not self.samples:
+            return {}
+        return {
+            "peak_mb": round(max(self.samples) / 2**20, 1),
+            "mean_mb": round(sum(self.samples) / len(self.samples) / 2**20, 1),
+        }
+
+
+# --------- USERS ----------
+
+class Recorder:
+    """Latencies and errors per route, shared by all users of a step."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: List[str] = []
+        self.workflows = 0
+
+    def call(self, route: str, send) -> httpx.Response:
+        """Time send() (which must read the whole body); errors propagate."""
+        started = time.perf_counter()
+        try:
+            response = send()
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            with self.lock:
+                self.errors[route] += 1
+                self.latencies[route].append(time.perf_counter() - started)
+                if len(self.error_samples) < 5:
+                    self.error_samples.append(f"{route}: {e}")
+            raise
+        with self.lock:
+            self.latencies[route].append(time.perf_counter() - started)
+        return response
+
+
+def _download(client: httpx.Client, dataset_id: str) -> httpx.Response:
+    with client.stream("GET", f"/datasets/{dataset_id}/download") as response:
+        for _ in response.iter_bytes():
+            pass
+    return response
+
+
+def _analyze(client: httpx.Client, dataset_id: str) -> Tuple[httpx.Response, Dict[str, Any]]:
+    stages = {}
+    with client.stream(
+        "POST", f"/datasets/{dataset_id}/analyze", params={"stream": "ndjson"}
+    ) as response:
+        if response.status_code < 400:
+            for line in response.iter_lines():
+                if line:
+                    event = json.loads(line)
+                    stages[event["stage"]] = event["data"]
+    return response, stages
+
+
+def run_workflow(
+    client: httpx.Client, rec: Recorder, workflow: str, name: str, content: bytes
+) -> None:
+    response = rec.call(
+        "POST /datasets/upload",
+        lambda: client.post("/datasets/upload", files={"file": (name, content)}),
+    )
+    dataset_id = response.json()["dataset_id"]
+
+    if workflow == "frontend":
+        stages: Dict[str, Any] = {}
+
+        def analyze():
+            response, found = _analyze(client, dataset_id)
+            stages.update(found)
+            return response
+
+        rec.call("POST /datasets/{id}/analyze", analyze)
+        cleaned_id = stages["cleaning"]["cleaned_dataset_id"]
+    else:
+        rec.call("GET /datasets/{id}/profile", lambda: client.get(f"/datasets/{dataset_id}/profile"))
+        rec.call(
+            "GET /datasets/{id}/quality_score",
+            lambda: client.get(f"/datasets/{dataset_id}/quality_score"),
+        )
+        response = rec.call(
+            "POST /datasets/{id}/clean", lambda: client.post(f"/datasets/{dataset_id}/clean")
+        )
+        cleaned_id = response.json()["cleaned_dataset_id"]
+
+    rec.call("GET /datasets/{id}/download", lambda: _download(client, cleaned_id))
+    with rec.lock:
+        rec.workflows += 1
+
+
+def _user(
+    index: int,
+    url: str,
+    rec: Recorder,
+    deadline: float,
+    args: argparse.Namespace,
+    mix: List[Tuple[str, int, float]],
+    files: Dict[str, bytes],
+    counter: Iterator[int],
+) -> None:
+    rng = random.Random(index)
+    names = [name for name, _, _ in mix]
+    weights = [weight for _, _, weight in mix]
+    # one keep-alive session per user, like the frontend's pooled session
+    with httpx.Client(base_url=url, timeout=args.timeout) as client:
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            content = files[name]
+            if not args.repeat_content:
+                content = unique_content(content, args.format, next(counter))
+            try:
+                run_workflow(client, rec, args.workflow, f"{name}.{args.format}", content)
+            except (httpx.HTTPError, KeyError, ValueError):
+                # recorded per route (or a malformed response); on to the next workflow
+                time.sleep(0.1)
+
+
+# --------- REPORT ----------
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    # nearest rank
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(users: int, seconds: float, rec: Recorder, rss: Dict[str, float]) -> Dict[str, Any]:
+    routes = {}
+    total_requests = total_errors = 0
+    for route, values in sorted(rec.latencies.items()):
+        values = sorted(values)
+        total_requests += len(values)
+        total_errors += rec.errors[route]
+        routes[route] = {
+            "requests": len(values),
+            "errors": rec.errors[route],
+            **{
+                f"p{int(q * 100)}_ms": round(_percentile(values, q) * 1000, 1)
+                for q in (0.5, 0.9, 0.99)
+            },
+            "max_ms": round(values[-1] * 1000, 1),
+        }
+    return {
+        "users": users,
+        "seconds": round(seconds, 1),
+        "workflows": rec.workflows,
+        "workflows_per_s": round(rec.workflows / seconds, 2),
+        "requests_per_s": round(total_requests / seconds, 2),
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        "server_rss": rss,
+        "routes": routes,
+        "error_samples": rec.error_samples,
+    }
+
+
+def print_step(step: Dict[str, Any]) -> None:
+    rss = step["server_rss"]
+    print(
+        f"\nusers={step['users']}  workflows/s={step['workflows_per_s']}  "
+        f"requests/s={step['requests_per_s']}  errors={step['error_rate']:.2%}  "
+        f"server RSS peak={rss.get('peak_mb', '?')} MB mean={rss.get('mean_mb', '?')} MB"
+    )
+    print(f"  {'route':36} {'n':>6} {'err':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for route, r in step["routes"].items():
+        print(
+            f"  {route:36} {r['requests']:>6} {r['errors']:>5} {r['p50_ms']:>9} "
+            f"{r['p90_ms']:>9} {r['p99_ms']:>9} {r['max_ms']:>9}"
+        )
+    for sample in step["error_samples"]:
+        print(f"  error: {sample}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="running backend to test (default: start one here)")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn --workers")
+    parser.add_argument("--users", default="1,2,4,8", help="concurrency steps")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    parser.add_argument("--mix", default="small=1000:6,medium=20000:3,large=200000:1")
+    parser.add_argument("--cols", type=int, default=12)
+    parser.add_argument("--format", default="csv", choices=datagen.FORMATS)
+    parser.add_argument("--workflow", default="frontend", choices=("frontend", "routes"))
+    parser.add_argument(
+        "--repeat-content",
+        action="store_true",
+        help="upload identical files (exercises the clean memo) instead of unique ones",
+    )
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--rss-interval", type=float, default=0.25)
+    parser.add_argument("--out", help="write the step reports to this JSON file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    scratch = tempfile.mkdtemp(prefix="loadtest_")
+    server = None
+    try:
+        print(f"generating {', '.join(f'{n} ({r} rows)' for n, r, _ in mix)} ...")
+        files = make_files(mix, args.cols, args.format, scratch)
+        if args.url:
+            url, read_rss = args.url.rstrip("/"), lambda: metrics_rss(args.url.rstrip("/"))
+        else:
+            upload_dir = os.path.join(scratch, "datasets")
+            os.makedirs(upload_dir)
+            server, url = start_server(args.server_workers, upload_dir)
+            read_rss = lambda: tree_rss(server.pid)  # noqa: E731
+            print(f"backend started at {url} ({args.server_workers} worker(s))")
+
+        # numbers the unique uploads; itertools.count is safe to share between threads
+        counter = itertools.count()
+        steps = []
+        for users in [int(u) for u in args.users.split(",")]:
+            rec = Recorder()
+            sampler = RssSampler(read_rss, args.rss_interval)
+            sampler.start()
+            started = time.monotonic()
+            deadline = started + args.duration
+            threads = [
+                threading.Thread(
+                    target=_user, args=(i, url, rec, deadline, args, mix, files, counter)
+                )
+                for i in range(users)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            # in-flight workflows finish after the deadline; count their time too
+            step = summarize(users, time.monotonic() - started, rec, sampler.stop())
+            print_step(step)
+            steps.append(step)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.out:
+        report = {"params": {k: v for k, v in vars(args).items() if k != "out"}, "steps": steps}
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nreport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# before app.config is imported: keep the tests out of the real dataset
+# store and reader caches (sweeps in the tests clean both)
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="cleanmind_tests_"))
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="cleanmind_tests_cache_"))
+os.environ.setdefault("STORAGE_SWEEP_INTERVAL_S", "0")
@@ -0,0 +1,119 @@
+# tests/test_catalog.py
+import multiprocessing
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from app.config import BASE_UPLOAD_DIR
+from app.services import catalog, ingestion, parallel
+from app.services.catalog import JsonTable
+
+
+@pytest.fixture
+def table(tmp_path):
+    return JsonTable(str(tmp_path / "table.json"))
+
+
+def _increment(path, key, times):
+    t = JsonTable(path)
+    for _ in range(times):
+        t.update(key, lambda e: {"n": e.get("n", 0) + 1})
+
+
+def test_entries_are_copies(table):
+    table.put("a", {"n": 1})
+    entry = table.get("a")
+    entry["n"] = 2
+    table.items()["a"]["n"] = 3
+    assert table.get("a") == {"n": 1}
+    assert table.get("missing") is None
+
+
+def test_update_and_delete(table):
+    assert table.update("a", lambda e: {**e, "n": e.get("n", 0) + 1}) == {"n": 1}
+    assert table.update("a", lambda e: {**e, "n": e["n"] + 1}) == {"n": 2}
+    table.put("b", {})
+    table.delete("a", "missing")
+    assert table.items() == {"b": {}}
+
+
+def test_writes_by_another_process_are_seen(table):
+    table.put("a", {"n": 1})
+    other = JsonTable(table.path)  # a second worker's view of the same file
+    other.put("a", {"n": 2})
+    assert table.get("a") == {"n": 2}
+
+
+def test_concurrent_processes_lose_no_updates(table):
+    if not hasattr(os, "fork"):
+        pytest.skip("needs fork")
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_increment, args=(table.path, "counter", 50)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert all(w.exitcode == 0 for w in workers)
+    assert table.get("counter") == {"n": 200}
+
+
+def test_content_hash_is_cached_until_partitions_change():
+    dataset_id = ingestion.save_dataset(pd.DataFrame({"x": [1, 2, 3]}))
+    assert "content_hash" not in catalog.get_entry(dataset_id)
+
+    digest = ingestion.content_hash(dataset_id)
+    assert catalog.get_entry(dataset_id)["content_hash"] == digest
+    # identical content hashes alike under any id
+    assert ingestion.content_hash(ingestion.save_dataset(pd.DataFrame({"x": [1, 2, 3]}))) == digest
+
+    ingestion.add_partition(dataset_id, pd.DataFrame({"x": [4]}))
+    assert "content_hash" not in catalog.get_entry(dataset_id)
+    assert ingestion.content_hash(dataset_id) != digest
+
+
+def test_partition_size_is_read_when_saving(monkeypatch):
+    monkeypatch.setattr(ingestion, "PARTITION_ROWS", 2)
+    df = pd.DataFrame({"x": range(5)})
+    assert [len(p) for p in ingestion.split_partitions(df)] == [2, 2, 1]
+    assert [len(p) for p in ingestion.split_partitions(df, rows=10)] == [5]
+
+    dataset_id = ingestion.save_dataset(df)
+    assert len(ingestion.dataset_partitions(dataset_id)) == 3
+    assert ingestion.load_dataset(dataset_id)["x"].tolist() == list(range(5))
+
+
+def test_content_hash_of_a_missing_dataset():
+    with pytest.raises(FileNotFoundError):
+        ingestion.content_hash("no-such-dataset")
+
+
+def _archive(tmp_path, members):
+    path = str(tmp_path / "tables.zip")
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+    return path
+
+
+def test_save_keys_records_each_key(tmp_path):
+    path = _archive(tmp_path, {"a.csv": "x\n1\n2\n", "b.csv": "y\n3\n"})
+    ids = parallel.save_keys(path, "zip", ["a.csv", "b.csv"], upload_name="tables.zip")
+
+    entries = [catalog.get_entry(dataset_id) for dataset_id in ids]
+    assert [e["source_key"] for e in entries] == ["a.csv", "b.csv"]
+    assert all(e["upload_name"] == "tables.zip" and e["partitions"] for e in entries)
+    assert ingestion.load_dataset(ids[0])["x"].tolist() == [1, 2]
+    assert ingestion.load_dataset(ids[1])["y"].tolist() == [3]
+
+
+def test_save_keys_keeps_nothing_when_a_key_fails(tmp_path):
+    path = _archive(tmp_path, {"a.csv": "x\n1\n"})
+    before = set(catalog.list_entries())
+    parts_before = set(os.listdir(BASE_UPLOAD_DIR))
+
+    with pytest.raises(ValueError):
+        parallel.save_keys(path, "zip", ["a.csv", "missing.csv"])
+    assert set(catalog.list_entries()) == before
+    assert set(os.listdir(BASE_UPLOAD_DIR)) == parts_before
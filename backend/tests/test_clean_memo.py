@@ -0,0 +1,124 @@
+# tests/test_clean_memo.py
+import time
+
+import pandas as pd
+import pytest
+
+from app.routers import datasets
+from app.schemas.datasets import CleaningOptions
+from app.services import catalog, clean_memo, ingestion
+
+
+@pytest.fixture(autouse=True)
+def empty_memo():
+    clean_memo._memo.delete(*clean_memo._memo.items())
+    yield
+    clean_memo._memo.delete(*clean_memo._memo.items())
+
+
+def _dataset(offset=0):
+    df = pd.DataFrame({"x": [1.0, None, 3.0, 3.0, 5.0 + offset], "y": ["a", "b", "b", "b", None]})
+    return ingestion.save_dataset(df)
+
+
+def _summary(cleaned_dataset_id):
+    return {"cleaned_dataset_id": cleaned_dataset_id, "n_rows_after": 1}
+
+
+def _age(key, seconds):
+    entry = clean_memo._memo.get(key)
+    clean_memo._memo.put(key, {**entry, "last_used": time.time() - seconds})
+
+
+def test_same_content_and_options_hit_the_memo():
+    first = datasets._clean(_dataset())
+    assert not first.memoized
+
+    again = datasets._clean(first.source_dataset_id)
+    assert again.memoized
+    assert again.cleaned_dataset_id == first.cleaned_dataset_id
+    assert again.engine == "pandas"
+    assert all(step.seconds is None for step in again.steps)
+
+    # an identical upload under another id reuses it too
+    copy = datasets._clean(_dataset())
+    assert copy.memoized and copy.cleaned_dataset_id == first.cleaned_dataset_id
+    assert copy.source_dataset_id != first.source_dataset_id
+
+
+def test_options_and_content_change_the_key():
+    dataset_id = _dataset()
+    key = clean_memo.memo_key(dataset_id, CleaningOptions())
+    assert clean_memo.memo_key(dataset_id, CleaningOptions(impute_strategy="mean")) != key
+    assert clean_memo.memo_key(_dataset(offset=1), CleaningOptions()) != key
+    # options that do not apply are not part of it
+    assert clean_memo.memo_key(
+        dataset_id, CleaningOptions(remove_outliers=False, outlier_zscore_threshold=1)
+    ) == clean_memo.memo_key(dataset_id, CleaningOptions(remove_outliers=False))
+
+
+def test_engines_are_memoized_apart():
+    pytest.importorskip("polars")
+    dataset_id = _dataset()
+    assert clean_memo.memo_key(dataset_id, CleaningOptions(), "polars") != clean_memo.memo_key(
+        dataset_id, CleaningOptions(), "pandas"
+    )
+    by_pandas = datasets._clean(dataset_id)
+    by_polars = datasets._clean(dataset_id, engine="polars")
+    assert not by_polars.memoized and by_polars.engine == "polars"
+    assert by_polars.cleaned_dataset_id != by_pandas.cleaned_dataset_id
+    assert datasets._clean(dataset_id, engine="polars").memoized
+
+
+def test_lookup_drops_entries_whose_output_is_gone():
+    result = datasets._clean(_dataset())
+    key = clean_memo.memo_key(result.source_dataset_id, CleaningOptions())
+    ingestion.delete_dataset(result.cleaned_dataset_id)
+
+    assert clean_memo.lookup(key) is None
+    assert clean_memo._memo.get(key) is None
+    assert not datasets._clean(result.source_dataset_id).memoized
+
+
+def test_expired_entries_are_evicted_with_their_output(monkeypatch):
+    monkeypatch.setattr(clean_memo, "CLEAN_MEMO_TTL_S", 3600)
+    result = datasets._clean(_dataset())
+    key = clean_memo.memo_key(result.source_dataset_id, CleaningOptions())
+    _age(key, 7200)
+
+    assert clean_memo.evict() == 1
+    assert clean_memo._memo.get(key) is None
+    with pytest.raises(FileNotFoundError):
+        ingestion.dataset_partitions(result.cleaned_dataset_id)
+
+
+def test_least_recently_used_entries_beyond_the_limit_are_evicted(monkeypatch):
+    monkeypatch.setattr(clean_memo, "CLEAN_MEMO_MAX_ENTRIES", 2)
+    outputs = [_dataset(offset=i) for i in range(3)]
+    keys = [f"key-{i}" for i in range(3)]
+    for age, key, output in zip((30, 20, 10), keys, outputs):
+        clean_memo._memo.put(
+            key, {"cleaned_dataset_id": output, "summary": _summary(output), "last_used": time.time() - age}
+        )
+
+    assert clean_memo.evict() == 1
+    assert set(clean_memo._memo.items()) == {"key-1", "key-2"}
+    assert clean_memo.memoized_outputs() == set(outputs[1:])
+
+
+def test_evict_keeps_outputs_still_referenced(monkeypatch):
+    monkeypatch.setattr(clean_memo, "CLEAN_MEMO_TTL_S", 3600)
+    shared, adopted = _dataset(), _dataset(offset=1)
+    clean_memo.store("old", _summary(shared))
+    clean_memo.store("new", _summary(shared))
+    clean_memo.store("appended", _summary(adopted))
+    # incremental appends adopt a memoized output as a dataset's cleaned output
+    source = _dataset(offset=2)
+    catalog.update_entry(source, lambda e: {**e, "cleaned_dataset_id": adopted})
+    _age("old", 7200)
+    _age("appended", 7200)
+
+    assert clean_memo.evict() == 2
+    assert set(clean_memo._memo.items()) == {"new"}
+    assert ingestion.dataset_partitions(shared)
+    assert ingestion.dataset_partitions(adopted)
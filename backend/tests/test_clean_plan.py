@@ -0,0 +1,83 @@
+# tests/test_clean_plan.py
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+from app.config import BASE_UPLOAD_DIR
+from app.schemas.datasets import CleaningOptions
+from app.services import clean_plan, ingestion
+
+pytest.importorskip("polars")
+
+STRATEGIES = ["mean", "median", "mode", "zero"]
+
+
+@pytest.fixture
+def dataset():
+    """
+    Arrow partitions with a complete int column, an int column with nulls,
+    float64 / float32 columns with missing values, text, an outlier and
+    duplicate rows. Written with pyarrow directly, as appends and other
+    writers store them (no pandas metadata).
+    """
+    table = pa.table({
+        "id": pa.array([1, 2, 3, 4, 5, 5, 100, 2] * 10, pa.int64()),
+        "count": pa.array([1, None, 3, 4, 5, None, 7, 3] * 10, pa.int64()),
+        "price": pa.array([1.5, None, 2.0, 3.0, float("nan"), 1.0, 2.0, 2.5] * 10),
+        "ratio": pa.array([1.5, None, 2.0, 3.0, 4.0, 1.0, 2.0, 2.5] * 10, pa.float32()),
+        "name": pa.array(["a", None, "b", "a", "c", "a", "b", None] * 10),
+    })
+    dataset_id = "clean-plan-parity"
+    os.makedirs(ingestion.dataset_dir(dataset_id), exist_ok=True)
+    rel_paths = []
+    for i, start in enumerate((0, 40)):
+        rel_path = ingestion.partition_relpath(dataset_id, i)
+        feather.write_feather(table.slice(start, 40), os.path.join(BASE_UPLOAD_DIR, rel_path))
+        rel_paths.append(rel_path)
+    ingestion.set_partitions(dataset_id, rel_paths)
+    yield ingestion.dataset_partitions(dataset_id)
+    ingestion.delete_dataset(dataset_id)
+
+
+def _both(options, source):
+    return [clean_plan.run_plan(options, source, engine)["frame"] for engine in ("pandas", "polars")]
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_engines_agree_on_partitions(dataset, strategy):
+    pandas_frame, polars_frame = _both(CleaningOptions(impute_strategy=strategy), dataset)
+    if strategy == "zero":
+        # pandas puts an int 0 into text columns, Polars "0": both are stored as "0"
+        assert pandas_frame["name"].astype(str).tolist() == polars_frame["name"].tolist()
+        pandas_frame, polars_frame = pandas_frame.drop(columns="name"), polars_frame.drop(columns="name")
+    pd.testing.assert_frame_equal(pandas_frame, polars_frame)
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_engines_agree_on_a_loaded_frame(dataset, strategy):
+    options = CleaningOptions(impute_strategy=strategy, drop_duplicates=False)
+    pandas_frame, polars_frame = _both(options, ingestion.load_dataset("clean-plan-parity"))
+    assert pandas_frame.dtypes.drop("name").equals(polars_frame.dtypes.drop("name"))
+    pd.testing.assert_frame_equal(pandas_frame.drop(columns="name"), polars_frame.drop(columns="name"))
+
+
+def test_imputing_keeps_the_dtypes_of_complete_columns(dataset):
+    frame = _both(CleaningOptions(impute_strategy="mean"), dataset)[1]
+    assert frame["id"].dtype == "int64"
+    assert frame["ratio"].dtype == "float32"
+    # an int column with missing values is float64 in pandas too
+    assert frame["count"].dtype == "float64"
+    assert not frame.isna().any().any()
+
+
+def test_step_reports_agree(dataset):
+    options = CleaningOptions(remove_outliers=True, outlier_zscore_threshold=2.0)
+    reports = [
+        clean_plan.run_plan(options, dataset, engine)["steps"] for engine in ("pandas", "polars")
+    ]
+    rows = [[(r["step"], r["rows_in"], r["rows_out"]) for r in steps] for steps in reports]
+    assert rows[0] == rows[1][:-1]  # polars adds its "execute" report
+    assert rows[0][-1][2] < rows[0][-1][1]  # the outlier row is gone
@@ -0,0 +1,156 @@
+# tests/test_compressed.py
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import archive_readers, compressed, ingestion
+
+CSV = b"a,b\n1,x\n2,y\n3,z\n"
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def _upload(client, name, content, **params):
+    return client.post("/datasets/upload", params=params, files={"file": (name, content)})
+
+
+def _zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    return buf.getvalue()
+
+
+def _zstd(data):
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("x.csv", "csv"),
+        ("x.csv.gz", "csv"),
+        ("Export.CSV.GZ", "csv"),
+        ("x.jsonl.zst", "jsonl"),
+        ("archive.tar.bz2.xz", "tar"),
+        ("x.gz", "gz"),  # nothing left but the compression
+        ("noext", ""),
+    ],
+)
+def test_data_extension(name, expected):
+    assert compressed.data_extension(name) == expected
+
+
+@pytest.mark.parametrize(
+    "data, codec",
+    [
+        (gzip.compress(CSV), "gzip"),
+        (bz2.compress(CSV), "bz2"),
+        (lzma.compress(CSV), "xz"),
+        (b"\x28\xb5\x2f\xfd" + b"\x00" * 4, "zstd"),
+        (_zip({"a.csv": CSV}), "zip"),
+        (CSV, None),
+    ],
+)
+def test_sniff_bytes(data, codec):
+    assert compressed.sniff_bytes(data[:8]) == codec
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress, _zstd])
+def test_compressed_csv_is_read_as_csv(tmp_path, compress):
+    path = tmp_path / "data.csv"
+    path.write_bytes(compress(CSV))
+    with compressed.open_source(str(path), "csv") as source:
+        # a streaming reader gets a decompressing opener, not a spooled copy
+        assert callable(source)
+        with source() as f:
+            assert f.read() == CSV
+
+
+def test_uncompressed_files_are_read_in_place(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(CSV)
+    with compressed.open_source(str(path), "csv") as source:
+        assert source == str(path)
+
+
+def test_random_access_formats_get_a_decompressed_copy(tmp_path):
+    pytest.importorskip("pyarrow.parquet")
+    buf = io.BytesIO()
+    pd.DataFrame({"a": [1, 2]}).to_parquet(buf)
+    path = tmp_path / "data.parquet"
+    path.write_bytes(gzip.compress(buf.getvalue()))
+    with compressed.open_source(str(path), "parquet") as source:
+        assert source != str(path) and source.endswith(".parquet")
+        assert pd.read_parquet(source)["a"].tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("name", ["data.csv.gz", "data.csv"])
+def test_upload_of_gzipped_csv(client, name):
+    # detected from the content, whatever the name says
+    response = _upload(client, name, gzip.compress(CSV))
+    assert response.status_code == 200
+    df = ingestion.load_dataset(response.json()["dataset_id"])
+    assert df["b"].tolist() == ["x", "y", "z"]
+
+
+def test_upload_of_corrupt_compressed_file(client):
+    response = _upload(client, "data.csv.gz", gzip.compress(CSV)[:-12] + b"\x00" * 12)
+    assert response.status_code == 400
+
+
+def test_zip_members_are_keys(tmp_path):
+    content = _zip(
+        {
+            "a.csv": CSV,
+            "sub/b.csv.gz": gzip.compress(b"c\n5\n"),
+            "notes.txt.exe": b"",
+            "__MACOSX/._a.csv": b"",
+            "sub/": b"",
+            "inner.zip": _zip({"c.csv": CSV}),
+        }
+    )
+    path = tmp_path / "tables.zip"
+    path.write_bytes(content)
+    assert archive_readers.list_members(str(path)) == ["a.csv", "sub/b.csv.gz"]
+
+
+def test_upload_zip_member_by_key(client):
+    content = _zip({"a.csv": CSV, "sub/b.csv.gz": gzip.compress(b"c\n5\n6\n")})
+
+    first = _upload(client, "tables.zip", content).json()
+    assert first["key"] == "a.csv"
+    assert first["available_keys"] == ["a.csv", "sub/b.csv.gz"]
+
+    picked = _upload(client, "tables.zip", content, key="sub/b.csv.gz").json()
+    assert picked["key"] == "sub/b.csv.gz"
+    assert ingestion.load_dataset(picked["dataset_id"])["c"].tolist() == [5, 6]
+
+    assert _upload(client, "tables.zip", content, key="missing.csv").status_code == 400
+
+
+def test_upload_zip_all_keys(client):
+    content = _zip({"a.csv": CSV, "b.jsonl": b'{"n": 1}\n{"n": 2}\n'})
+    body = _upload(client, "tables.zip", content, all_keys="true").json()
+
+    assert [d["key"] for d in body["datasets"]] == ["a.csv", "b.jsonl"]
+    a, b = (ingestion.load_dataset(d["dataset_id"]) for d in body["datasets"])
+    assert len(a) == 3
+    assert b["n"].tolist() == [1, 2]
+
+
+def test_upload_zip_without_readable_members(client):
+    response = _upload(client, "tables.zip", _zip({"readme.exe": b"MZ"}))
+    assert response.status_code == 400
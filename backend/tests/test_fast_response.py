@@ -0,0 +1,142 @@
+# tests/test_fast_response.py
+import json
+import math
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import ingestion
+from app.utils import fast_response
+from app.utils.fast_response import ARROW_STREAM
+
+ARROW = {"Accept": ARROW_STREAM}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def dumps(request, monkeypatch):
+    """dumps() with orjson and with the stdlib fallback."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(fast_response, "orjson", None)
+    return fast_response.dumps
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def dataset():
+    df = pd.DataFrame({"x": [1.5, None, 3.0], "y": ["a", "b", "b"], "n": [1, 2, 3]})
+    return ingestion.save_dataset(df)
+
+
+def _read_arrow(response):
+    """The table in an Arrow response (a route's Response, or a TestClient's)."""
+    assert response.headers["content-type"] == ARROW_STREAM
+    body = response.body if hasattr(response, "body") else response.content
+    return pa.ipc.open_stream(body).read_all()
+
+
+def test_non_finite_floats_become_null(dumps):
+    payload = {"a": [1.0, math.nan, math.inf], "b": {"c": -math.inf}}
+    assert json.loads(dumps(payload)) == {"a": [1.0, None, None], "b": {"c": None}}
+
+
+def test_numpy_and_pandas_values(dumps):
+    payload = {
+        "int": np.int64(3),
+        "float": np.float32(0.5),
+        "when": pd.Timestamp("2024-01-02 03:04:05"),
+        "price": Decimal("1.25"),
+    }
+    decoded = json.loads(dumps(payload))
+    assert decoded["int"] == 3 and decoded["float"] == 0.5
+    assert decoded["when"].startswith("2024-01-02T03:04:05")
+    assert decoded["price"] in ("1.25", 1.25)
+
+
+def test_fast_json_response_renders_with_dumps():
+    response = fast_response.FastJSONResponse({"a": [1, math.nan]})
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"a": [1, None]}
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, False),
+        ("", False),
+        ("application/json", False),
+        (ARROW_STREAM, True),
+        (f"application/json;q=0.5, {ARROW_STREAM}", True),
+    ],
+)
+def test_wants_arrow(accept, expected):
+    assert fast_response.wants_arrow(accept) is expected
+
+
+def test_arrow_response_carries_metadata_as_json():
+    table = pa.table({"a": [1, 2]})
+    response = fast_response.arrow_response(table, {"dataset_id": "d", "n_rows": np.int64(2)})
+    read = _read_arrow(response)
+    assert read.column("a").to_pylist() == [1, 2]
+    assert {k.decode(): json.loads(v) for k, v in read.schema.metadata.items()} == {
+        "dataset_id": "d",
+        "n_rows": 2,
+    }
+    assert _read_arrow(fast_response.arrow_response(table)).schema.metadata is None
+
+
+def test_profile_layouts_agree_with_the_default(client, dataset):
+    url = f"/datasets/{dataset}/profile"
+    default = client.get(url).json()
+    rows = client.get(url, params={"layout": "rows"}).json()
+    columnar = client.get(url, params={"layout": "columnar"}).json()
+
+    assert rows["n_rows"] == columnar["n_rows"] == default["n_rows"] == 3
+    assert rows["n_cols"] == 3
+    assert columnar["columns"]["name"] == list(rows["columns"]) == ["x", "y", "n"]
+    for name, profile in default["columns"].items():
+        assert rows["columns"][name] == {**rows["columns"][name], **profile}
+    i = columnar["columns"]["name"].index("x")
+    assert columnar["columns"]["n_missing"][i] == rows["columns"]["x"]["n_missing"] == 1
+
+    assert client.get(url, params={"layout": "wide"}).status_code == 422
+
+
+def test_profile_as_arrow(client, dataset):
+    table = _read_arrow(client.get(f"/datasets/{dataset}/profile", headers=ARROW))
+    assert table.column("name").to_pylist() == ["x", "y", "n"]
+    metadata = {k.decode(): json.loads(v) for k, v in table.schema.metadata.items()}
+    assert metadata == {"dataset_id": dataset, "n_rows": 3}
+
+
+def test_preview_layouts(client, dataset):
+    url = f"/datasets/{dataset}/preview"
+    params = {"rows": 2}
+    # default: values as strings
+    assert client.get(url, params=params).json()[1]["n"] == "2"
+
+    rows = client.get(url, params={**params, "layout": "rows"}).json()
+    assert rows == [{"x": 1.5, "y": "a", "n": 1}, {"x": None, "y": "b", "n": 2}]
+
+    columnar = client.get(url, params={**params, "layout": "columnar"}).json()
+    assert columnar == {"columns": ["x", "y", "n"], "data": {"x": [1.5, None], "y": ["a", "b"], "n": [1, 2]}}
+
+    table = _read_arrow(client.get(url, params=params, headers=ARROW))
+    assert table.to_pylist() == rows
+
+
+def test_quality_score_as_arrow(client, dataset):
+    expected = client.get(f"/datasets/{dataset}/quality_score").json()
+    (row,) = _read_arrow(client.get(f"/datasets/{dataset}/quality_score", headers=ARROW)).to_pylist()
+    assert row["dataset_id"] == dataset
+    assert row["quality_score"] == pytest.approx(expected["quality_score"])
@@ -0,0 +1,122 @@
+# tests/test_incremental.py
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import catalog, incremental, ingestion
+from app.services.dataset_stats import SKETCH_SIZE
+
+
+def _rows(start, n, value=10.0):
+    return pd.DataFrame(
+        {
+            "id": [f"row-{i}" for i in range(start, start + n)],
+            "value": [value + (i % 5) for i in range(n)],
+            "flag": ["a"] * n,  # constant in the history
+        }
+    )
+
+
+@pytest.fixture
+def dataset():
+    """A dataset whose first append already fitted the cleaning baseline."""
+    dataset_id = ingestion.save_dataset(_rows(0, 100))
+    first = incremental.append_rows(dataset_id, _rows(100, 10))
+    assert first["full_recompute"]  # nothing fitted yet
+    return dataset_id
+
+
+def _order(ids):
+    return ids.str.slice(4).astype(int)
+
+
+def _cleaned(dataset_id):
+    return ingestion.load_dataset(catalog.get_entry(dataset_id)["cleaned_dataset_id"])
+
+
+def test_similar_rows_are_cleaned_incrementally(dataset):
+    before = len(_cleaned(dataset))
+    summary = incremental.append_rows(dataset, _rows(110, 10))
+
+    assert not summary["full_recompute"]
+    assert summary["drift"] < 0.5
+    assert summary["n_rows_total"] == 120
+    assert summary["cleaned_rows_written"] == 10
+    assert len(_cleaned(dataset)) == before + 10
+
+
+def test_incremental_result_matches_a_full_reclean(dataset):
+    incremental.append_rows(dataset, _rows(110, 10))
+    incremental_rows = _cleaned(dataset).sort_values("id", key=_order).reset_index(drop=True)
+
+    entry = catalog.get_entry(dataset)
+    full = incremental._full_reclean(dataset, entry, incremental.CleaningOptions())
+    assert full["cleaned_rows_written"] == len(incremental_rows)
+    pd.testing.assert_frame_equal(
+        _cleaned(dataset).sort_values("id", key=_order).reset_index(drop=True), incremental_rows
+    )
+
+
+def test_drift_past_the_threshold_recleans_everything(dataset):
+    params = catalog.get_entry(dataset)["clean_params"]
+    summary = incremental.append_rows(dataset, _rows(110, 10, value=14.0))
+
+    assert summary["full_recompute"]
+    assert summary["drift"] > 0.5
+    # refitted and cleaned from all 120 rows
+    removed = summary["duplicate_rows_removed"] + summary["outlier_rows_removed"]
+    assert summary["cleaned_rows_written"] + removed == 120
+    assert len(_cleaned(dataset)) == summary["cleaned_rows_written"]
+    assert catalog.get_entry(dataset)["clean_params"] != params
+
+
+def test_drift_threshold_can_be_raised_per_append(dataset):
+    summary = incremental.append_rows(dataset, _rows(110, 10, value=20.0), drift_threshold=100)
+    assert not summary["full_recompute"]
+    # judged against the old baseline instead, where they are all outliers
+    assert summary["outlier_rows_removed"] == 10
+
+
+def test_rows_already_in_the_dataset_are_dropped_as_duplicates(dataset):
+    repeated = pd.concat([_rows(0, 5), _rows(110, 3), _rows(110, 1)], ignore_index=True)
+    summary = incremental.append_rows(dataset, repeated)
+
+    assert not summary["full_recompute"]
+    assert summary["duplicate_rows_removed"] == 6  # 5 seen before, 1 repeated within
+    assert summary["cleaned_rows_written"] == 3
+    # the raw dataset keeps every appended row
+    assert summary["n_rows_total"] == 119
+
+
+def test_new_value_in_a_constant_column_is_not_an_outlier():
+    level = _rows(110, 5).assign(level=7.0)
+    level.loc[0, "level"] = 8.0
+    dataset_id = ingestion.save_dataset(_rows(0, 100).assign(level=7.0))
+    incremental.append_rows(dataset_id, _rows(100, 10).assign(level=7.0))
+
+    summary = incremental.append_rows(dataset_id, level)
+    assert not summary["full_recompute"]  # a constant column cannot drift
+    assert summary["outlier_rows_removed"] == 0
+    assert "row-110" in _cleaned(dataset_id)["id"].tolist()
+
+
+def test_unknown_columns_are_refused(dataset):
+    with pytest.raises(ValueError):
+        incremental.append_rows(dataset, _rows(110, 1).assign(extra=1))
+
+
+def test_profile_after_append_marks_estimated_unique_counts():
+    client = TestClient(app)
+    n = SKETCH_SIZE + 500
+    dataset_id = ingestion.save_dataset(_rows(0, n))
+    fresh = client.get(f"/datasets/{dataset_id}/profile").json()["columns"]
+    assert fresh["id"] == {**fresh["id"], "n_unique": n, "n_unique_approx": False}
+
+    incremental.append_rows(dataset_id, _rows(n, 10))
+    columns = client.get(f"/datasets/{dataset_id}/profile").json()["columns"]
+    # past the sketch size the count is a KMV estimate, and says so
+    assert columns["id"]["n_unique_approx"]
+    assert abs(columns["id"]["n_unique"] - (n + 10)) < 0.05 * n
+    # below it the sketch still holds every value: exact
+    assert columns["value"] == {**columns["value"], "n_unique": 5, "n_unique_approx": False}
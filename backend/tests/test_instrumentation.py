@@ -0,0 +1,148 @@
+# tests/test_instrumentation.py
+import time
+import tracemalloc
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import ingestion, instrumentation
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Fresh metric tables for one test."""
+    monkeypatch.setattr(instrumentation, "METRICS_ENABLED", True)
+    for name in ("_request_hist", "_stage_hist", "_stage_rss_delta", "_stage_peak_bytes"):
+        monkeypatch.setattr(instrumentation, name, {})
+    return instrumentation
+
+
+@pytest.fixture
+def dataset():
+    return ingestion.save_dataset(pd.DataFrame({"x": [1, 2, None], "y": ["a", "b", "b"]}))
+
+
+def _sample(text, prefix):
+    """The value of the one sample line starting with prefix."""
+    (line,) = [l for l in text.splitlines() if l.startswith(prefix)]
+    return float(line.rsplit(" ", 1)[1])
+
+
+def test_span_records_its_wall_time(metrics):
+    with metrics.span("work"):
+        time.sleep(0.03)
+    hist = metrics._stage_hist["work"]
+    assert hist.count == 1 and hist.sum >= 0.03
+
+
+def test_histogram_buckets_are_cumulative(metrics):
+    for seconds in (0.03, 0.03, 400.0):
+        metrics.record_stage("work", seconds)
+    text = metrics.render_metrics()
+
+    def bucket(le):
+        return _sample(text, f'cleanmind_stage_duration_seconds_bucket{{stage="work",le="{le}"}}')
+
+    assert [bucket("0.025"), bucket("0.05"), bucket("300.0"), bucket("+Inf")] == [0, 2, 2, 3]
+    assert _sample(text, 'cleanmind_stage_duration_seconds_count{stage="work"}') == 3
+    assert _sample(text, 'cleanmind_stage_duration_seconds_sum{stage="work"}') == pytest.approx(400.06)
+
+
+def test_timed_records_every_call_and_keeps_the_function(metrics):
+    @metrics.timed("double")
+    def double(x):
+        """Twice x."""
+        return 2 * x
+
+    assert [double(1), double(2)] == [2, 4]
+    assert double.__doc__ == "Twice x."
+    assert metrics._stage_hist["double"].count == 2
+
+
+def test_span_records_when_the_stage_fails(metrics):
+    with pytest.raises(RuntimeError):
+        with metrics.span("fails"):
+            raise RuntimeError
+    assert metrics._stage_hist["fails"].count == 1
+
+
+def test_timed_iter_leaves_out_the_consumers_time(metrics):
+    def produce():
+        for i in range(3):
+            time.sleep(0.01)
+            yield i
+
+    for _ in metrics.timed_iter("produce", produce()):
+        time.sleep(0.1)
+    hist = metrics._stage_hist["produce"]
+    assert hist.count == 1  # one span for the whole iteration
+    assert 0.03 <= hist.sum < 0.2  # the consumer slept 0.3 s
+
+
+def test_nothing_is_recorded_when_disabled(metrics, monkeypatch):
+    monkeypatch.setattr(instrumentation, "METRICS_ENABLED", False)
+
+    def f():
+        return 1
+
+    assert metrics.span("off") is metrics._NO_SPAN
+    assert metrics.timed("off")(f) is f
+    with metrics.span("off"):
+        pass
+    assert list(metrics.timed_iter("off", [1, 2])) == [1, 2]
+    assert metrics._stage_hist == {}
+
+
+def test_traced_peaks_reach_enclosing_spans(metrics, monkeypatch):
+    monkeypatch.setattr(instrumentation, "TRACE_MEMORY", True)
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        with metrics.span("outer"):
+            with metrics.span("inner"):
+                block = bytearray(8 << 20)
+                del block
+    finally:
+        if started:
+            tracemalloc.stop()
+    inner, outer = metrics._stage_peak_bytes["inner"], metrics._stage_peak_bytes["outer"]
+    assert inner >= 8 << 20
+    assert outer >= inner
+    assert "cleanmind_stage_peak_traced_bytes" in metrics.render_metrics()
+
+
+def test_label_values_are_escaped(metrics):
+    metrics.record_stage('read "a\\b"\n', 0.1)
+    assert 'stage="read \\"a\\\\b\\"\\n"' in metrics.render_metrics()
+
+
+def test_metrics_endpoint_labels_routes_by_template(metrics, dataset):
+    client = TestClient(app)
+    client.get(f"/datasets/{dataset}/profile")
+    client.get("/no/such/route")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert dataset not in text  # ids would explode the label set
+    labels = 'method="GET",route="/datasets/{dataset_id}/profile",status="200"'
+    assert _sample(text, f"cleanmind_request_duration_seconds_count{{{labels}}}") == 1
+    assert 'route="unmatched",status="404"' in text
+    assert _sample(text, 'cleanmind_stage_duration_seconds_count{stage="profile"}') == 1
+    assert _sample(text, "cleanmind_process_resident_memory_bytes") > 0
+
+
+def test_x_timing_header_breaks_down_the_request(metrics, dataset):
+    client = TestClient(app)
+    assert "x-timing" not in client.get(f"/datasets/{dataset}/profile").headers
+
+    header = client.get(f"/datasets/{dataset}/profile", headers={"X-Timing": "1"}).headers["x-timing"]
+    stages = dict(part.split(";", 1) for part in header.split(", "))
+    assert "profile" in stages
+    dur, n, rss = stages["profile"].split(";")
+    assert dur.startswith("dur=") and float(dur[4:]) >= 0
+    assert n == "n=1" and rss.startswith("rss=")
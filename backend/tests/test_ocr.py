@@ -0,0 +1,95 @@
+# tests/test_ocr.py
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+from fastapi.testclient import TestClient  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services import ingestion, ocr  # noqa: E402
+from app.services.ingestion_base import get_batch_reader  # noqa: E402
+
+# images this small are recognised in-process, so calls can be counted here
+CALLS = []
+
+
+def stub_engine(img):
+    CALLS.append(img.size)
+    return f"  text of a {img.size[0]}x{img.size[1]} image \n"
+
+
+def failing_engine(img):
+    raise RuntimeError("engine unavailable")
+
+
+@pytest.fixture(autouse=True)
+def stub_ocr(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_ENGINE", f"{__name__}:stub_engine")
+    monkeypatch.setattr(ocr, "CACHE_DIR", str(tmp_path / "cache"))
+    CALLS.clear()
+
+
+def _image(tmp_path, name="scan.png", size=(120, 40), color=200):
+    path = str(tmp_path / name)
+    Image.new("L", size, color=color).save(path)
+    return path
+
+
+def _ingest(path):
+    ext = os.path.splitext(path)[1].lstrip(".")
+    dataset_id = ingestion.save_batches(get_batch_reader(ext)(path))
+    return ingestion.load_dataset(dataset_id)
+
+
+def test_image_ingest_uses_the_configured_engine(tmp_path):
+    df = _ingest(_image(tmp_path))
+    assert list(df.columns) == ["text"]
+    assert df["text"].tolist() == ["text of a 120x40 image"]
+    assert CALLS == [(120, 40)]
+
+
+def test_same_image_is_served_from_the_cache(tmp_path):
+    _ingest(_image(tmp_path, "first.png"))
+    # same content under another name: keyed by content hash
+    df = _ingest(_image(tmp_path, "second.png"))
+    assert df["text"].tolist() == ["text of a 120x40 image"]
+    assert len(CALLS) == 1
+    assert len(os.listdir(os.path.join(ocr.CACHE_DIR, "ocr"))) == 1
+
+    _ingest(_image(tmp_path, "other.png", color=50))
+    assert len(CALLS) == 2
+
+
+def test_cache_is_keyed_by_engine(tmp_path, monkeypatch):
+    path = _image(tmp_path)
+    ocr.ocr_images([path])
+    monkeypatch.setattr(ocr, "OCR_ENGINE", f"{__name__}:failing_engine")
+    with pytest.raises(RuntimeError):
+        ocr.ocr_images([path])
+
+
+def test_engine_failure_is_not_cached(tmp_path, monkeypatch):
+    path = _image(tmp_path)
+    monkeypatch.setattr(ocr, "OCR_ENGINE", f"{__name__}:failing_engine")
+    with pytest.raises(RuntimeError, match="engine unavailable"):
+        ocr.ocr_images([path])
+    assert not os.path.exists(os.path.join(ocr.CACHE_DIR, "ocr"))
+
+    monkeypatch.setattr(ocr, "OCR_ENGINE", f"{__name__}:stub_engine")
+    assert ocr.ocr_images([path]) == ["text of a 120x40 image"]
+
+
+def test_upload_reports_engine_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_ENGINE", f"{__name__}:failing_engine")
+    with open(_image(tmp_path), "rb") as f:
+        response = TestClient(app).post("/datasets/upload", files={"file": ("scan.png", f.read())})
+    assert response.status_code == 400
+    assert "engine unavailable" in response.json()["detail"]
+
+
+def test_invalid_engine_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_ENGINE", "not-a-path")
+    with pytest.raises(ValueError, match="module:function"):
+        ocr.ocr_images([_image(tmp_path)])
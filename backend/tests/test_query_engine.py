@@ -0,0 +1,111 @@
+# tests/test_query_engine.py
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services import catalog, ingestion, query_engine  # noqa: E402
+
+
+@pytest.fixture
+def orders():
+    df = pd.DataFrame({"customer": ["a", "b", "a", "c"], "amount": [10, 20, 30, 40]})
+    return ingestion.save_dataset(df)
+
+
+@pytest.fixture
+def customers():
+    return ingestion.save_dataset(pd.DataFrame({"customer": ["a", "b"], "name": ["Ann", "Bob"]}))
+
+
+def _run(sql, tables=None, **kwargs):
+    frames = list(query_engine.iter_query(sql, tables, **kwargs))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_datasets_are_tables_named_by_id(orders):
+    df = _run(f'SELECT sum(amount) AS total FROM "{orders}" WHERE customer = \'a\'')
+    assert df["total"].tolist() == [40]
+
+
+def test_aliases_and_joins(orders, customers):
+    df = _run(
+        "SELECT name, sum(amount) AS total FROM o JOIN c USING (customer) "
+        "GROUP BY name ORDER BY name",
+        {"o": orders, "c": customers},
+    )
+    assert df.to_dict(orient="list") == {"name": ["Ann", "Bob"], "total": [40, 20]}
+
+
+def test_results_come_in_batches(orders):
+    frames = list(query_engine.iter_query(f'SELECT * FROM "{orders}"', batch_rows=1))
+    assert sum(len(f) for f in frames) == 4
+    assert len(frames) > 1
+
+
+def test_empty_result_keeps_the_columns(orders):
+    (df,) = query_engine.iter_query(f'SELECT customer FROM "{orders}" WHERE amount > 100')
+    assert list(df.columns) == ["customer"] and df.empty
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM t",
+        "CREATE TABLE t AS SELECT 1",
+        "SELECT 1; SELECT 2",
+        "COPY (SELECT 1) TO 'out.csv'",
+        "INSTALL httpfs",
+        "SELEC 1",
+    ],
+)
+def test_only_a_single_select_is_accepted(sql):
+    with pytest.raises(ValueError):
+        _run(sql)
+
+
+def test_files_cannot_be_read(tmp_path, orders):
+    path = tmp_path / "secret.csv"
+    path.write_text("x\n1\n")
+    with pytest.raises(ValueError, match="disabled by configuration"):
+        _run(f"SELECT * FROM read_csv_auto('{path}')")
+    # not even next to a registered dataset
+    with pytest.raises(ValueError):
+        _run(f"SELECT * FROM o, read_csv_auto('{path}')", {"o": orders})
+
+
+def test_queries_run_with_external_access_disabled(orders):
+    sql = "SELECT current_setting('enable_external_access') AS external, count(*) AS n FROM o"
+    df = _run(sql, {"o": orders})
+    assert df.to_dict(orient="list") == {"external": [False], "n": [4]}
+
+
+def test_unknown_alias_target():
+    with pytest.raises(FileNotFoundError):
+        _run("SELECT * FROM t", {"t": "no-such-dataset"})
+
+
+def test_save_query_records_its_sql(orders):
+    sql = f'SELECT customer, amount * 2 AS doubled FROM "{orders}" ORDER BY amount'
+    dataset_id = query_engine.save_query(sql)
+    assert ingestion.load_dataset(dataset_id)["doubled"].tolist() == [20, 40, 60, 80]
+    assert catalog.get_entry(dataset_id)["query"] == {"sql": sql, "tables": {}}
+
+
+def test_query_endpoint(orders):
+    client = TestClient(app)
+    response = client.post(
+        f"/datasets/{orders}/query",
+        json={
+            "sql": "SELECT customer, amount FROM data ORDER BY amount DESC LIMIT 2",
+            "format": "csv",
+        },
+    )
+    assert response.status_code == 200
+    assert response.text.splitlines() == ["customer,amount", "c,40", "a,30"]
+
+    assert client.post("/datasets/query", json={"sql": "DROP TABLE x"}).status_code == 400
+    missing = client.post("/datasets/query", json={"sql": "SELECT 1", "tables": {"t": "nope"}})
+    assert missing.status_code == 404
@@ -0,0 +1,55 @@
+# tests/test_row_batches.py
+import pandas as pd
+
+from app.services.ingestion_base import iter_row_batches
+
+
+def _batches(rows, batch_rows=2, **kwargs):
+    return list(iter_row_batches(rows, batch_rows=batch_rows, **kwargs))
+
+
+def test_numeric_text_becomes_numbers_and_empty_cells_missing():
+    (df,) = _batches([{"n": "1", "x": "a"}, {"n": "", "x": ""}])
+    assert df["n"].dtype == "float64"
+    assert df["n"].isna().tolist() == [False, True]
+    assert df["x"].isna().tolist() == [False, True]
+
+
+def test_every_batch_gets_the_type_of_the_first():
+    rows = [
+        {"id": "1", "code": "A1"},
+        {"id": "2", "code": "A2"},
+        # would be numeric on their own
+        {"id": "3", "code": "7"},
+        {"id": "4", "code": "8"},
+    ]
+    first, second = _batches(rows)
+    assert first["id"].dtype == second["id"].dtype == "int64"
+    assert not pd.api.types.is_numeric_dtype(second["code"])
+    assert second["code"].tolist() == ["7", "8"]
+
+
+def test_later_values_that_are_not_numbers_become_missing():
+    rows = [{"v": "1.5"}, {"v": "2"}, {"v": "n/a"}, {"v": "3"}]
+    first, second = _batches(rows)
+    assert first["v"].dtype == second["v"].dtype == "float64"
+    assert second["v"].isna().tolist() == [True, False]
+
+
+def test_ints_widen_to_float_where_a_batch_has_missing_values():
+    first, second = _batches([{"v": "1"}, {"v": "2"}, {"v": ""}, {"v": "3"}])
+    assert first["v"].dtype == "int64"
+    assert second["v"].dtype == "float64"
+    assert pd.concat([first, second])["v"].tolist()[:2] == [1, 2]
+
+
+def test_a_column_without_values_is_typed_by_the_first_batch_that_has_some():
+    rows = [{"a": "1", "b": ""}, {"a": "2", "b": ""}, {"a": "3", "b": "x"}, {"a": "4", "b": "5"}]
+    first, second = _batches(rows)
+    assert first["b"].isna().all()
+    assert second["b"].tolist() == ["x", "5"]
+
+
+def test_without_inference_values_stay_as_parsed():
+    (df,) = _batches([{"page": 1, "text": "12"}], infer_types=False, columns=["page", "text"])
+    assert df["text"].tolist() == ["12"]
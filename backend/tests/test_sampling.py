@@ -0,0 +1,177 @@
+# tests/test_sampling.py
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import ingestion, sampling
+from app.services.sampling import SAMPLE_BLOCK_ROWS
+
+N_ROWS = 100_000
+
+
+def _frame(n=N_ROWS):
+    rng = np.random.default_rng(0)
+    value = rng.normal(size=n)
+    value[rng.random(n) < 0.2] = np.nan  # 20% missing
+    return pd.DataFrame({"id": np.arange(n), "value": value, "const": "x"})
+
+
+@pytest.fixture(scope="module")
+def arrow_paths():
+    # two partitions, so blocks are drawn from both
+    dataset_id = ingestion.save_dataset(_frame())
+    ingestion.replace_partitions(dataset_id, [_frame().iloc[:60_000], _frame().iloc[60_000:]])
+    return [str(p) for p in ingestion.dataset_partitions(dataset_id)]
+
+
+@pytest.fixture
+def exact_dir(tmp_path, monkeypatch):
+    path = tmp_path / "exact"
+    path.mkdir()
+    monkeypatch.setattr(sampling, "_EXACT_DIR", str(path))
+    return path
+
+
+def _files(tmp_path, ext, write):
+    path = str(tmp_path / f"data.{ext}")
+    write(_frame(), path)
+    return [path]
+
+
+def test_arrow_sample_size_and_strata(arrow_paths):
+    sample, info = sampling.sample_dataset(arrow_paths, 10_000, seed=1)
+    n_blocks = -(-10_000 // SAMPLE_BLOCK_ROWS)
+    assert info["method"] == "arrow"
+    assert info["n_rows"] == N_ROWS and info["n_rows_exact"]
+    assert info["n_sampled"] == len(sample) == n_blocks * SAMPLE_BLOCK_ROWS
+    assert info["fraction"] == pytest.approx(len(sample) / N_ROWS)
+    # one block of contiguous rows per stratum, in order
+    starts = sample["id"].to_numpy()[:: SAMPLE_BLOCK_ROWS]
+    width = N_ROWS / n_blocks
+    assert [int(s // width) for s in starts] == list(range(n_blocks))
+    assert np.array_equal(np.bincount(info["block_ids"]), [SAMPLE_BLOCK_ROWS] * n_blocks)
+
+
+def test_same_seed_same_sample(arrow_paths):
+    a, _ = sampling.sample_dataset(arrow_paths, 5_000, seed=7)
+    b, _ = sampling.sample_dataset(arrow_paths, 5_000, seed=7)
+    c, _ = sampling.sample_dataset(arrow_paths, 5_000, seed=8)
+    pd.testing.assert_frame_equal(a, b)
+    assert not a["id"].equals(c["id"])
+
+
+def test_small_datasets_are_sampled_whole():
+    dataset_id = ingestion.save_dataset(_frame(100))
+    paths = [str(p) for p in ingestion.dataset_partitions(dataset_id)]
+    sample, info = sampling.sample_dataset(paths, 1_000, seed=1)
+    assert len(sample) == 100 and info["fraction"] == 1.0
+
+
+def test_csv_blocks_and_estimated_row_count(tmp_path):
+    paths = _files(tmp_path, "csv", lambda df, p: df.to_csv(p, index=False))
+    sample, info = sampling.sample_dataset(paths, 6_000, seed=1)
+    assert info["method"] == "csv" and not info["n_rows_exact"]
+    assert abs(info["n_rows"] - N_ROWS) < 0.1 * N_ROWS  # estimated from the sampled bytes per row
+    assert 0 < len(sample) <= 3 * SAMPLE_BLOCK_ROWS
+    assert list(sample.columns) == ["id", "value", "const"]
+    assert sampling.sample_dataset(paths, 6_000, seed=1)[0].equals(sample)
+
+
+def test_parquet_row_groups(tmp_path):
+    pytest.importorskip("pyarrow.parquet")
+    paths = _files(tmp_path, "parquet", lambda df, p: df.to_parquet(p, row_group_size=10_000))
+    sample, info = sampling.sample_dataset(paths, 15_000, seed=1)
+    assert info["method"] == "parquet" and info["n_rows"] == N_ROWS
+    # whole row groups covering the wanted rows
+    assert len(sample) == 20_000
+    assert set(np.bincount(info["block_ids"])) == {10_000}
+
+
+def test_other_formats_get_a_reservoir_sample(tmp_path):
+    paths = _files(tmp_path, "json", lambda df, p: df.to_json(p, orient="records"))
+    sample, info = sampling.sample_dataset(paths, 3_000, seed=1)
+    assert info["method"] == "reservoir" and info["n_rows"] == N_ROWS
+    assert len(sample) == 2 * SAMPLE_BLOCK_ROWS
+    assert sample["id"].is_unique
+    # each row is its own cluster
+    assert len(np.unique(info["block_ids"])) == len(sample)
+
+
+@pytest.mark.parametrize("rows", [0, sampling.SAMPLE_MAX_ROWS + 1])
+def test_sample_size_is_bounded(arrow_paths, rows):
+    with pytest.raises(ValueError):
+        sampling.sample_dataset(arrow_paths, rows)
+
+
+def test_estimates_cover_the_truth(arrow_paths):
+    sample, info = sampling.sample_dataset(arrow_paths, 20_000, seed=3)
+    truth = _frame()["value"].isna().mean()
+
+    missing = sampling.missing_ratios(sample, info).loc["value"]
+    assert missing["low"] <= truth <= missing["high"]
+    assert missing["high"] - missing["low"] < 0.05
+
+    overall, (low, high) = sampling.overall_missing_ratio(sample, info)
+    assert low <= truth / 3 <= high
+    ratio, (low, high) = sampling.duplicate_ratio(sample, info)
+    assert ratio == 0.0 and low == 0.0 and high < 0.01
+    assert list(sampling.constant_columns(sample)) == ["const"]
+
+
+def test_exact_results_are_cached_per_partition_state(exact_dir, tmp_path):
+    path = str(tmp_path / "part.arrow")
+    with open(path, "wb") as f:
+        f.write(b"v1")
+    # the cached result is keyed by the partitions' size and mtime
+    status = sampling.schedule_exact("profile", "ds", [path], lambda: {"answer": 42})
+    assert status in ("pending", "running")
+    for _ in range(100):
+        if sampling.load_exact("profile", "ds", [path]) is not None:
+            break
+        time.sleep(0.05)
+    assert sampling.load_exact("profile", "ds", [path]) == {"answer": 42}
+
+    with open(path, "ab") as f:
+        f.write(b"v2")
+    assert sampling.load_exact("profile", "ds", [path]) is None
+
+    assert sampling.drop_stale_exact({"other"}) == 1
+    assert os.listdir(exact_dir) == []
+
+
+def test_failed_exact_job_is_reported_once(exact_dir, tmp_path):
+    path = str(tmp_path / "part.arrow")
+    open(path, "wb").close()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    sampling.schedule_exact("quality", "ds", [path], fail)
+    for _ in range(100):
+        if sampling._jobs[("quality", "ds")].done():
+            break
+        time.sleep(0.05)
+    assert sampling.schedule_exact("quality", "ds", [path], fail) == "failed"
+    assert sampling.schedule_exact("quality", "ds", [path], lambda: {}) in ("pending", "running")
+
+
+def test_sampled_profile_endpoint(exact_dir):
+    dataset_id = ingestion.save_dataset(_frame())
+    client = TestClient(app)
+    body = client.get(f"/datasets/{dataset_id}/profile", params={"sample": 4_000}).json()
+    assert body["n_rows"] == N_ROWS
+    assert body["sample"]["method"] == "arrow"
+    assert body["sample"]["n_sampled"] == 2 * SAMPLE_BLOCK_ROWS
+    value = body["columns"]["value"]
+    # the endpoint's sample is unseeded: coverage is tested above, here the shape
+    low, high = value["pct_missing_ci"]
+    assert 0 <= low <= value["pct_missing"] <= high <= 100
+    assert 15 < value["pct_missing"] < 25
+    assert value["n_unique_approx"]
+
+    assert client.get(f"/datasets/{dataset_id}/profile", params={"sample": 0}).status_code == 400
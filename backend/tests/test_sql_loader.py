@@ -0,0 +1,156 @@
+# tests/test_sql_loader.py
+import sqlite3
+from contextlib import ExitStack
+
+import pandas as pd
+import pytest
+
+from app.services import catalog, ingestion, sql_loader
+
+
+def _create(path, n_rows):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, ts INTEGER, name TEXT)")
+        conn.executemany(
+            "INSERT INTO events VALUES (?, ?, ?)",
+            [(i, i // 2, f"event-{i}") for i in range(1, n_rows + 1)],
+        )
+    conn.close()
+
+
+def _insert(path, rows):
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO events VALUES (?, ?, ?)", rows)
+    conn.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "events.sqlite")
+    _create(path, 10)
+    return path
+
+
+def test_results_are_fetched_in_batches(db):
+    batches = list(sql_loader.iter_query(db, "SELECT * FROM events ORDER BY id", batch_rows=3))
+    assert [len(b) for b in batches] == [3, 3, 3, 1]
+    assert list(batches[0].columns) == ["id", "ts", "name"]
+    assert pd.concat(batches)["id"].tolist() == list(range(1, 11))
+
+
+def test_parameters_and_empty_results(db):
+    (batch,) = sql_loader.iter_query(db, "SELECT id FROM events WHERE id > ?", [8])
+    assert batch["id"].tolist() == [9, 10]
+    (batch,) = sql_loader.iter_query(db, "SELECT id FROM events WHERE id > :n", {"n": 9})
+    assert batch["id"].tolist() == [10]
+    (empty,) = sql_loader.iter_query(db, "SELECT id, name FROM events WHERE id > 100")
+    assert empty.empty and list(empty.columns) == ["id", "name"]
+
+
+def test_connections_are_read_only(db):
+    with pytest.raises(sqlite3.Error):
+        list(sql_loader.iter_query(db, "INSERT INTO events VALUES (11, 5, 'x')"))
+    with pytest.raises(sqlite3.Error):
+        list(sql_loader.iter_query(db, "DELETE FROM events"))
+    (batch,) = sql_loader.iter_query(db, "SELECT count(*) AS n FROM events")
+    assert batch["n"].tolist() == [10]
+
+
+def test_statements_without_rows_are_rejected(db):
+    with pytest.raises(ValueError, match="only SELECT"):
+        list(sql_loader.iter_query(db, "BEGIN"))
+
+
+def test_missing_database(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(sql_loader.iter_query(str(tmp_path / "missing.sqlite"), "SELECT 1"))
+
+
+def test_connections_are_pooled_and_bounded(db, monkeypatch):
+    monkeypatch.setattr(sql_loader, "_pools", {})
+    list(sql_loader.iter_query(db, "SELECT 1"))
+    pool = sql_loader._pool(db)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first  # reused, not reopened
+
+    with ExitStack() as stack:
+        for _ in range(sql_loader.SQL_POOL_SIZE):
+            stack.enter_context(pool.connection())
+        # every slot is taken: another borrower would wait
+        assert not pool._slots.acquire(blocking=False)
+    assert pool._slots.acquire(blocking=False)
+    pool._slots.release()
+
+
+def test_abandoned_stream_drops_its_connection(db, monkeypatch):
+    monkeypatch.setattr(sql_loader, "_pools", {})
+    stream = sql_loader.iter_query(db, "SELECT * FROM events", batch_rows=2)
+    next(stream)
+    stream.close()
+    assert sql_loader._pool(db)._idle.empty()
+
+
+def test_load_from_sqlite_records_the_source(db):
+    dataset_id = sql_loader.load_from_sqlite(db, "SELECT * FROM events WHERE id <= ?", [4])
+    assert ingestion.load_dataset(dataset_id)["id"].tolist() == [1, 2, 3, 4]
+    source = catalog.get_entry(dataset_id)["sql_source"]
+    assert source["query"] == "SELECT * FROM events WHERE id <= ?"
+    assert source["params"] == [4]
+
+
+def test_sync_appends_only_rows_past_the_watermark(db):
+    registered = sql_loader.register_source(db, "SELECT * FROM events", "id")
+    dataset_id = registered["dataset_id"]
+    assert registered["n_rows"] == 10
+    assert registered["watermark"] == 10
+
+    assert sql_loader.sync_source(dataset_id)["n_rows_appended"] == 0
+
+    _insert(db, [(11, 5, "event-11"), (12, 6, "event-12")])
+    synced = sql_loader.sync_source(dataset_id)
+    assert synced["n_rows_appended"] == 2
+    assert synced["watermark"] == 12
+    assert ingestion.load_dataset(dataset_id)["id"].tolist() == list(range(1, 13))
+    assert catalog.get_entry(dataset_id)["sql_source"]["watermark"] == 12
+
+
+def test_sync_with_named_parameters(db):
+    registered = sql_loader.register_source(
+        db, "SELECT * FROM events WHERE name != :skip", "id", {"skip": "event-3"}
+    )
+    _insert(db, [(11, 5, "event-11")])
+    assert sql_loader.sync_source(registered["dataset_id"])["n_rows_appended"] == 1
+    ids = ingestion.load_dataset(registered["dataset_id"])["id"].tolist()
+    assert ids == [1, 2, 4, 5, 6, 7, 8, 9, 10, 11]
+
+
+def test_register_requires_the_watermark_column(db):
+    with pytest.raises(ValueError, match="no column"):
+        sql_loader.register_source(db, "SELECT id FROM events", "updated_at")
+
+
+def test_sync_rejects_datasets_that_are_not_sources(db):
+    dataset_id = sql_loader.load_from_sqlite(db, "SELECT * FROM events")
+    with pytest.raises(ValueError, match="not a registered SQL source"):
+        sql_loader.sync_source(dataset_id)
+    with pytest.raises(FileNotFoundError):
+        sql_loader.sync_source("no-such-dataset")
+
+
+def test_group_by_watermark_never_splits_ties():
+    # ts: 0 1 1 2 2 2 2 3 4 4, in batches of 3
+    frame = pd.DataFrame({"ts": [0, 1, 1, 2, 2, 2, 2, 3, 4, 4]})
+    batches = [frame.iloc[i:i + 3] for i in range(0, len(frame), 3)]
+    groups = list(sql_loader._group_by_watermark(batches, "ts", rows=4))
+
+    assert pd.concat(groups)["ts"].tolist() == frame["ts"].tolist()
+    for before, after in zip(groups, groups[1:]):
+        assert before["ts"].iloc[-1] < after["ts"].iloc[0]
+
+
+def test_group_by_watermark_keeps_an_all_tied_run_together():
+    batches = [pd.DataFrame({"ts": [7, 7, 7]}), pd.DataFrame({"ts": [7, 7, 8]})]
+    groups = list(sql_loader._group_by_watermark(batches, "ts", rows=2))
+    assert [g["ts"].tolist() for g in groups] == [[7, 7, 7, 7, 7], [8]]
@@ -0,0 +1,210 @@
+# tests/test_storage.py
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from app.config import BASE_UPLOAD_DIR
+from app.services import catalog, ingestion, storage
+
+DAY = 24 * 3600
+
+
+@pytest.fixture(autouse=True)
+def lifecycle(monkeypatch):
+    # every test opts into what it checks; the defaults delete nothing
+    monkeypatch.setattr(storage, "DATASET_TTL_S", 0)
+    monkeypatch.setattr(storage, "COLD_AFTER_S", 0)
+    monkeypatch.setattr(storage, "STORAGE_QUOTA_BYTES", 0)
+    monkeypatch.setattr(storage, "LEGACY_UPLOAD_DIR", None)
+    before = set(catalog.list_entries())
+    yield
+    for dataset_id in set(catalog.list_entries()) - before:
+        ingestion.delete_dataset(dataset_id)
+
+
+def _frame(n=1000):
+    return pd.DataFrame({"id": range(n), "name": ["same value"] * n})
+
+
+def _used(dataset_id, seconds_ago):
+    def update(e):
+        e["last_used"] = time.time() - seconds_ago
+        return e
+
+    catalog.update_entry(dataset_id, update)
+
+
+def _exists(dataset_id):
+    try:
+        ingestion.dataset_partitions(dataset_id)
+    except FileNotFoundError:
+        return False
+    return all(os.path.exists(p) for p in ingestion.dataset_partitions(dataset_id))
+
+
+def _legacy_file(tmp_dir, name, age_s):
+    path = os.path.join(tmp_dir, name)
+    _frame(10).to_csv(path, index=False)
+    old = time.time() - age_s
+    os.utime(path, (old, old))
+    return path
+
+
+def test_defaults_expire_nothing():
+    dataset_id = ingestion.save_dataset(_frame())
+    _used(dataset_id, 365 * DAY)
+
+    report = storage.sweep()
+    assert dataset_id not in report["expired"]
+    assert _exists(dataset_id)
+
+
+def test_unused_datasets_expire_after_ttl(monkeypatch):
+    monkeypatch.setattr(storage, "DATASET_TTL_S", DAY)
+    stale = ingestion.save_dataset(_frame())
+    fresh = ingestion.save_dataset(_frame())
+    pinned = ingestion.save_dataset(_frame())
+    _used(stale, 2 * DAY)
+    _used(fresh, 60)
+    _used(pinned, 2 * DAY)
+    storage.set_lifecycle(pinned, pinned=True)
+
+    report = storage.sweep()
+    assert stale in report["expired"]
+    assert not _exists(stale) and catalog.get_entry(stale) is None
+    assert _exists(fresh) and _exists(pinned)
+
+
+def test_ttl_of_unrecorded_datasets_starts_at_first_sweep(monkeypatch):
+    monkeypatch.setattr(storage, "DATASET_TTL_S", DAY)
+    # a legacy single file, last written long ago and never used since
+    path = _legacy_file(BASE_UPLOAD_DIR, "legacy-0001.csv", 90 * DAY)
+    partitioned = ingestion.save_dataset(_frame())
+    os.utime(ingestion.dataset_dir(partitioned), (0, 0))
+
+    before = time.time()
+    report = storage.sweep()
+    assert "legacy-0001" not in report["expired"]
+    assert partitioned not in report["expired"]
+    assert os.path.exists(path) and _exists(partitioned)
+    assert catalog.get_entry("legacy-0001")["last_used"] >= before
+    assert catalog.get_entry(partitioned)["last_used"] >= before
+
+
+def test_touch_records_use_of_legacy_files():
+    _legacy_file(BASE_UPLOAD_DIR, "legacy-0002.csv", 90 * DAY)
+    storage.touch("legacy-0002")
+    assert time.time() - catalog.get_entry("legacy-0002")["last_used"] < 60
+
+    storage.touch("no-such-dataset")
+    assert catalog.get_entry("no-such-dataset") is None
+
+
+def test_legacy_uploads_are_moved_in_and_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "LEGACY_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(storage, "DATASET_TTL_S", 1)
+    _legacy_file(str(tmp_path), "legacy-0003.csv", 90 * DAY)
+    (tmp_path / "resumable").mkdir()
+
+    report = storage.sweep()
+    assert report["legacy_uploads_moved"] == 1
+    assert "legacy-0003" not in report["expired"]
+    assert os.listdir(tmp_path) == ["resumable"]
+    assert ingestion.load_dataset("legacy-0003")["id"].tolist() == list(range(10))
+
+    # from then on it ages from when the sweep moved it in
+    _used("legacy-0003", 2)
+    assert "legacy-0003" in storage.sweep()["expired"]
+
+
+def test_legacy_upload_never_overwrites_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "LEGACY_UPLOAD_DIR", str(tmp_path))
+    _legacy_file(BASE_UPLOAD_DIR, "legacy-0004.csv", 0)
+    _legacy_file(str(tmp_path), "legacy-0004.csv", 0)
+
+    assert storage.sweep()["legacy_uploads_moved"] == 0
+    assert os.path.exists(tmp_path / "legacy-0004.csv")
+
+
+def test_unreferenced_derived_datasets_are_collected():
+    source = ingestion.save_dataset(_frame())
+    cleaned = ingestion.save_dataset(_frame(), source_dataset_id=source)
+    orphan = ingestion.save_dataset(_frame(), source_dataset_id=source)
+    recent = ingestion.save_dataset(_frame(), source_dataset_id=source)
+    catalog.update_entry(source, lambda e: {**e, "cleaned_dataset_id": cleaned})
+    for dataset_id in (cleaned, orphan):
+        _used(dataset_id, 2 * DAY)
+    _used(recent, 60)
+
+    report = storage.sweep()
+    assert report["orphaned"] == [orphan]
+    assert not _exists(orphan)
+    assert _exists(source) and _exists(cleaned) and _exists(recent)
+
+
+def test_stray_files_are_removed_after_grace():
+    stale_dir = os.path.join(BASE_UPLOAD_DIR, "unrecorded.parts")
+    os.makedirs(stale_dir)
+    with open(os.path.join(stale_dir, "00000.arrow"), "wb") as f:
+        f.write(b"x" * 10)
+    stale_tmp = os.path.join(BASE_UPLOAD_DIR, "catalog.json.1.tmp")
+    fresh_tmp = os.path.join(BASE_UPLOAD_DIR, "catalog.json.2.tmp")
+    for path in (stale_tmp, fresh_tmp):
+        with open(path, "w") as f:
+            f.write("{}")
+    for path in (stale_dir, stale_tmp):
+        os.utime(path, (0, 0))
+
+    report = storage.sweep()
+    assert report["strays_removed"] == 2
+    assert not os.path.exists(stale_dir) and not os.path.exists(stale_tmp)
+    assert os.path.exists(fresh_tmp)
+    os.remove(fresh_tmp)
+
+
+def test_cold_datasets_are_recompressed(monkeypatch):
+    monkeypatch.setattr(storage, "COLD_AFTER_S", DAY)
+    cold = ingestion.save_dataset(_frame(50_000))
+    warm = ingestion.save_dataset(_frame(50_000))
+    _used(cold, 2 * DAY)
+    _used(warm, 60)
+    digest = ingestion.content_hash(cold)
+    size = os.path.getsize(ingestion.dataset_partitions(cold)[0])
+
+    report = storage.sweep()
+    assert report["compressed"] == [cold]
+    entry = catalog.get_entry(cold)
+    assert entry["compressed_partitions"] == entry["partitions"]
+    assert os.path.getsize(ingestion.dataset_partitions(cold)[0]) < size
+    pd.testing.assert_frame_equal(ingestion.load_dataset(cold), _frame(50_000))
+    # the memo keys on the content hash, which must survive the rewrite
+    assert ingestion.content_hash(cold) == digest
+    assert time.time() - entry["last_used"] > DAY
+
+    # already compressed: nothing to do
+    assert cold not in storage.sweep()["compressed"]
+
+
+def test_quota_evicts_least_recently_used_first(monkeypatch):
+    oldest = ingestion.save_dataset(_frame())
+    older = ingestion.save_dataset(_frame())
+    pinned = ingestion.save_dataset(_frame())
+    _used(oldest, 3 * DAY)
+    _used(older, 2 * DAY)
+    _used(pinned, 4 * DAY)
+    storage.set_lifecycle(pinned, pinned=True)
+    storage.sweep()  # stamps whatever else is in the store as used now
+
+    monkeypatch.setattr(storage, "STORAGE_QUOTA_BYTES", storage.usage(max_age_s=0) - 1)
+    report = storage.sweep()
+    assert report["evicted"] == [oldest]
+    assert _exists(older) and _exists(pinned)
+    assert report["bytes_used"] <= storage.STORAGE_QUOTA_BYTES
+
+
+def test_ensure_capacity_refuses_when_a_sweep_cannot_help(monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_QUOTA_BYTES", 1)
+    with pytest.raises(OSError):
+        storage.ensure_capacity()
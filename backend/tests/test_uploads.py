@@ -0,0 +1,134 @@
+# tests/test_uploads.py
+import hashlib
+import os
+
+import pytest
+
+from app.services import ingestion  # noqa: F401  (registers the readers)
+from app.services import uploads
+
+PART_SIZE = 4
+CONTENT = b"a,b\n1,2\n3,4\n"  # 12 bytes: parts of 4, 4 and 4
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "RESUMABLE_UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _part(n):
+    return CONTENT[(n - 1) * PART_SIZE:n * PART_SIZE]
+
+
+def _send(upload_id, n, data, checksum=None):
+    with uploads.open_part(upload_id, n) as writer:
+        writer.write(data)
+        return writer.commit(checksum)
+
+
+def _create():
+    return uploads.create_upload("data.csv", len(CONTENT), PART_SIZE)["upload_id"]
+
+
+def _read(upload_id):
+    path, ext, digest = uploads.complete_upload(upload_id)
+    with open(path, "rb") as f:
+        return f.read(), ext, digest
+
+
+def test_parts_in_any_order_complete_with_digest():
+    upload_id = _create()
+    for n in (3, 1, 2):
+        record = _send(upload_id, n, _part(n))
+        assert record["sha256"] == hashlib.sha256(_part(n)).hexdigest()
+
+    content, ext, digest = _read(upload_id)
+    assert content == CONTENT
+    assert ext == "csv"
+    combined = b"".join(hashlib.sha256(_part(n)).digest() for n in (1, 2, 3))
+    assert digest == f"{hashlib.sha256(combined).hexdigest()}-3"
+
+
+def test_resume_after_missing_part():
+    upload_id = _create()
+    _send(upload_id, 1, _part(1))
+    _send(upload_id, 3, _part(3))
+
+    status = uploads.upload_status(upload_id)
+    assert status["missing"] == [2]
+    assert [p["part"] for p in status["parts"]] == [1, 3]
+    with pytest.raises(ValueError, match="missing"):
+        uploads.complete_upload(upload_id)
+
+    _send(upload_id, 2, _part(2))
+    assert uploads.upload_status(upload_id)["missing"] == []
+    assert _read(upload_id)[0] == CONTENT
+
+
+def test_checksum_mismatch_is_rejected_and_not_recorded():
+    upload_id = _create()
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        _send(upload_id, 1, _part(1), checksum=hashlib.sha256(b"else").hexdigest())
+    assert uploads.upload_status(upload_id)["missing"] == [1, 2, 3]
+
+    _send(upload_id, 1, _part(1), checksum=hashlib.sha256(_part(1)).hexdigest())
+    assert uploads.upload_status(upload_id)["missing"] == [2, 3]
+
+
+def test_wrong_size_is_rejected():
+    upload_id = _create()
+    with pytest.raises(ValueError, match="larger"):
+        _send(upload_id, 1, b"too long")
+    with pytest.raises(ValueError, match="expected"):
+        _send(upload_id, 1, b"ab")
+    assert uploads.upload_status(upload_id)["missing"] == [1, 2, 3]
+
+
+def test_failed_resend_keeps_the_received_part():
+    upload_id = _create()
+    for n in (1, 2, 3):
+        _send(upload_id, n, _part(n))
+    digest = _read(upload_id)[2]
+
+    # a resend with a bad checksum, and one cut off mid-part
+    with pytest.raises(ValueError):
+        _send(upload_id, 2, b"XXXX", checksum=hashlib.sha256(_part(2)).hexdigest())
+    with uploads.open_part(upload_id, 2) as writer:
+        writer.write(b"XX")  # connection dropped: never committed
+
+    assert uploads.upload_status(upload_id)["missing"] == []
+    assert _read(upload_id) == (CONTENT, "csv", digest)
+    # no staging files left behind
+    parts_dir = os.path.join(uploads.RESUMABLE_UPLOAD_DIR, upload_id, "parts")
+    assert sorted(os.listdir(parts_dir)) == ["00001.json", "00002.json", "00003.json"]
+
+
+def test_resent_part_replaces_the_previous_one():
+    upload_id = _create()
+    for n in (1, 2, 3):
+        _send(upload_id, n, _part(n))
+    record = _send(upload_id, 2, b"5,6\n")
+
+    content, _, _ = _read(upload_id)
+    assert content == CONTENT[:4] + b"5,6\n" + CONTENT[8:]
+    status = uploads.upload_status(upload_id)
+    assert status["parts"][1] == record
+
+
+def test_unknown_upload_and_part_numbers():
+    with pytest.raises(FileNotFoundError):
+        uploads.open_part("not-an-upload", 1)
+    upload_id = _create()
+    for n in (0, 4):
+        with pytest.raises(ValueError, match="between 1 and 3"):
+            uploads.open_part(upload_id, n)
+
+
+def test_unsupported_type_and_discard():
+    with pytest.raises(ValueError, match="Unsupported"):
+        uploads.create_upload("data.nope", 10)
+    upload_id = _create()
+    uploads.discard_upload(upload_id)
+    with pytest.raises(FileNotFoundError):
+        uploads.upload_status(upload_id)
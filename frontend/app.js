@@ -214,9 +214,7 @@ async function uploadFile(e) {
     datasetId = res.dataset_id;
     cleanedId = null;
 
-    await loadProfile();
-    await loadQuality();
-    await cleanNow();
+    await analyzeNow();
   } catch (err) {
     console.error(err);
     alertBox(err.message || "Upload failed", "error");
@@ -225,11 +223,23 @@ async function uploadFile(e) {
   }
 }
 
-/* ====== PROFILE ====== */
-async function loadProfile() {
+/* ====== ANALYZE (profile + quality + clean in one pass) ====== */
+async function analyzeNow() {
   if (!datasetId) return;
 
-  const p = await api(`/datasets/${datasetId}/profile`);
+  alertBox("Profiling, scoring and cleaning dataset...");
+
+  const a = await api(`/datasets/${datasetId}/analyze`, {
+    method: "POST",
+  });
+
+  renderProfile(a.profile);
+  renderQuality(a.quality);
+  renderCleaning(a.cleaning);
+}
+
+/* ====== PROFILE ====== */
+function renderProfile(p) {
   const profileDiv = document.getElementById("profile");
   if (!profileDiv) return;
 
@@ -265,10 +275,7 @@ async function loadProfile() {
 }
 
 /* ====== QUALITY SCORE ====== */
-async function loadQuality() {
-  if (!datasetId) return;
-
-  const q = await api(`/datasets/${datasetId}/quality_score`);
+function renderQuality(q) {
   const div = document.getElementById("quality");
   if (!div) return;
 
@@ -309,15 +316,7 @@ async function loadQuality() {
 }
 
 /* ====== CLEANING ====== */
-async function cleanNow() {
-  if (!datasetId) return;
-
-  alertBox("Running cleaning pipeline...");
-
-  const c = await api(`/datasets/${datasetId}/clean`, {
-    method: "POST",
-  });
-
+function renderCleaning(c) {
   cleanedId = c.cleaned_dataset_id;
 
   const div = document.getElementById("result");
@@ -1,19 +1,35 @@
+import hashlib
+import json
+
 import streamlit as st
 import requests
 import pandas as pd
-import time
+from requests.adapters import HTTPAdapter
 
 # =========================================
 # CONFIG – BACKEND URL
 # =========================================
 BACKEND_URL = "http://127.0.0.1:8000"
 
+# Uploads of the same content reuse their dataset for this long (seconds)
+UPLOAD_CACHE_TTL = 3600
+
 
 # =========================================
 # BACKEND CALL HELPERS
 # =========================================
+@st.cache_resource
+def http() -> requests.Session:
+    """One pooled session for all reruns and users (keep-alive connections)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def backend_register(email: str, password: str):
-    r = requests.post(
+    r = http().post(
         f"{BACKEND_URL}/auth/register",
         json={"email": email, "password": password},
     )
@@ -22,7 +38,7 @@ def backend_register(email: str, password: str):
 
 
 def backend_login(email: str, password: str) -> str:
-    r = requests.post(
+    r = http().post(
         f"{BACKEND_URL}/auth/login",
         json={"email": email, "password": password},
     )
@@ -32,7 +48,7 @@ def backend_login(email: str, password: str) -> str:
 
 
 def backend_me(token: str):
-    r = requests.get(
+    r = http().get(
         f"{BACKEND_URL}/auth/me",
         headers={"Authorization": f"Bearer {token}"},
     )
@@ -40,43 +56,42 @@ def backend_me(token: str):
     return r.json()  # {email: ...}
 
 
-def upload_file(file):
-    files = {"file": (file.name, file.getvalue())}
-    r = requests.post(f"{BACKEND_URL}/datasets/upload", files=files)
-    r.raise_for_status()
-    return r.json()["dataset_id"]
+def file_digest(file) -> str:
+    """SHA-256 of an uploaded file, hashed once per upload widget value."""
+    digests = st.session_state.setdefault("file_digests", {})
+    if file.file_id not in digests:
+        digests[file.file_id] = hashlib.sha256(file.getvalue()).hexdigest()
+    return digests[file.file_id]
 
 
-def get_profile(dataset_id: str):
-    r = requests.get(f"{BACKEND_URL}/datasets/{dataset_id}/profile")
+@st.cache_data(ttl=UPLOAD_CACHE_TTL, show_spinner=False)
+def upload_file(digest: str, name: str, _data: bytes) -> str:
+    """Upload once per content (digest) and name; `_data` is not hashed again."""
+    files = {"file": (name, _data)}
+    r = http().post(f"{BACKEND_URL}/datasets/upload", files=files)
     r.raise_for_status()
-    return r.json()
+    return r.json()["dataset_id"]
 
 
-def get_quality(dataset_id: str):
-    r = requests.get(f"{BACKEND_URL}/datasets/{dataset_id}/quality_score")
-    r.raise_for_status()
-    return r.json()
-
-
-def run_cleaner(dataset_id: str):
-    payload = {
-        "drop_duplicates": True,
-        "impute_missing": True,
-        "impute_strategy": "median",
-        "remove_outliers": True,
-        "outlier_zscore_threshold": 3,
-    }
-    r = requests.post(
-        f"{BACKEND_URL}/datasets/{dataset_id}/clean",
-        json=payload,
-    )
-    r.raise_for_status()
-    return r.json()
+def analyze_dataset(dataset_id: str):
+    """
+    Profile, score and clean in one backend pass.
+    Yields (stage, data) as each stage finishes: profile, quality, cleaning.
+    """
+    with http().post(
+        f"{BACKEND_URL}/datasets/{dataset_id}/analyze",
+        params={"stream": "ndjson"},
+        stream=True,
+    ) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if line:
+                event = json.loads(line)
+                yield event["stage"], event["data"]
 
 
 def download_file(dataset_id: str) -> bytes:
-    r = requests.get(f"{BACKEND_URL}/datasets/{dataset_id}/download")
+    r = http().get(f"{BACKEND_URL}/datasets/{dataset_id}/download")
     r.raise_for_status()
     return r.content
 
@@ -91,6 +106,11 @@ def init_session():
         st.session_state["access_token"] = None
     if "current_user" not in st.session_state:
         st.session_state["current_user"] = None
+    if "analyses" not in st.session_state:
+        # file digest -> {"dataset_id": ..., "profile": ..., "quality": ..., "cleaning": ...}
+        st.session_state["analyses"] = {}
+    if "download" not in st.session_state:
+        st.session_state["download"] = (None, None)  # (cleaned dataset id, CSV bytes)
 
 
 # =========================================
@@ -239,16 +259,30 @@ def render_cleaning_app():
         st.info("Choose a file to start the profiling & cleaning workflow.")
         return
 
-    # 1) Upload
-    with st.spinner("📤 Uploading dataset to backend..."):
-        dataset_id = upload_file(uploaded)
-        st.success(f"✔ Uploaded — dataset_id: {dataset_id}")
+    # Every widget interaction reruns this script: results are kept per
+    # file content, so only a new file reaches the backend again.
+    digest = file_digest(uploaded)
+    analysis = st.session_state["analyses"].get(digest)
 
-    time.sleep(0.2)
+    # 1) Upload
+    if analysis is None:
+        with st.spinner("📤 Uploading dataset to backend..."):
+            dataset_id = upload_file(digest, uploaded.name, uploaded.getvalue())
+        analysis = {"dataset_id": dataset_id}
+    dataset_id = analysis["dataset_id"]
+    st.success(f"✔ Uploaded — dataset_id: {dataset_id}")
+
+    # 2-4) Profile, quality and cleaning come from a single /analyze call,
+    # rendered as each stage arrives on the first run
+    stages = analyze_dataset(dataset_id) if "cleaning" not in analysis else None
+
+    def stage(name: str):
+        if name not in analysis:
+            _, analysis[name] = next(stages)
+        return analysis[name]
 
-    # 2) Profile
     with st.spinner("📊 Analyzing dataset profile..."):
-        profile = get_profile(dataset_id)
+        profile = stage("profile")
         st.markdown("#### Step 2 · Dataset Profile")
         st.write(f"Rows: **{profile['n_rows']}** | Columns: **{profile['n_cols']}**")
 
@@ -267,20 +301,17 @@ def render_cleaning_app():
             df_profile = pd.DataFrame(rows)
             st.dataframe(df_profile, use_container_width=True)
 
-    time.sleep(0.2)
-
     # 3) Quality
     with st.spinner("🧮 Calculating data quality score..."):
-        quality = get_quality(dataset_id)
+        quality = stage("quality")
         st.markdown("#### Step 3 · Data Quality")
         st.metric("Quality Score", f"{quality['quality_score']:.2f}")
         st.json(quality["metrics"])
 
-    time.sleep(0.2)
-
     # 4) Cleaning
     with st.spinner("🧼 Cleaning dataset automatically..."):
-        cleaned = run_cleaner(dataset_id)
+        cleaned = stage("cleaning")
+        st.session_state["analyses"][digest] = analysis
 
         st.markdown("#### Step 4 · Cleaning Summary")
         st.success("Cleaning complete ✅")
@@ -310,10 +341,15 @@ def render_cleaning_app():
     st.markdown("---")
     st.markdown("#### Step 6 · Download Cleaned Dataset")
 
-    cleaned_bytes = download_file(cleaned_id)
+    # fetched only on request, then kept for later reruns
+    if st.session_state["download"][0] != cleaned_id:
+        if not st.button("📥 Prepare Cleaned CSV"):
+            return
+        with st.spinner("Fetching cleaned dataset..."):
+            st.session_state["download"] = (cleaned_id, download_file(cleaned_id))
     st.download_button(
         label="💾 Download Cleaned CSV",
-        data=cleaned_bytes,
+        data=st.session_state["download"][1],
         file_name=f"Cleaned_{cleaned_id}.csv",
         mime="text/csv",
     )